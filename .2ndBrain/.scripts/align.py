@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Word-level timings on demand.
+
+WhisperX normally runs a wav2vec2 forced-alignment pass after ASR to give
+every word a start, end and score. Only the word tables of the transcript
+notes (json-to-markdown.py) read those; RAW-TEXT.md, get_transcript() and
+the search index use segment text and times. With ALIGNMENT=lazy in .env,
+transcription skips the pass (--no_align) and this script aligns the
+segments of a file - or of one time range, e.g. a moment found with
+semantic-search.py - when they are actually wanted. --start/--end are times
+in the original recording, as shown in notes and search results.
+
+Words are cached per segment in .cache/alignment/<stem>.json (keyed by the
+segment's times and text) and written into the transcript JSON, so
+json-to-markdown.py --all re-renders the note with its word table.
+
+Usage: python3 .2ndBrain/.scripts/align.py TRANSCRIPT.json [...] [--start SECONDS] [--end SECONDS]
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import tempfile
+from pathlib import Path
+from atomic import write_json
+from audio import preprocess_for_transcript
+from fingerprint import SAMPLE_RATE, read_wav
+from metrics import stage_metrics
+from vad import load_offsets, to_processed
+
+BASE_PATH = Path(__file__).parent.parent.parent  # Go up to 2nd Brain root
+CACHE_DIR = BASE_PATH / ".cache" / "alignment"
+DEVICE = "cpu"
+
+class AlignmentError(Exception):
+    """Word timings could not be computed."""
+
+def segment_key(seg):
+    text_hash = hashlib.sha1(seg.get('text', '').encode('utf-8')).hexdigest()[:12]
+    return f"{seg['start']:.3f}:{seg['end']:.3f}:{text_hash}"
+
+def load_cache(stem):
+    try:
+        with open(CACHE_DIR / f"{stem}.json", 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def find_audio(stem):
+    """(preprocessed WAV pipeline.py kept, original m4a), either None if missing.
+    Transcript times are on the preprocessed (trimmed) timeline."""
+    wav = BASE_PATH / ".cache" / "audio" / f"{stem}.wav"
+    m4a = next((m for m in (BASE_PATH / f"{stem}.m4a", BASE_PATH / "1-Raw" / "m4a" / f"{stem}.m4a")
+                if m.exists()), None)
+    return (wav if wav.exists() else None), m4a
+
+def load_audio(stem):
+    """16 kHz samples of the recording, on the timeline its transcript was made on."""
+    wav, m4a = find_audio(stem)
+    if load_offsets(stem) is None:
+        wav = None  # made before vad.py: a kept wav is VAD-trimmed, its transcript wasn't
+    if wav is not None:
+        samples = read_wav(wav)
+    elif m4a is not None:
+        # Same deterministic trimming as at transcription time (VAD, or the old filter)
+        with tempfile.TemporaryDirectory() as tmp:
+            wav = Path(tmp) / f"{stem}.wav"
+            if not preprocess_for_transcript(m4a, wav, stem):
+                raise AlignmentError(f"could not preprocess {m4a.name}")
+            samples = read_wav(wav)
+    else:
+        raise AlignmentError(f"no audio found for {stem} (looked in .cache/audio, root and 1-Raw/m4a)")
+    if samples is None:
+        raise AlignmentError(f"could not read the audio of {stem}")
+    return samples
+
+def align_segments(segments, samples, language):
+    """Words of each segment from WhisperX's forced alignment (one model load)."""
+    import whisperx
+    model, metadata = whisperx.load_align_model(language_code=language, device=DEVICE)
+    aligned = []
+    for seg in segments:
+        # One segment per call: whisperx.align may split a segment into sentences
+        result = whisperx.align([{'start': seg['start'], 'end': seg['end'], 'text': seg['text']}],
+                                model, metadata, samples, DEVICE, return_char_alignments=False)
+        aligned.append([w for part in result['segments'] for w in part.get('words', [])])
+    return aligned
+
+def align_transcript(json_path, start=None, end=None):
+    """Add word timings to the segments of json_path overlapping [start, end]
+    (original recording times; the whole file by default). Returns (aligned now, taken from cache)."""
+    json_path = Path(json_path)
+    offsets = load_offsets(json_path.stem)
+    if offsets is not None:
+        start = None if start is None else to_processed(start, offsets)
+        end = None if end is None else to_processed(end, offsets)
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    segments = data.get('segments', [])
+    lo = float('-inf') if start is None else start
+    hi = float('inf') if end is None else end
+    wanted = [seg for seg in segments
+              if 'words' not in seg and 'start' in seg and 'end' in seg and seg['end'] > lo and seg['start'] < hi]
+    if not wanted:
+        return 0, 0
+
+    cache = load_cache(json_path.stem)
+    missing = [seg for seg in wanted if segment_key(seg) not in cache]
+    if missing:
+        with stage_metrics("align", file=json_path.name, items=len(missing), unit="segments") as m:
+            samples = load_audio(json_path.stem)
+            m['audio_seconds'] = len(samples) / SAMPLE_RATE
+            for seg, words in zip(missing, align_segments(missing, samples, data.get('language') or 'en')):
+                cache[segment_key(seg)] = words
+        write_json(CACHE_DIR / f"{json_path.stem}.json", cache)
+
+    for seg in wanted:
+        seg['words'] = [dict(w) for w in cache[segment_key(seg)]]
+        if 'speaker' in seg:
+            for word in seg['words']:
+                word['speaker'] = seg['speaker']
+    if 'word_segments' in data:
+        data['word_segments'] = [w for seg in segments for w in seg.get('words', [])]
+    write_json(json_path, data)
+    return len(missing), len(wanted) - len(missing)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute word timings for transcripts made with ALIGNMENT=lazy.")
+    parser.add_argument("transcripts", nargs="+", type=Path, help="WhisperX JSON files")
+    parser.add_argument("--start", type=float, help="only segments ending after this time (seconds)")
+    parser.add_argument("--end", type=float, help="only segments starting before this time (seconds)")
+    args = parser.parse_args()
+
+    for json_path in args.transcripts:
+        if not json_path.exists():
+            raise AlignmentError(f"file not found: {json_path}")
+        aligned, cached = align_transcript(json_path, args.start, args.end)
+        if aligned or cached:
+            print(f"✅ {json_path.name}: word timings for {aligned + cached} segment(s) "
+                  f"({aligned} aligned, {cached} from cache)")
+        else:
+            print(f"✅ {json_path.name}: already has word timings")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -9,6 +9,7 @@ Usage: python3 .2ndBrain/.scripts/approve-processing-plan.py
 
 from pathlib import Path
 import sys
+from speculative import cancel_precompute, start_precompute
 
 def main():
     root_dir = Path(".")
@@ -42,6 +43,9 @@ def main():
     except:
         pass
     
+    # Keep the RAW-TEXT candidate matches current in the background while the human reviews
+    precompute = start_precompute(root_dir / "RAW-TEXT.md")
+    
     # HARD-CODED HUMAN-IN-THE-LOOP: Cannot proceed without approval
     while True:
         approval = input("Type 'approved' to execute plan (or 'reject' to cancel): ").strip().lower()
@@ -50,6 +54,7 @@ def main():
             print("🤖 Tell AI: 'approved' to execute changes\n")
             exit(0)
         elif approval == 'reject':
+            cancel_precompute(precompute)  # the plan will be revised, its candidates are stale
             print("\n❌ Plan rejected. AI must revise PROCESSING-PLAN.md")
             print("📝 Provide feedback to AI about what needs to change\n")
             exit(1)
@@ -0,0 +1,35 @@
+"""
+Atomic file writes shared by the scripts.
+
+Content goes to a unique temp file next to the target and is moved into place
+only once complete: readers never see a half-written file, a failed write keeps
+the previous copy, and concurrent writers of the same file never share a temp
+file (a fixed <name>.tmp made the second os.replace() fail).
+"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+@contextmanager
+def replacing(path, mode='w', **open_kwargs):
+    """Write to a unique temp file next to path, then move it into place (or delete it on error)."""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, **open_kwargs) as f:
+            # mkstemp creates 0600: keep the mode of the file being replaced
+            os.chmod(tmp_path, path.stat().st_mode & 0o777 if path.exists() else 0o644)
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+def write_json(path, data):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with replacing(path) as f:
+        json.dump(data, f)
@@ -0,0 +1,242 @@
+"""
+Shared audio helpers: ffmpeg preprocessing, duration probing, WhisperX and diarize.py invocation.
+Used by transcribe.py, process.py and pipeline.py.
+"""
+
+import fcntl
+import json
+import os
+import resource
+import shlex
+import subprocess
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+import profiling
+import vad
+from metrics import run_measured
+from transcript_store import load_segments
+
+SCRIPTS_DIR = Path(__file__).parent
+RUN_LOCK = Path(".cache") / "transcribe.lock"  # relative to the vault root
+_run_lock = None  # open for the life of the process once recover_temp_files() ran
+DIARIZATION_MODES = ('now', 'lazy', 'off')
+ALIGNMENT_MODES = ('now', 'lazy')
+
+def run_command_with_progress(cmd, description="Processing", env=None):
+    """Run command with live progress feedback."""
+    started = time.perf_counter()
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
+    
+    def show_progress():
+        start_time = time.time()
+        spinner = ['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏']
+        i = 0
+        while process.poll() is None:
+            elapsed = time.time() - start_time
+            mins, secs = divmod(int(elapsed), 60)
+            if mins > 0:
+                time_str = f"{mins}m {secs}s"
+            else:
+                time_str = f"{secs}s"
+            print(f"\r   {spinner[i % len(spinner)]} {description}... {time_str} elapsed", end="", flush=True)
+            i += 1
+            time.sleep(0.3)
+        
+        # Final elapsed time
+        elapsed = time.time() - start_time
+        mins, secs = divmod(int(elapsed), 60)
+        if mins > 0:
+            time_str = f"{mins}m {secs}s"
+        else:
+            time_str = f"{secs}s"
+        print(f"\r   ✓ {description} complete ({time_str})                    ")
+    
+    progress_thread = threading.Thread(target=show_progress, daemon=True)
+    progress_thread.start()
+    
+    stdout, stderr = process.communicate()
+    progress_thread.join(timeout=1)
+    if profiling.enabled():
+        # Sequential callers only, so the RUSAGE_CHILDREN delta is this command
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        usage = SimpleNamespace(
+            ru_utime=after.ru_utime - children_before.ru_utime,
+            ru_stime=after.ru_stime - children_before.ru_stime,
+            ru_maxrss=after.ru_maxrss,
+        )
+        profiling.record_child(cmd, time.perf_counter() - started, usage)
+    
+    return process.returncode == 0
+
+def get_audio_duration(file_path):
+    """Get audio duration in seconds using ffprobe."""
+    try:
+        cmd = f'ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 "{file_path}"'
+        result, _ = run_measured(cmd, shell=True, capture_output=True, text=True)
+        return float(result.stdout.strip())
+    except:
+        return 0
+
+# The silenceremove chain transcripts were preprocessed with before vad.py. Their
+# times are on this timeline, so audio re-made for them (align.py, diarize.py
+# pending) must be trimmed the same way. They have no offset map.
+LEGACY_SILENCE_FILTER = (
+    'silenceremove='
+    'start_periods=1:start_duration=0.2:start_threshold=-40dB:'
+    'stop_periods=-1:stop_duration=0.3:stop_threshold=-40dB,'
+    'silenceremove=start_periods=0:start_duration=0:start_threshold=-40dB:'
+    'detection=peak'
+)
+
+def preprocess_audio(input_file, output_file, metrics=None, offsets=None, legacy=False):
+    """
+    Preprocess audio to 16kHz mono WAV and trim non-speech (vad.py).
+    This dramatically improves WhisperX performance.
+    The kept regions (the offset map that maps transcript times back to the original
+    audio) go into offsets if given; the caller saves them with the transcript it makes
+    (vad.save_offsets). legacy=True trims with the old ffmpeg filter instead, for
+    transcripts made before the offset maps.
+    Returns True if successful. Durations (and ffmpeg's CPU) go into metrics if given.
+    """
+    if legacy:
+        return preprocess_legacy(input_file, output_file, metrics)
+    
+    # ffmpeg only decodes; speech detection runs in-process on the samples
+    cmd = (
+        f'ffmpeg -i "{input_file}" '
+        f'-ar 16000 -ac 1 -c:a pcm_s16le '
+        f'-y "{output_file}" 2>&1'
+    )
+    
+    print(f"   🔧 Preprocessing (16kHz mono + speech detection)...", flush=True)
+    result, _ = run_measured(cmd, metrics, shell=True, capture_output=True, text=True)
+    
+    if result.returncode != 0 or not Path(output_file).exists():
+        print(f"   ⚠️  Preprocessing failed, will use original file")
+        return False
+    
+    trimmed = vad.trim_file(output_file) if vad.available() else None
+    if trimmed is None:
+        print(f"   ✅ Preprocessed (no speech detection - numpy not available)")
+        return True
+    original_duration, processed_duration, regions = trimmed
+    if offsets is not None:
+        offsets.update(original_seconds=original_duration, kept_seconds=processed_duration, regions=regions)
+    time_saved = original_duration - processed_duration
+    if metrics is not None:
+        metrics.update(audio_seconds=original_duration, processed_seconds=processed_duration,
+                       silence_removed_s=max(0, time_saved), speech_regions=len(regions))
+    
+    if time_saved > 0:
+        percent_saved = (time_saved / original_duration) * 100
+        mins_saved, secs_saved = divmod(int(time_saved), 60)
+        if mins_saved > 0:
+            time_saved_str = f"{mins_saved}m {secs_saved}s"
+        else:
+            time_saved_str = f"{secs_saved}s"
+        
+        orig_mins, orig_secs = divmod(int(original_duration), 60)
+        proc_mins, proc_secs = divmod(int(processed_duration), 60)
+        print(f"   ✅ Removed {time_saved_str} of non-speech ({percent_saved:.1f}%) • {orig_mins}:{orig_secs:02d} → {proc_mins}:{proc_secs:02d}")
+    else:
+        print(f"   ✅ Preprocessed (minimal silence detected)")
+    return True
+
+def preprocess_legacy(input_file, output_file, metrics=None):
+    """16kHz mono WAV trimmed with LEGACY_SILENCE_FILTER. Returns True if successful."""
+    cmd = f'ffmpeg -i "{input_file}" -ar 16000 -ac 1 -af "{LEGACY_SILENCE_FILTER}" -y "{output_file}" 2>&1'
+    print(f"   🔧 Preprocessing (16kHz mono + silenceremove, as for older transcripts)...", flush=True)
+    result, _ = run_measured(cmd, metrics, shell=True, capture_output=True, text=True)
+    if result.returncode != 0 or not Path(output_file).exists():
+        print(f"   ⚠️  Preprocessing failed")
+        return False
+    return True
+
+def preprocess_for_transcript(input_file, output_file, stem):
+    """Re-make the preprocessed audio an existing transcript was made from:
+    the VAD trim if it has an offset map, else the legacy filter."""
+    return preprocess_audio(input_file, output_file, legacy=vad.load_offsets(stem) is None)
+
+def recover_temp_files(root_dir):
+    """Clean up after an interrupted transcription run.
+
+    A complete temp_<name>.json whose final <name>.json is missing means WhisperX
+    finished but the rename never happened, so keep that work; anything else
+    (half-written JSON, preprocessed temp_*.wav) is deleted.
+
+    Every run holds a shared lock on .cache/transcribe.lock from here until it
+    exits, and only cleans up when no other run holds it - the temp files of a
+    concurrent run are its working files, not leftovers.
+    """
+    global _run_lock
+    lock_path = Path(root_dir) / RUN_LOCK
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    _run_lock = open(lock_path, 'a')
+    try:
+        fcntl.flock(_run_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        fcntl.flock(_run_lock, fcntl.LOCK_SH)
+        print("   ⏳ Another transcription run is active - leaving temp files alone")
+        return
+    try:
+        for temp_json in Path(root_dir).glob("temp_*.json"):
+            final_json = temp_json.with_name(temp_json.name[len("temp_"):])
+            try:
+                with open(temp_json, 'r') as f:
+                    json.load(f)
+                complete = True
+            except (OSError, ValueError):
+                complete = False
+            if complete and not final_json.exists():
+                temp_json.rename(final_json)
+                print(f"   ♻️  Recovered finished transcript: {final_json.name}")
+            else:
+                temp_json.unlink()
+        for temp_wav in Path(root_dir).glob("temp_*.wav"):
+            temp_wav.unlink()
+            print(f"   🧹 Removed leftover {temp_wav.name}")
+    finally:
+        fcntl.flock(_run_lock, fcntl.LOCK_SH)
+
+def whisperx_command(input_file, output_dir, model="large-v3", threads=None):
+    """Build the WhisperX CLI command that writes <input stem>.json into output_dir.
+    Speakers are not detected here - see diarize.py. With ALIGNMENT=lazy the
+    word alignment pass is skipped too (word timings come later from align.py).
+    threads caps torch's CPU thread pool (default: torch's own choice).
+    Runs under cProfile when profiling is enabled."""
+    cmd = (
+        f'{profiling.python_prefix("whisperx-" + Path(input_file).stem)} -m whisperx "{input_file}" --model {model} --compute_type int8 --device cpu '
+        f'--output_dir "{output_dir}" --output_format json --language en'
+    )
+    if alignment_mode() == 'lazy':
+        cmd += ' --no_align'
+    if threads:
+        cmd += f' --threads {threads}'
+    return cmd
+
+def diarization_mode():
+    """When speakers are detected, from DIARIZATION in .env: now (right after
+    transcription, the default), lazy (just before RAW-TEXT.md is compiled) or off."""
+    mode = os.getenv('DIARIZATION', 'now').strip().lower()
+    return mode if mode in DIARIZATION_MODES else 'now'
+
+def alignment_mode():
+    """When word timings are computed, from ALIGNMENT in .env: now (by WhisperX
+    while transcribing, the default) or lazy (on demand with align.py)."""
+    mode = os.getenv('ALIGNMENT', 'now').strip().lower()
+    return mode if mode in ALIGNMENT_MODES else 'now'
+
+def diarize_command(*args):
+    """Shell command running diarize.py with args (profiled when profiling is enabled)."""
+    return shlex.join(profiling.script_command(SCRIPTS_DIR / "diarize.py", *args))
+
+def get_transcript(json_path):
+    """Extract clean transcript from JSON."""
+    try:
+        segments, _ = load_segments(json_path)
+        return ' '.join([seg['text'].strip() for seg in segments])
+    except:
+        return "Error reading transcript"
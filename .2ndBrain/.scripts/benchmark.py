@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmarks on a synthetic vault.
+
+Generates a vault of configurable size (notes in 1-Raw/md, 2-Lists, 3-Memos,
+4-Wisdom, WhisperX-shaped transcripts, text images rendered with PIL, short
+synthetic audio) from a fixed seed, then times the real code paths against
+it: init_vector_db(), semantic_search(), create_raw_text(),
+json_to_markdown(), OCR and audio preprocessing. Results are compared with a
+stored baseline so regressions show up offline, without a real vault.
+
+Usage: python3 .2ndBrain/.scripts/benchmark.py [--size small|medium|large] [--repeat N]
+                                               [--save-baseline] [--only CASE ...] [--json]
+       python3 .2ndBrain/.scripts/benchmark.py generate DIR [--size ...]   (just build a vault)
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import math
+import platform
+import random
+import shutil
+import socket
+import statistics
+import struct
+import sys
+import time
+import wave
+from pathlib import Path
+
+import metrics
+import transcript_store
+import vad
+from catalog import root_files
+from metrics import REGRESSION_FACTOR
+
+BASE_PATH = Path(__file__).parent.parent.parent  # Go up to 2nd Brain root
+SCRIPTS_DIR = Path(__file__).parent
+BENCH_DIR = BASE_PATH / ".cache" / "benchmarks"
+
+SIZES = {
+    "small": {"notes": 60, "transcripts": 6, "images": 4, "audio": 1, "queries": 5},
+    "medium": {"notes": 600, "transcripts": 40, "images": 20, "audio": 3, "queries": 20},
+    "large": {"notes": 5000, "transcripts": 200, "images": 80, "audio": 8, "queries": 50},
+}
+# Differences below this are timer/scheduler noise, not regressions
+NOISE_FLOOR_S = 0.01
+NOTE_DIRS = ["1-Raw/md", "2-Lists", "3-Memos", "4-Wisdom"]
+
+WORDS = (
+    "morning routine habit sleep coffee focus project deadline meeting client budget "
+    "invoice garden recipe bread running knee doctor travel flight hotel passport "
+    "book chapter idea startup pricing customer feedback design prototype launch "
+    "family birthday gift music guitar practice language spanish grammar lesson "
+    "investment savings tax receipt apartment lease repair plumber weekend hike "
+    "meditation journal gratitude reflection goal quarter review energy walk"
+).split()
+
+# ============================================================
+# Synthetic vault
+# ============================================================
+
+def sentence(rng, low=6, high=16):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(low, high))]
+    return " ".join(words).capitalize() + "."
+
+def paragraph(rng, sentences=5):
+    return " ".join(sentence(rng) for _ in range(rng.randint(2, sentences)))
+
+def note_text(rng, title):
+    parts = [f"# {title}\n"]
+    for _ in range(rng.randint(1, 4)):
+        parts.append(f"## {sentence(rng, 2, 4)[:-1]}\n\n{paragraph(rng)}\n")
+        parts.append("".join(f"- {sentence(rng, 3, 8)}\n" for _ in range(rng.randint(0, 5))))
+    return "\n".join(parts)
+
+def whisperx_json(rng, segments):
+    """A transcript shaped like WhisperX --diarize --output_format json."""
+    data = {"segments": [], "word_segments": [], "language": "en"}
+    clock = 0.0
+    for _ in range(segments):
+        speaker = f"SPEAKER_{rng.randint(0, 2):02d}"
+        words = []
+        start = clock
+        for word in sentence(rng, 4, 18).split():
+            length = rng.uniform(0.15, 0.6)
+            words.append({"word": word, "start": round(clock, 3), "end": round(clock + length, 3),
+                          "score": round(rng.uniform(0.5, 1.0), 3), "speaker": speaker})
+            clock += length + rng.uniform(0.0, 0.2)
+        data["segments"].append({
+            "start": round(start, 3), "end": round(clock, 3), "speaker": speaker,
+            "text": " " + " ".join(w["word"] for w in words), "words": words,
+        })
+        data["word_segments"].extend(words)
+        clock += rng.uniform(0.2, 1.5)
+    return data
+
+def render_text_image(rng, path):
+    """Black text on white, large enough for Tesseract. Returns False without PIL."""
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        return False
+    try:
+        font = ImageFont.load_default(size=28)
+    except TypeError:
+        font = ImageFont.load_default()  # Pillow < 10.1
+    lines = [sentence(rng, 3, 6) for _ in range(rng.randint(3, 8))]
+    image = Image.new("RGB", (1000, 40 + 40 * len(lines)), "white")
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((20, 20 + 40 * i), line, fill="black", font=font)
+    image.save(path)
+    return True
+
+def write_audio(rng, path, seconds):
+    """16 kHz mono WAV: tone bursts separated by silence (exercises silence removal)."""
+    rate = 16000
+    frames = bytearray()
+    t = 0.0
+    while t < seconds:
+        burst = rng.uniform(0.5, 2.0)
+        freq = rng.uniform(120, 400)
+        for n in range(int(burst * rate)):
+            frames += struct.pack("<h", int(8000 * math.sin(2 * math.pi * freq * n / rate)))
+        gap = rng.uniform(0.3, 1.5)
+        frames += b"\x00\x00" * int(gap * rate)
+        t += burst + gap
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(bytes(frames))
+
+def generate_vault(root, notes, transcripts, images, audio, seed=0, **_):
+    """Build a deterministic synthetic vault at root (replacing any previous one)."""
+    root = Path(root)
+    if root.exists():
+        shutil.rmtree(root)
+    rng = random.Random(seed)
+
+    # Scripts resolve the vault from their own path, so link them in
+    (root / ".2ndBrain").mkdir(parents=True)
+    (root / ".2ndBrain" / ".scripts").symlink_to(SCRIPTS_DIR.resolve(), target_is_directory=True)
+
+    for i in range(notes):
+        folder = root / NOTE_DIRS[i % len(NOTE_DIRS)]
+        folder.mkdir(parents=True, exist_ok=True)
+        title = sentence(rng, 2, 5)[:-1]
+        (folder / f"note-{i:05d}.md").write_text(note_text(rng, title), encoding="utf-8")
+
+    # Root inbox: transcripts (with placeholder .m4a, already transcribed), markdown, images
+    for i in range(transcripts):
+        with open(root / f"memo-{i:04d}.json", "w") as f:
+            json.dump(whisperx_json(rng, rng.randint(10, 80)), f)
+        (root / f"memo-{i:04d}.m4a").touch()
+    for i in range(max(1, notes // 50)):
+        (root / f"inbox-{i:03d}.md").write_text(note_text(rng, f"Inbox {i}"), encoding="utf-8")
+
+    rendered = [f"scan-{i:03d}.png" for i in range(images) if render_text_image(rng, root / f"scan-{i:03d}.png")]
+    if rendered:
+        (root / "scans.md").write_text(
+            "".join(f"![[{name}]]\n" for name in rendered), encoding="utf-8")
+
+    if audio:
+        (root / "bench-audio").mkdir()
+        for i in range(audio):
+            write_audio(rng, root / "bench-audio" / f"clip-{i:02d}.wav", rng.uniform(20, 60))
+
+    return root
+
+# ============================================================
+# Cases
+# ============================================================
+
+class Skip(Exception):
+    """A case that cannot run here (missing dependency or binary)."""
+
+def load_script(vault, filename):
+    """Import a script through the vault's .scripts link, so it works on that vault."""
+    path = vault / ".2ndBrain" / ".scripts" / filename
+    spec = importlib.util.spec_from_file_location(f"bench_{filename[:-3].replace('-', '_')}", path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except ImportError as e:
+        raise Skip(f"missing dependency: {e.name or e}")
+    return module
+
+def root_inputs(vault):
+    files = root_files(vault)
+    return files['m4a'], sorted(files['md'] + files['ocr']), files['image'], files['ocr']
+
+def case_json_to_markdown(vault, params):
+    module = load_script(vault, "json-to-markdown.py")
+    files = root_files(vault)['json']
+    def run():
+        for json_file in files:
+            module.json_to_markdown(json_file)
+    return run, None, len(files)
+
+def case_raw_text_cold(vault, params):
+    module = load_script(vault, "compile-raw-text.py")
+    inputs = root_inputs(vault)
+    def setup():
+        shutil.rmtree(vault / ".cache" / "raw-text", ignore_errors=True)
+    def run():
+        module.create_raw_text(*inputs, vault, vault / "RAW-TEXT.md")
+    return run, setup, len(inputs[0]) + len(inputs[1])
+
+def case_raw_text_warm(vault, params):
+    module = load_script(vault, "compile-raw-text.py")
+    inputs = root_inputs(vault)
+    def setup():
+        module.create_raw_text(*inputs, vault, vault / "RAW-TEXT.md")
+    def run():
+        module.create_raw_text(*inputs, vault, vault / "RAW-TEXT.md")
+    return run, setup, len(inputs[0]) + len(inputs[1])
+
+def case_init_vector_db(vault, params):
+    module = load_script(vault, "init-vector-db.py")
+    def setup():
+        shutil.rmtree(vault / ".chroma", ignore_errors=True)
+    return module.init_vector_db, setup, params["notes"]
+
+def case_semantic_search(vault, params):
+    module = load_script(vault, "semantic-search.py")
+    if not (vault / ".chroma").exists():
+        load_script(vault, "init-vector-db.py").init_vector_db()
+    rng = random.Random(params["seed"])
+    queries = [sentence(rng, 2, 5) for _ in range(params["queries"])]
+    def run():
+        for query in queries:
+            if not module.semantic_search(query):
+                raise RuntimeError("semantic_search failed")
+    return run, None, len(queries)
+
+def case_ocr(vault, params):
+    scans = vault / "scans.md"
+    if not scans.exists():
+        raise Skip("no images generated (PIL missing)")
+    if shutil.which("tesseract") is None:
+        raise Skip("tesseract not installed")
+    module = load_script(vault, "ocr-images.py")
+    def run():
+        if not module.process_markdown_with_ocr(scans):
+            raise RuntimeError("OCR failed")
+    return run, None, params["images"]
+
+def case_preprocess(vault, params):
+    clips = sorted((vault / "bench-audio").glob("clip-*.wav"))
+    if not clips:
+        raise Skip("no audio generated")
+    if shutil.which("ffmpeg") is None:
+        raise Skip("ffmpeg not installed")
+    from audio import preprocess_audio
+    def run():
+        for clip in clips:
+            if not preprocess_audio(clip, clip.with_name(f"temp_{clip.name}")):
+                raise RuntimeError(f"preprocessing failed: {clip.name}")
+    return run, None, len(clips)
+
+CASES = {
+    "json-to-markdown": case_json_to_markdown,
+    "raw-text-cold": case_raw_text_cold,
+    "raw-text-warm": case_raw_text_warm,
+    "ocr": case_ocr,
+    "preprocess": case_preprocess,
+    "init-vector-db": case_init_vector_db,
+    "semantic-search": case_semantic_search,
+}
+
+def run_case(name, vault, params, repeat):
+    """Median/min wall time over `repeat` timed runs (setup is not timed)."""
+    quiet = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(quiet):
+            run, setup, items = CASES[name](vault, params)
+            times = []
+            for _ in range(repeat):
+                if setup:
+                    setup()
+                start = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start)
+    except Skip as e:
+        return {"status": "skipped", "reason": str(e)}
+    except Exception as e:
+        return {"status": "error", "reason": f"{type(e).__name__}: {e}"}
+    median = statistics.median(times)
+    return {
+        "status": "ok",
+        "median_s": round(median, 5),
+        "min_s": round(min(times), 5),
+        "runs_s": [round(t, 5) for t in times],
+        "items": items,
+        "items_per_sec": round(items / median, 3) if items and median > 0 else None,
+    }
+
+# ============================================================
+# Baselines
+# ============================================================
+
+def baseline_path(size):
+    return BENCH_DIR / f"baseline-{size}.json"
+
+def compare(results, baseline):
+    """Cases whose median is REGRESSION_FACTOR slower than the baseline's."""
+    regressions = []
+    for name, result in results["cases"].items():
+        before = baseline.get("cases", {}).get(name, {})
+        if result["status"] == "ok" and before.get("status") == "ok" and before["median_s"] > 0:
+            ratio = result["median_s"] / before["median_s"]
+            if ratio > REGRESSION_FACTOR and result["median_s"] - before["median_s"] > NOISE_FLOOR_S:
+                regressions.append((name, result["median_s"], before["median_s"], ratio))
+    return regressions
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "generate":
+        parser = argparse.ArgumentParser(prog="benchmark.py generate", description="Build a synthetic vault.")
+        parser.add_argument("dir")
+        parser.add_argument("--size", choices=SIZES, default="small")
+        parser.add_argument("--seed", type=int, default=0)
+        for key in SIZES["small"]:
+            parser.add_argument(f"--{key}", type=int)
+        args = parser.parse_args(sys.argv[2:])
+        params = {k: getattr(args, k) if getattr(args, k) is not None else v for k, v in SIZES[args.size].items()}
+        vault = generate_vault(args.dir, seed=args.seed, **params)
+        print(f"✅ Synthetic vault ({args.size}, seed {args.seed}): {vault}")
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark the vault scripts on a synthetic vault.")
+    parser.add_argument("--size", choices=SIZES, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=CASES, help="run only these cases")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    for key in SIZES["small"]:
+        parser.add_argument(f"--{key}", type=int, help=f"override the size's {key} count")
+    args = parser.parse_args()
+
+    params = {k: getattr(args, k) if getattr(args, k) is not None else v for k, v in SIZES[args.size].items()}
+    params["seed"] = args.seed
+    vault = BENCH_DIR / "vaults" / f"{args.size}-{args.seed}"
+
+    print(f"🏗️  Generating {args.size} vault ({params['notes']} notes, {params['transcripts']} transcripts, "
+          f"{params['images']} images, {params['audio']} audio clips)...")
+    generate_vault(vault, **params)
+
+    # Keep stage metrics and transcript stores of benchmark runs out of the real vault
+    metrics.METRICS_PATH = vault / ".cache" / "metrics" / "metrics.jsonl"
+    transcript_store.STORE_DIR = vault / ".cache" / "transcripts"
+    vad.OFFSETS_DIR = vault / ".cache" / "vad"
+
+    results = {
+        "ts": time.time(),
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "size": args.size,
+        "params": params,
+        "repeat": args.repeat,
+        "cases": {},
+    }
+    for name in args.only or CASES:
+        print(f"⏱️  {name}...", flush=True)
+        results["cases"][name] = run_case(name, vault, params, args.repeat)
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    results_dir = BENCH_DIR / "results"
+    results_dir.mkdir(exist_ok=True)
+    with open(results_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-{args.size}.json", "w") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if baseline_path(args.size).exists():
+        with open(baseline_path(args.size), "r") as f:
+            baseline = json.load(f)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"\n📊 Benchmark results ({args.size}, median of {args.repeat})")
+        print("=" * 72)
+        for name, result in results["cases"].items():
+            if result["status"] != "ok":
+                print(f"   {name:<18} {result['status']}: {result['reason']}")
+                continue
+            line = f"   {name:<18} {result['median_s']:>9.3f}s"
+            if result["items_per_sec"]:
+                line += f" {result['items_per_sec']:>10.1f} items/s"
+            before = (baseline or {}).get("cases", {}).get(name, {})
+            if before.get("status") == "ok":
+                line += f"   baseline {before['median_s']:.3f}s ({result['median_s'] / before['median_s']:.2f}x)"
+            print(line)
+
+    if args.save_baseline:
+        with open(baseline_path(args.size), "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Saved baseline: {baseline_path(args.size)}")
+        return
+
+    if baseline is None:
+        print(f"\n💡 No baseline yet - run with --save-baseline to store one")
+        return
+    regressions = compare(results, baseline)
+    if regressions:
+        print(f"\n⚠️  Regressions against baseline (> {REGRESSION_FACTOR}x):")
+        for name, now, before, ratio in regressions:
+            print(f"   {name}: {now:.3f}s vs {before:.3f}s ({ratio:.2f}x)")
+        sys.exit(1)
+    print(f"\n✅ No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
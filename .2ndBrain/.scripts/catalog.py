@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Shared catalog of the files in the vault.
+
+One recursive os.scandir pass over the vault classifies every file (audio,
+markdown, OCR output, PDF, image, JSON) and records its size, mtime and
+SHA-256 in .cache/catalog.sqlite. Later passes only re-hash files whose size
+or mtime changed and drop rows for files that are gone, so every script asks
+the catalog instead of running its own series of globs - and notes in nested
+subfolders of the stage folders are found too.
+
+Hidden folders (.2ndBrain, .chroma, .cache, .git, ...) are not scanned.
+
+Usage: python3 .2ndBrain/.scripts/catalog.py   (refresh and print a summary)
+"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from pathlib import Path
+
+BASE_PATH = Path(__file__).parent.parent.parent  # Go up to 2nd Brain root
+SYSTEM_FILES = ['RAW-TEXT.md', 'PROCESSING-PLAN.md']
+NOTE_FOLDERS = ['1-Raw/md', '2-Lists', '3-Memos', '4-Wisdom']
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+SKIP_DIRS = {'__pycache__', 'node_modules'}
+CHUNK_SIZE = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir_kind ON files (dir, kind);
+"""
+
+def catalog_path(root):
+    return Path(root) / ".cache" / "catalog.sqlite"
+
+def classify(name, rel_dir):
+    """Kind of a file from its name: m4a, md, ocr, system, pdf, image, json or other."""
+    suffix = os.path.splitext(name)[1].lower()
+    if suffix == '.m4a':
+        return 'm4a'
+    if suffix == '.md':
+        if name.endswith('-ocr.md'):
+            return 'ocr'
+        return 'system' if rel_dir == '' and name in SYSTEM_FILES else 'md'
+    if suffix == '.pdf':
+        return 'pdf'
+    if suffix in IMAGE_EXTENSIONS:
+        return 'image'
+    if suffix == '.json':
+        return 'json'
+    return 'other'
+
+def walk(root):
+    """(relative dir, DirEntry) for every visible file under root, in one scandir pass."""
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(root, rel_dir)) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS:
+                            stack.append(f"{rel_dir}/{entry.name}" if rel_dir else entry.name)
+                    elif entry.is_file():
+                        yield rel_dir, entry
+        except OSError:
+            continue
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def connect(root=None):
+    path = catalog_path(root or BASE_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.executescript(SCHEMA)
+    return conn
+
+def refresh(root=None):
+    """Bring the catalog up to date. Returns (added, changed, removed, total)."""
+    root = Path(root or BASE_PATH)
+    with closing(connect(root)) as conn:
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in conn.execute("SELECT path, size, mtime_ns FROM files")}
+        rows = []
+        seen = set()
+        added = changed = 0
+        for rel_dir, entry in walk(root):
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            seen.add(rel)
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            old = known.get(rel)
+            if old == (stat.st_size, stat.st_mtime_ns):
+                continue
+            try:
+                digest = file_sha256(entry.path)
+            except OSError:
+                continue
+            rows.append((rel, rel_dir, classify(entry.name, rel_dir), stat.st_size, stat.st_mtime_ns, digest))
+            if old is None:
+                added += 1
+            else:
+                changed += 1
+        removed = [(path,) for path in known if path not in seen]
+
+        conn.execute("BEGIN")
+        conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.executemany("DELETE FROM files WHERE path = ?", removed)
+        conn.commit()
+    return added, changed, len(removed), len(seen)
+
+def sha256_of(path, root=None):
+    """SHA-256 of a file from the catalog, hashing it only when the catalog has no
+    current entry for it (not scanned yet, changed since, or outside the vault)."""
+    root = Path(root or BASE_PATH)
+    path = Path(path)
+    stat = path.stat()
+    try:
+        rel = path.resolve().relative_to(root.resolve()).as_posix()
+    except ValueError:
+        return file_sha256(path)
+    with closing(connect(root)) as conn:
+        row = conn.execute("SELECT size, mtime_ns, sha256 FROM files WHERE path = ?", (rel,)).fetchone()
+    if row is not None and (row[0], row[1]) == (stat.st_size, stat.st_mtime_ns):
+        return row[2]
+    return file_sha256(path)
+
+def query(kinds=None, folder='', recursive=False, root=None, rescan=True):
+    """Catalogued files of the given kinds in folder ('' = vault root), sorted, as paths under root."""
+    root = Path(root or BASE_PATH)
+    if rescan:
+        refresh(root)
+    clauses, params = [], []
+    if kinds:
+        kinds = [kinds] if isinstance(kinds, str) else list(kinds)
+        clauses.append(f"kind IN ({', '.join('?' * len(kinds))})")
+        params.extend(kinds)
+    folder = str(folder).strip('/')
+    if recursive and folder:
+        clauses.append("(dir = ? OR dir LIKE ? ESCAPE '\\')")
+        escaped = folder.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        params.extend([folder, f"{escaped}/%"])
+    elif not recursive:
+        clauses.append("dir = ?")
+        params.append(folder)
+    sql = "SELECT path FROM files"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    with closing(connect(root)) as conn:
+        return [root / path for (path,) in conn.execute(sql + " ORDER BY path", params)]
+
+def root_files(root=None):
+    """Files waiting at the vault root by kind: m4a, md, ocr, pdf, image, json."""
+    root = Path(root or BASE_PATH)
+    refresh(root)
+    found = {kind: [] for kind in ('m4a', 'md', 'ocr', 'pdf', 'image', 'json')}
+    for path in query(list(found), '', root=root, rescan=False):
+        found[classify(path.name, '')].append(path)
+    return found
+
+def note_files(root=None, folders=NOTE_FOLDERS):
+    """Markdown notes in the stage folders, including nested subfolders."""
+    root = Path(root or BASE_PATH)
+    refresh(root)
+    notes = []
+    for folder in folders:
+        notes.extend(query(['md', 'ocr'], folder, recursive=True, root=root, rescan=False))
+    return notes
+
+def main():
+    added, changed, removed, total = refresh()
+    print(f"✅ Catalog up to date: {total} files ({added} new, {changed} changed, {removed} removed)")
+    with closing(connect()) as conn:
+        for kind, count, size in conn.execute("SELECT kind, COUNT(*), SUM(size) FROM files GROUP BY kind ORDER BY kind"):
+            print(f"   {kind:<7} {count:>6} files  {size / (1024 * 1024):>9.1f} MB")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
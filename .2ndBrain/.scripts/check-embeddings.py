@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Check a faster embedding backend against the fp32 model on this vault.
+
+A sample of the vault's notes is embedded with the fp32 (torch) model and
+with the candidate backend (int8 or onnx). The report compares:
+  - per-note cosine similarity between the two embeddings of each note
+  - recall@k of nearest-note searches done entirely with the candidate
+    (a vault re-indexed on it) and of candidate queries against fp32
+    vectors (an index not rebuilt yet), both against fp32's own top-k
+  - encoding throughput of both
+
+The result is saved in .cache/embedding-check.json. EMBEDDING_BACKEND in
+.env is only honoured for a backend whose last check passed; otherwise the
+scripts keep using fp32.
+
+Usage: python3 .2ndBrain/.scripts/check-embeddings.py [--backend int8|onnx] [--sample 500] [--k 10]
+           [--min-cosine 0.99] [--min-recall 0.9] [--output report.md]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from catalog import note_files
+from metrics import stage_metrics
+from related_notes import top_k
+from vector_db import BASE_PATH, CHECK_PATH, EMBEDDING_BACKENDS, MODEL_NAME, embedding_backend, load_model
+
+SEED = 0
+BATCH_SIZE = 32
+
+def sample_notes(size, base_path=BASE_PATH):
+    """Contents of up to size non-empty notes, sampled with a fixed seed."""
+    files = note_files(base_path)
+    rng = np.random.default_rng(SEED)
+    order = rng.permutation(len(files))
+    texts = []
+    for i in order:
+        try:
+            with open(files[i], 'r', encoding='utf-8') as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+        if content.strip():
+            texts.append(content)
+            if len(texts) >= size:
+                break
+    return texts
+
+def encode(model, texts):
+    """(unit embeddings, notes per second)."""
+    started = time.perf_counter()
+    vectors = model.encode(texts, batch_size=BATCH_SIZE, normalize_embeddings=True, convert_to_numpy=True)
+    elapsed = time.perf_counter() - started
+    return np.asarray(vectors, dtype=np.float32), len(texts) / max(elapsed, 1e-9)
+
+def recall(expected, found):
+    k = expected.shape[1]
+    hits = sum(len(set(e.tolist()) & set(f.tolist())) for e, f in zip(expected, found))
+    return hits / (len(expected) * k) if k else 1.0
+
+def compare(reference, candidate, k):
+    """Agreement of candidate embeddings with the fp32 reference (rows = the same notes)."""
+    cosines = np.sum(reference * candidate, axis=1)
+    rows = np.arange(len(reference))
+    truth, _ = top_k(reference, reference, rows, k)
+    rebuilt, _ = top_k(candidate, candidate, rows, k)
+    mixed, _ = top_k(candidate, reference, rows, k)
+    return {
+        "mean_cosine": float(cosines.mean()),
+        "min_cosine": float(cosines.min()),
+        "recall_rebuilt": recall(truth, rebuilt),
+        "recall_mixed": recall(truth, mixed),
+    }
+
+def save_result(backend, result, check_path=CHECK_PATH):
+    try:
+        with open(check_path, 'r') as f:
+            results = json.load(f)
+    except (OSError, ValueError):
+        results = {}
+    results[backend] = result
+    check_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = check_path.with_name(check_path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    os.replace(tmp_path, check_path)
+
+def format_report(result, k):
+    status = "✅ passed" if result['passed'] else "❌ failed"
+    return "\n".join([
+        f"# Embedding backend check: {result['backend']}",
+        "",
+        f"{result['notes']} sampled notes, {MODEL_NAME}, recall@{k} against fp32 search.",
+        "",
+        "| metric | value | required |",
+        "|---|---|---|",
+        f"| mean cosine to fp32 | {result['mean_cosine']:.4f} | >= {result['min_cosine_required']:.2f} |",
+        f"| min cosine to fp32 | {result['min_cosine']:.4f} | - |",
+        f"| recall@{k}, re-indexed | {result['recall_rebuilt']:.3f} | >= {result['min_recall_required']:.2f} |",
+        f"| recall@{k}, fp32 index | {result['recall_mixed']:.3f} | >= {result['min_recall_required']:.2f} |",
+        f"| notes/s fp32 | {result['fp32_per_s']:.1f} | - |",
+        f"| notes/s {result['backend']} | {result['backend_per_s']:.1f} | - |",
+        f"| speedup | {result['speedup']:.2f}x | - |",
+        "",
+        f"{status} - " + (f"set EMBEDDING_BACKEND={result['backend']} in .env and re-index with init-vector-db.py"
+                         if result['passed'] else "the scripts keep using fp32"),
+    ]) + "\n"
+
+def main():
+    candidates = [b for b in EMBEDDING_BACKENDS if b != "torch"]
+    configured = embedding_backend()
+    parser = argparse.ArgumentParser(description="Compare a quantized/ONNX embedding backend with the fp32 model.")
+    parser.add_argument("--backend", choices=candidates, default=configured if configured != "torch" else "int8",
+                        help="backend to check (default: EMBEDDING_BACKEND, else int8)")
+    parser.add_argument("--sample", type=int, default=500, help="notes to embed (default: 500)")
+    parser.add_argument("--k", type=int, default=10, help="neighbours per query (default: 10)")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="required mean cosine to fp32 (default: 0.99)")
+    parser.add_argument("--min-recall", type=float, default=0.9, help="required recall@k (default: 0.9)")
+    parser.add_argument("--output", help="also write the report (markdown) here")
+    args = parser.parse_args()
+
+    texts = sample_notes(args.sample)
+    if len(texts) < 2:
+        print(f"⚠️  {len(texts)} note(s) in the vault - nothing to compare")
+        return
+    k = min(args.k, len(texts) - 1)
+    print(f"📐 Embedding {len(texts)} notes with fp32 and {args.backend}...")
+
+    with stage_metrics("check-embeddings", backend=args.backend, items=len(texts), unit="docs"):
+        reference, fp32_per_s = encode(load_model("torch"), texts)
+        candidate, backend_per_s = encode(load_model(args.backend, checked=False), texts)
+        result = compare(reference, candidate, k)
+
+    result.update({
+        "backend": args.backend,
+        "model": MODEL_NAME,
+        "notes": len(texts),
+        "k": k,
+        "fp32_per_s": fp32_per_s,
+        "backend_per_s": backend_per_s,
+        "speedup": backend_per_s / fp32_per_s,
+        "min_cosine_required": args.min_cosine,
+        "min_recall_required": args.min_recall,
+        "checked_at": datetime.now().isoformat(timespec='seconds'),
+    })
+    result["passed"] = (result['mean_cosine'] >= args.min_cosine
+                        and min(result['recall_rebuilt'], result['recall_mixed']) >= args.min_recall)
+    save_result(args.backend, result)
+
+    report = format_report(result, k)
+    print()
+    print(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f"💾 Saved: {args.output}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Compact (dimensionality-reduced) index of the note embeddings.
+
+Every note is stored in .chroma as a 384-dimension float vector, and the cost
+of a search grows with the vault. In compact mode a projection is fitted on
+the existing embeddings - PCA, or plain truncation to the first dimensions -
+and each note's reduced vector (float16) is kept in .cache/compact/notes.npz.
+semantic-search.py then scans the reduced vectors for the best candidates
+and re-scores only those with their full vectors from Chroma.
+
+Ranking by the reduced vectors: with P the projection and mu the mean,
+q . x = q . mu + (P q) . (P (x - mu)) + what PCA dropped, and q . mu is the
+same for every note, so the first pass only needs P q and the stored rows.
+
+New notes (embed-note.py) are projected with the fitted projection;
+init-vector-db.py refits it. Without notes.npz searches use the HNSW index.
+
+Usage: python3 .2ndBrain/.scripts/compact_index.py build [--dims 64] [--method pca|truncate]
+       python3 .2ndBrain/.scripts/compact_index.py report [--queries 200] [--k 10] [--output report.md]
+       python3 .2ndBrain/.scripts/compact_index.py drop
+"""
+
+import argparse
+import fcntl
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from metrics import stage_metrics
+from related_notes import load_embeddings, normalize, top_k
+from vector_db import BASE_PATH, DB_PATH, connect, notes_collection
+
+INDEX_PATH = BASE_PATH / ".cache" / "compact" / "notes.npz"
+DEFAULT_DIMS = 64
+METHODS = ("pca", "truncate")
+FIT_SAMPLE = 20000  # notes the PCA is fitted on
+RERANK_FACTOR = 5  # candidates re-scored per requested result
+MIN_CANDIDATES = 50
+SEED = 0
+
+def fit(vectors, dims, method="pca"):
+    """(mean, projection rows) reducing vectors to dims dimensions."""
+    dims = min(dims, vectors.shape[1])
+    if method == "truncate":
+        return np.zeros(vectors.shape[1], dtype=np.float32), np.eye(vectors.shape[1], dtype=np.float32)[:dims]
+    sample = vectors
+    if len(vectors) > FIT_SAMPLE:
+        sample = vectors[np.random.default_rng(SEED).choice(len(vectors), FIT_SAMPLE, replace=False)]
+    mean = sample.mean(axis=0)
+    _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+    return mean.astype(np.float32), vt[:dims].astype(np.float32)
+
+def reduce(vectors, mean, components):
+    return ((vectors - mean) @ components.T).astype(np.float16)
+
+def load_index(path=None):
+    """The stored compact index as a dict, or None if compact mode is off."""
+    path = Path(path or INDEX_PATH)
+    try:
+        with np.load(path) as data:
+            index = {key: data[key] for key in data.files}
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return None
+    index['ids'] = index['ids'].tolist()
+    index['method'] = str(index['method'])
+    return index
+
+@contextmanager
+def index_lock(path=None):
+    """Hold an exclusive lock on the compact index while updating it (waits for other writers)."""
+    path = Path(path or INDEX_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + '.lock'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def save_index(index, path=None):
+    path = Path(path or INDEX_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f"{path.stem}.", suffix='.tmp.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, ids=np.array(index['ids'], dtype=str), mean=index['mean'],
+                     components=index['components'], reduced=index['reduced'], method=np.array(index['method']))
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+def build(collection, dims=DEFAULT_DIMS, method="pca", path=None):
+    """Fit the projection on every note embedding and store the reduced vectors."""
+    with stage_metrics("compact-index", method=method, dims=dims, unit="notes") as m:
+        ids, _, vectors = load_embeddings(collection)
+        if not ids:
+            raise ValueError("the notes collection is empty - run init-vector-db.py first")
+        mean, components = fit(vectors, dims, method)
+        index = {"ids": ids, "mean": mean, "components": components,
+                 "reduced": reduce(vectors, mean, components), "method": method}
+        with index_lock(path):
+            save_index(index, path)
+        m['items'] = len(ids)
+    return index
+
+def add(ids, embeddings, path=None):
+    """Project new or re-embedded notes with the fitted projection (no-op when compact mode is off)."""
+    if not len(ids) or not Path(path or INDEX_PATH).exists():
+        return False
+    with index_lock(path):
+        index = load_index(path)
+        if index is None:
+            return False
+        rows = reduce(normalize(embeddings), index['mean'], index['components'])
+        position = {note_id: i for i, note_id in enumerate(index['ids'])}
+        new = [i for i, note_id in enumerate(ids) if note_id not in position]
+        for i, note_id in enumerate(ids):
+            if note_id in position:
+                index['reduced'][position[note_id]] = rows[i]
+        index['ids'] = index['ids'] + [ids[i] for i in new]
+        index['reduced'] = np.vstack([index['reduced'], rows[new]]) if new else index['reduced']
+        save_index(index, path)
+        return True
+
+def covers(index, collection):
+    """Whether the compact index holds exactly the notes of the collection."""
+    return (index is not None and len(index['ids']) == collection.count()
+            and set(index['ids']) == set(collection.get(include=[])['ids']))
+
+def search(index, collection, query_embedding, n_results, candidates=None, exclude=None):
+    """[(id, similarity, document, metadata)] best first: first pass on the reduced
+    vectors, then the top candidates re-scored with their full vectors.
+    exclude is a row of the compact index to leave out (a note used as query)."""
+    query = normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))
+    if 'scan' not in index:
+        index['scan'] = index['reduced'].astype(np.float32)
+    scores = index['scan'] @ (query @ index['components'].T)[0]
+    if exclude is not None:
+        scores[exclude] = -np.inf
+    count = min(len(scores), candidates or max(MIN_CANDIDATES, n_results * RERANK_FACTOR))
+    if count <= 0:
+        return []
+    best = np.argpartition(-scores, count - 1)[:count]
+    data = collection.get(ids=[index['ids'][i] for i in best], include=["embeddings", "documents", "metadatas"])
+    if not data['ids']:
+        return []
+    exact = normalize(data['embeddings']) @ query[0]
+    order = np.argsort(-exact, kind='stable')[:n_results]
+    documents = data['documents'] or [None] * len(data['ids'])
+    return [(data['ids'][i], float(exact[i]), documents[i], data['metadatas'][i]) for i in order]
+
+# ============================================================
+# Report
+# ============================================================
+
+def directory_bytes(path):
+    return sum(p.stat().st_size for p in Path(path).rglob('*') if p.is_file())
+
+def percentile_ms(latencies, q):
+    return float(np.percentile(latencies, q)) * 1000
+
+def measure(queries, truth, k, run):
+    """recall@k and latencies of run(query row) -> found row indexes."""
+    hits, latencies = 0, []
+    for q, expected in zip(queries, truth):
+        started = time.perf_counter()
+        found = run(q)
+        latencies.append(time.perf_counter() - started)
+        hits += len(set(found[:k]) & set(expected.tolist()))
+    return {"recall": hits / (len(queries) * k), "p50_ms": percentile_ms(latencies, 50),
+            "p95_ms": percentile_ms(latencies, 95)}
+
+def report(collection, index, n_queries=200, k=10, index_path=None):
+    """Markdown comparing the compact index with the full-dimension HNSW index."""
+    ids, _, vectors = load_embeddings(collection)
+    position = {note_id: i for i, note_id in enumerate(ids)}
+    k = min(k, len(ids) - 1)
+    queries = np.sort(np.random.default_rng(SEED).choice(len(ids), size=min(n_queries, len(ids)), replace=False))
+    truth, _ = top_k(vectors[queries], vectors, queries, k)
+    reduced = index['reduced'].astype(np.float32)
+    rows = {note_id: i for i, note_id in enumerate(index['ids'])}
+    row_to_note = [position.get(note_id, -1) for note_id in index['ids']]
+
+    def hnsw(q):
+        result = collection.query(query_embeddings=[vectors[q].tolist()], n_results=k + 1, include=["distances"])
+        return [position[i] for i in result['ids'][0] if i in position and position[i] != q]
+
+    def first_pass(q):
+        scores = reduced @ (vectors[q] @ index['components'].T)
+        scores[rows[ids[q]]] = -np.inf
+        return [row_to_note[i] for i in np.argsort(-scores)[:k]]
+
+    def reranked(q):
+        return [position[i] for i, _, _, _ in search(index, collection, vectors[q], k, exclude=rows[ids[q]])]
+
+    with stage_metrics("compact-report", items=len(queries), unit="queries", vectors=len(ids)):
+        results = [("full (HNSW, 384 dims)", measure(queries, truth, k, hnsw)),
+                (f"compact first pass ({index['components'].shape[0]} dims)", measure(queries, truth, k, first_pass)),
+                ("compact + rerank", measure(queries, truth, k, reranked))]
+
+    full_bytes = vectors.shape[0] * vectors.shape[1] * 4
+    compact_bytes = Path(index_path or INDEX_PATH).stat().st_size
+    lines = [
+        "# Compact index report",
+        "",
+        f"{len(ids)} notes, {len(queries)} sampled queries, recall@{k} against exact full-dimension search. "
+        f"Projection: {index['method']} to {index['components'].shape[0]} dims; "
+        f"rerank of {max(MIN_CANDIDATES, k * RERANK_FACTOR)} candidates.",
+        "",
+        "| search | recall@k | p50 ms | p95 ms |",
+        "|---|---|---|---|",
+    ]
+    for name, r in results:
+        lines.append(f"| {name} | {r['recall']:.3f} | {r['p50_ms']:.2f} | {r['p95_ms']:.2f} |")
+    lines += [
+        "",
+        "| index | size |",
+        "|---|---|",
+        f"| full vectors (float32) | {full_bytes / 1e6:.2f} MB |",
+        f"| .chroma on disk | {directory_bytes(DB_PATH) / 1e6:.2f} MB |",
+        f"| compact index (notes.npz) | {compact_bytes / 1e6:.2f} MB |",
+    ]
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Dimensionality-reduced first-pass index for semantic search.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="fit the projection and store reduced vectors (turns compact mode on)")
+    build_cmd.add_argument("--dims", type=int, default=DEFAULT_DIMS, help=f"reduced dimensions (default: {DEFAULT_DIMS})")
+    build_cmd.add_argument("--method", choices=METHODS, default="pca", help="projection (default: pca)")
+    report_cmd = sub.add_parser("report", help="index size, latency and recall against the full index")
+    report_cmd.add_argument("--queries", type=int, default=200, help="sampled queries (default: 200)")
+    report_cmd.add_argument("--k", type=int, default=10, help="neighbours per query (default: 10)")
+    report_cmd.add_argument("--output", type=Path, help="also write the report (markdown) here")
+    sub.add_parser("drop", help="delete the compact index (searches use HNSW again)")
+    args = parser.parse_args()
+
+    if args.command == "drop":
+        INDEX_PATH.unlink(missing_ok=True)
+        print("✅ Compact index removed - searches use the full HNSW index")
+        return
+
+    collection = notes_collection(connect())
+    if args.command == "build":
+        index = build(collection, args.dims, args.method)
+        print(f"✅ Compact index: {len(index['ids'])} notes, {args.method} to {index['components'].shape[0]} dims ({INDEX_PATH})")
+        return
+
+    index = load_index()
+    if index is None:
+        print("⚠️  No compact index - run: compact_index.py build")
+        return
+    if not covers(index, collection):
+        print("⚠️  The compact index is out of date - run: compact_index.py build")
+        return
+    if collection.count() < 2:
+        print(f"⚠️  {collection.count()} note(s) indexed - nothing to measure")
+        return
+    text = report(collection, index, args.queries, args.k)
+    print(text)
+    if args.output:
+        args.output.write_text(text, encoding='utf-8')
+        print(f"💾 Saved: {args.output}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -7,9 +7,17 @@ User must review and approve before AI proceeds to planning.
 Usage: python3 0-Second-Brain/scripts/compile-raw-text.py
 """
 
-import json
 import subprocess
 from pathlib import Path
+from dotenv import load_dotenv
+from audio import diarization_mode, diarize_command, run_command_with_progress
+from catalog import root_files
+from metrics import stage_metrics
+from raw_text import COMPILE_FOOTER, SectionCache, iter_raw_text_sections, ocr_outputs, write_raw_text
+from speculative import cancel_precompute, start_precompute
+
+# DIARIZATION (when speakers are detected) may be set in .env
+load_dotenv()
 
 def run_command(cmd):
     """Run a command silently."""
@@ -19,87 +27,31 @@ def run_command(cmd):
     except:
         return False
 
-def create_raw_text(m4a_files, md_files, image_files, root_dir):
-    """Compile ALL extracted text: transcripts with speakers, OCR, markdown content."""
-    output = "# 🗂️ Raw Text (Transcripts, Markdown, OCR)\n\n"
-    output += f"**Generated from {len(m4a_files)} audio, {len(md_files)} markdown, {len(image_files)} images**\n\n"
-    output += "---\n\n"
-    
-    # Audio transcripts - read directly from JSON to get speaker info (from root)
-    if m4a_files:
-        output += "## 🎵 Audio Transcripts\n\n"
-        for i, m4a_file in enumerate(m4a_files, 1):
-            json_file = root_dir / f"{m4a_file.stem}.json"
-            output += f"### [{i}] {m4a_file.name}\n\n"
-            
-            if json_file.exists():
-                try:
-                    with open(json_file, 'r') as f:
-                        data = json.load(f)
-                    
-                    segments = data.get('segments', [])
-                    if segments:
-                        current_speaker = None
-                        for seg in segments:
-                            speaker = seg.get('speaker', 'SPEAKER_00')
-                            text = seg.get('text', '').strip()
-                            
-                            # Show speaker label when speaker changes
-                            if speaker != current_speaker:
-                                output += f"\n**{speaker}:** "
-                                current_speaker = speaker
-                            
-                            output += text + " "
-                        output += "\n\n"
-                    else:
-                        output += "*No transcript available*\n\n"
-                except Exception as e:
-                    output += f"*Error reading transcript: {e}*\n\n"
-            else:
-                output += "*JSON file not found*\n\n"
-    
-    # Markdown files (exclude system files)
-    if md_files:
-        output += "## 📝 Markdown Files\n\n"
-        for i, md_file in enumerate(md_files, 1):
-            try:
-                with open(md_file, 'r') as f:
-                    content = f.read()
-                output += f"### [{i}] {md_file.name}\n{content}\n\n"
-            except:
-                output += f"### [{i}] {md_file.name}\nError reading\n\n"
-    
-    # OCR results (check for -ocr.md files)
-    ocr_files = list(root_dir.glob("*-ocr.md"))
-    if ocr_files:
-        output += "## 🖼️ OCR Extracted Text\n\n"
-        for i, ocr_file in enumerate(ocr_files, 1):
-            try:
-                with open(ocr_file, 'r') as f:
-                    content = f.read()
-                output += f"### [{i}] {ocr_file.name}\n{content}\n\n"
-            except:
-                output += f"### [{i}] {ocr_file.name}\nError reading\n\n"
-    
-    output += "---\n\n"
-    output += "**Next Step: Review this file, fix any transcription errors, then tell AI: 'approved'**\n"
-    output += "**AI will then read RAW-TEXT.md and create PROCESSING-PLAN.md using semantic search**\n"
-    return output
+def create_raw_text(m4a_files, md_files, image_files, ocr_files, root_dir, output_file):
+    """Compile ALL extracted text: transcripts with speakers, OCR, markdown content.
+    Sections are streamed to output_file as they are rendered."""
+    cache = SectionCache(root_dir / ".cache" / "raw-text")
+    sources = len(m4a_files) + len(md_files)
+    with stage_metrics("raw-text", items=sources, unit="sources") as m:
+        sections = iter_raw_text_sections(m4a_files, md_files, image_files, ocr_files, root_dir, COMPILE_FOOTER, cache)
+        write_raw_text(output_file, sections)
+        cache.save()
+        m.update(cache_hits=cache.hits, cache_misses=cache.misses)
+    if cache.hits or cache.misses:
+        print(f"   ♻️  Transcripts: {cache.hits} reused from cache, {cache.misses} re-rendered")
+    return output_file
 
 def main():
     root_dir = Path(".")
     
     print("📊 Scanning root directory...")
     
-    # Find all files at root
-    m4a_files = list(root_dir.glob("*.m4a"))
-    
-    # Exclude system markdown files
-    all_md_files = list(root_dir.glob("*.md"))
-    md_files = [f for f in all_md_files if f.name not in ['RAW-TEXT.md', 'PROCESSING-PLAN.md']]
-    
-    pdf_files = list(root_dir.glob("*.pdf"))
-    image_files = list(root_dir.glob("*.jpg")) + list(root_dir.glob("*.jpeg")) + list(root_dir.glob("*.png"))
+    # Find all files at root (one catalog pass; system markdown files are excluded)
+    files = root_files(root_dir)
+    m4a_files = files['m4a']
+    md_files = sorted(files['md'] + files['ocr'])
+    pdf_files = files['pdf']
+    image_files = files['image']
     
     print(f"🎵 Audio files (.m4a): {len(m4a_files)}")
     print(f"📝 Markdown files (.md): {len(md_files)}")
@@ -156,12 +108,15 @@ def main():
             cmd = f'python3 0-Second-Brain/scripts/ocr-images.py "{temp_md.name}"'
             run_command(cmd)
     
+    # DIARIZATION=lazy: speakers are detected now, only for transcripts that lack them
+    if m4a_files and diarization_mode() == 'lazy':
+        print(f"\n🗣️  Identifying speakers...")
+        if not run_command_with_progress(diarize_command("pending"), "Identifying speakers"):
+            print(f"   ⚠️  Speaker detection failed - transcripts are compiled without speakers")
+    
     # Compile all extracted text
     print(f"\n📋 Compiling all extracted text...")
-    raw_text = create_raw_text(m4a_files, md_files, image_files, root_dir)
-    output_file = Path("RAW-TEXT.md")
-    with open(output_file, 'w') as f:
-        f.write(raw_text)
+    output_file = create_raw_text(m4a_files, md_files, image_files, ocr_outputs(files, root_dir), root_dir, Path("RAW-TEXT.md"))
     
     print(f"✅ Saved: {output_file}")
     print(f"\n{'='*60}")
@@ -170,6 +125,9 @@ def main():
     print(f"📝 Review RAW-TEXT.md and fix any transcription errors")
     print(f"{'='*60}\n")
     
+    # Match RAW-TEXT items against the vault in the background while the human reviews
+    precompute = start_precompute(output_file)
+    
     # HARD-CODED HUMAN-IN-THE-LOOP: Cannot proceed without approval
     while True:
         approval = input("Type 'approved' to continue (or 'exit' to stop): ").strip().lower()
@@ -178,6 +136,7 @@ def main():
             print("🤖 Tell AI: 'approved' to continue\n")
             break
         elif approval == 'exit':
+            cancel_precompute(precompute)
             print("\n❌ Process cancelled. Review RAW-TEXT.md when ready.\n")
             exit(1)
         else:
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Find near-duplicate items across 2-Lists and 3-Memos in one pass.
+
+List and memo files are split into their bullet items (memos also count as
+whole documents), embedded in batches, and bucketed with random-hyperplane
+LSH: only items sharing a band of their signature are compared, so the vault
+is not searched pairwise. Candidate pairs are confirmed by exact cosine
+similarity and grouped into a consolidated report.
+
+Item embeddings are cached in .cache/dedupe/ by text and embedding model
+(and backend), so re-runs only embed new or edited items.
+
+Usage: python3 .2ndBrain/.scripts/dedupe.py [--threshold 0.9] [--output REPORT.md]
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from catalog import query
+from metrics import stage_metrics
+from vector_db import BASE_PATH, MODEL_NAME, active_backend, load_model
+
+CACHE_PATH = BASE_PATH / ".cache" / "dedupe" / "embeddings.npz"
+SOURCE_DIRS = ["2-Lists", "3-Memos"]
+
+# 28 bands x 12 hyperplanes: pairs at cosine 0.9 share a band with ~99% probability,
+# while 4096 buckets per band keep unrelated items apart
+BANDS = 28
+ROWS = 12
+SEED = 0
+PAIR_BLOCK = 65536  # candidate pairs scored per einsum
+
+BULLET = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+(?:\[[ xX]\]\s+)?(.*\S)\s*$')
+
+def normalize_text(text):
+    return re.sub(r'\s+', ' ', re.sub(r'[*_`~\[\]]', '', text)).strip().lower()
+
+def split_items(path, base_path=BASE_PATH):
+    """Bullet items of a markdown file as dicts (file, line, kind, text); memos also whole."""
+    items = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except (OSError, UnicodeDecodeError):
+        return items
+    rel = str(path.relative_to(base_path))
+    for line_no, line in enumerate(content.splitlines(), 1):
+        match = BULLET.match(line)
+        if match and len(normalize_text(match.group(1))) >= 3:
+            items.append({"file": rel, "line": line_no, "kind": "item", "text": match.group(1)})
+    if path.parent.name == "3-Memos" and content.strip():
+        items.append({"file": rel, "line": 1, "kind": "memo", "text": content})
+    return items
+
+def collect_items(base_path=BASE_PATH):
+    items = []
+    for folder in SOURCE_DIRS:
+        for path in query(['md', 'ocr'], folder, recursive=True, root=base_path):
+            items.extend(split_items(path, base_path))
+    return items
+
+def text_key(text, model_id):
+    """Cache key of an item: its text as embedded by model_id."""
+    return hashlib.sha1(f"{model_id}\0{text}".encode('utf-8')).hexdigest()
+
+def embed_items(items, model_loader=load_model, cache_path=CACHE_PATH, model_id=None):
+    """Unit embeddings for every item, embedding only texts not already cached.
+    model_id names what model_loader loads (default: the configured model and backend)."""
+    model_id = model_id or f"{MODEL_NAME}/{active_backend()}"
+    cache = {}
+    try:
+        with np.load(cache_path) as data:
+            cache = dict(zip(data['keys'].tolist(), data['vectors']))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        pass
+
+    keys = [text_key(item['text'], model_id) for item in items]
+    missing = sorted({k for k in keys if k not in cache})
+    if missing:
+        texts = {k: item['text'] for k, item in zip(keys, items)}
+        model = model_loader()
+        with stage_metrics("embed", items=len(missing), unit="items"):
+            vectors = model.encode([texts[k] for k in missing], batch_size=128,
+                                   normalize_embeddings=True, convert_to_numpy=True)
+        cache.update(zip(missing, vectors.astype(np.float32)))
+
+    used = sorted(set(keys))
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, prefix=f"{cache_path.stem}.", suffix='.tmp.npz')
+    with os.fdopen(fd, 'wb') as f:
+        np.savez(f, keys=np.array(used), vectors=np.array([cache[k] for k in used], dtype=np.float32).reshape(len(used), -1))
+    os.replace(tmp_path, cache_path)
+    return np.array([cache[k] for k in keys], dtype=np.float32).reshape(len(keys), -1), len(missing)
+
+def lsh_candidates(vectors, bands=BANDS, rows=ROWS, seed=SEED):
+    """Pair codes i * n + j (i < j) of items sharing at least one band of their hyperplane signature."""
+    n = len(vectors)
+    planes = np.random.default_rng(seed).standard_normal((vectors.shape[1], bands * rows)).astype(np.float32)
+    bits = (vectors @ planes) > 0
+    weights = 1 << np.arange(rows, dtype=np.int64)
+    codes = []
+    for band in range(bands):
+        keys = bits[:, band * rows:(band + 1) * rows] @ weights
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # Pair every item with the ones `step` places after it in the same bucket
+        step = 1
+        while step < n:
+            same = np.flatnonzero(sorted_keys[step:] == sorted_keys[:-step])
+            if not len(same):
+                break
+            a, b = order[same], order[same + step]
+            codes.append(np.minimum(a, b).astype(np.int64) * n + np.maximum(a, b))
+            step += 1
+    return np.unique(np.concatenate(codes)) if codes else np.empty(0, dtype=np.int64)
+
+def find_duplicates(items, vectors, threshold):
+    """Groups of near-duplicate items of the same kind, best first. Also returns
+    how many candidate pairs were checked."""
+    n = len(items)
+
+    # Identical text after normalisation is always a duplicate, whatever LSH says
+    by_text = {}
+    for i, item in enumerate(items):
+        by_text.setdefault((item['kind'], normalize_text(item['text'])), []).append(i)
+    exact = []
+    for group in by_text.values():
+        if len(group) > 1:
+            group = np.array(group, dtype=np.int64)
+            a, b = np.triu_indices(len(group), k=1)
+            exact.append(group[a] * n + group[b])
+    exact = np.unique(np.concatenate(exact)) if exact else np.empty(0, dtype=np.int64)
+
+    codes = np.union1d(lsh_candidates(vectors), exact)
+    left, right = codes // n, codes % n
+    kinds = np.array([item['kind'] == 'memo' for item in items])
+    same_kind = kinds[left] == kinds[right]
+    left, right = left[same_kind], right[same_kind]
+    if not len(left):
+        return [], 0
+    scores = np.concatenate([
+        np.einsum('ij,ij->i', vectors[left[i:i + PAIR_BLOCK]], vectors[right[i:i + PAIR_BLOCK]])
+        for i in range(0, len(left), PAIR_BLOCK)
+    ])
+    hits = (scores >= threshold) | np.isin(left * n + right, exact)
+
+    parent = list(range(n))
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    for a, b in zip(left[hits].tolist(), right[hits].tolist()):
+        parent[find(a)] = find(b)
+    best = {}
+    for a, score in zip(left[hits].tolist(), scores[hits].tolist()):
+        root = find(a)
+        best[root] = max(best.get(root, 0), score)
+
+    groups = {}
+    for i in range(n):
+        root = find(i)
+        if root in best:
+            groups.setdefault(root, []).append(i)
+    result = sorted(((best[root], members) for root, members in groups.items()), key=lambda g: -g[0])
+    return result, len(left)
+
+def format_report(items, groups, threshold):
+    lines = ["# 🧹 Near-Duplicate Report", "",
+             f"**{len(groups)} groups** of items at least {threshold:.0%} similar across {', '.join(SOURCE_DIRS)}", ""]
+    for n, (score, members) in enumerate(groups, 1):
+        kind = items[members[0]]['kind']
+        lines.append(f"## {n}. {'Memos' if kind == 'memo' else 'Items'} (up to {score:.1%} similar)")
+        lines.append("")
+        for i in members:
+            item = items[i]
+            if kind == "memo":
+                lines.append(f"- `{item['file']}`")
+            else:
+                lines.append(f"- `{item['file']}:{item['line']}` {item['text']}")
+        lines.append("")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate list items and memos.")
+    parser.add_argument("--threshold", type=float, default=0.9, help="cosine similarity (default 0.9)")
+    parser.add_argument("--output", help="write the report to this file instead of printing it")
+    args = parser.parse_args()
+
+    items = collect_items()
+    if len(items) < 2:
+        print("✅ Nothing to compare")
+        return
+
+    print(f"🔍 {len(items)} items from {', '.join(SOURCE_DIRS)}", file=sys.stderr)
+    vectors, embedded = embed_items(items)
+    with stage_metrics("dedupe", items=len(items), unit="items", embedded=embedded) as m:
+        groups, compared = find_duplicates(items, vectors, args.threshold)
+        m.update(candidate_pairs=compared, groups=len(groups))
+    print(f"   {embedded} newly embedded, {compared} candidate pairs checked "
+          f"(of {len(items) * (len(items) - 1) // 2} possible)", file=sys.stderr)
+
+    report = format_report(items, groups, args.threshold)
+    if args.output:
+        Path(args.output).write_text(report + "\n", encoding='utf-8')
+        print(f"✅ {len(groups)} duplicate groups written to {args.output}", file=sys.stderr)
+    else:
+        print(report)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Speaker diarization as its own stage, with a local index of known voices.
+
+WhisperX used to run pyannote inside every transcription (--diarize), so who
+spoke when could not be skipped, deferred or reused. Here it is a separate
+step on the preprocessed 16 kHz WAV:
+
+  - results (speaker turns plus one embedding per speaker) are cached in
+    .cache/diarization/<wav sha256>.json, so a re-run never redoes the work
+  - every speaker embedding is matched against .cache/diarization/voices.sqlite,
+    so a voice heard in earlier recordings keeps one label (VOICE_01, or the
+    name given with `name`) instead of a fresh SPEAKER_00 per file
+  - a memo whose sampled windows all sound like one well-known voice skips the
+    pyannote pipeline entirely and is labelled with that voice
+  - it runs right after ASR (transcribe.py, process.py), in parallel with it
+    (pipeline.py), or lazily just before RAW-TEXT.md is compiled
+    (DIARIZATION=lazy in .env; DIARIZATION=off disables it)
+
+AUDIO that is not a 16 kHz mono WAV (e.g. the original .m4a, when
+preprocessing failed and the transcript was made from it) is decoded
+untrimmed first, so turns stay on that transcript's timeline.
+
+Usage: python3 .2ndBrain/.scripts/diarize.py run AUDIO.wav [--transcript JSON] [--turns-out PATH] [--threads N]
+       python3 .2ndBrain/.scripts/diarize.py pending              (label root transcripts without speakers)
+       python3 .2ndBrain/.scripts/diarize.py voices               (list known voices)
+       python3 .2ndBrain/.scripts/diarize.py name VOICE_01 "Mig"  (show a voice under a name)
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import closing, contextmanager
+from pathlib import Path
+from dotenv import load_dotenv
+from atomic import write_json
+from audio import preprocess_for_transcript
+from catalog import file_sha256, root_files
+from fingerprint import SAMPLE_RATE, read_wav, splice_transcript
+from metrics import run_measured, stage_metrics
+from vad import load_offsets
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BASE_PATH = Path(__file__).parent.parent.parent  # Go up to 2nd Brain root
+CACHE_DIR = BASE_PATH / ".cache" / "diarization"
+VOICES_DB = CACHE_DIR / "voices.sqlite"
+CACHE_VERSION = 1
+
+PIPELINE_MODEL = "pyannote/speaker-diarization-3.1"
+EMBEDDING_MODEL = "pyannote/wespeaker-voxceleb-resnet34-LM"  # the embedding model inside the pipeline
+
+SAME_VOICE = 0.6  # cosine similarity of two embeddings of the same person
+QUICK_WINDOWS = 5  # windows sampled to check for a single known voice
+QUICK_WINDOW_S = 3.0
+QUICK_MIN_RECORDINGS = 2  # a voice must be known from this many recordings to skip the pipeline
+
+VOICES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS voices (
+    label TEXT PRIMARY KEY,
+    name TEXT,
+    recordings INTEGER NOT NULL,
+    centroid BLOB NOT NULL
+);
+"""
+
+class DiarizationError(Exception):
+    """Audio could not be diarized."""
+
+# ============================================================
+# Voice index
+# ============================================================
+
+def connect(db_path=None):
+    path = Path(db_path or VOICES_DB)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # pipeline.py diarizes several recordings at once
+    conn = sqlite3.connect(str(path), timeout=60, isolation_level=None)
+    conn.executescript(VOICES_SCHEMA)
+    return conn
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def known_voices(conn, min_recordings=1):
+    """(labels, recording counts, unit centroid matrix) of the indexed voices."""
+    rows = conn.execute("SELECT label, recordings, centroid FROM voices WHERE recordings >= ? ORDER BY label",
+                        (min_recordings,)).fetchall()
+    if not rows:
+        return [], [], np.empty((0, 0), dtype=np.float32)
+    centroids = np.stack([np.frombuffer(blob, dtype='<f4') for _, _, blob in rows])
+    return [r[0] for r in rows], [r[1] for r in rows], centroids
+
+def voice_names(db_path=None):
+    """Display name of every voice label (its given name, else the label)."""
+    with closing(connect(db_path)) as conn:
+        return {label: name or label for label, name in conn.execute("SELECT label, name FROM voices")}
+
+def assign_voices(speakers, db_path=None):
+    """Map the speakers of one recording ({local label: embedding}) to stable voice labels.
+
+    Pairs are taken best-first by cosine similarity, one voice per speaker;
+    a speaker matching no voice closely enough becomes a new voice. Matched
+    centroids move to the running mean of every recording they were heard in."""
+    mapping = {}
+    local = [label for label, emb in speakers.items() if emb is not None and np.all(np.isfinite(emb))]
+    with closing(connect(db_path)) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        labels, counts, centroids = known_voices(conn)
+        if local:
+            embeddings = normalize([speakers[label] for label in local])
+            pairs = []
+            if labels and centroids.shape[1] == embeddings.shape[1]:
+                sims = embeddings @ centroids.T
+                pairs = sorted(((sims[i, j], i, j) for i, j in zip(*np.nonzero(sims >= SAME_VOICE))), reverse=True)
+            taken = set()
+            for _, i, j in pairs:
+                if local[i] in mapping or j in taken:
+                    continue
+                taken.add(j)
+                mapping[local[i]] = labels[j]
+                centroid = normalize(centroids[j] * counts[j] + embeddings[i])
+                conn.execute("UPDATE voices SET recordings = recordings + 1, centroid = ? WHERE label = ?",
+                             (centroid.astype('<f4').tobytes(), labels[j]))
+            next_id = 1 + max((int(label.split('_')[1]) for label in labels), default=0)
+            for i, label in enumerate(local):
+                if label in mapping:
+                    continue
+                mapping[label] = f"VOICE_{next_id:02d}"
+                next_id += 1
+                conn.execute("INSERT INTO voices VALUES (?, NULL, 1, ?)",
+                             (mapping[label], embeddings[i].astype('<f4').tobytes()))
+        conn.execute("COMMIT")
+    # Speakers with too little speech for an embedding keep their per-file label
+    for label in speakers:
+        mapping.setdefault(label, label)
+    return mapping
+
+def known_single_voice(windows, db_path=None):
+    """The voice every sampled window sounds like, if it is a well-known one; else None."""
+    with closing(connect(db_path)) as conn:
+        labels, _, centroids = known_voices(conn, QUICK_MIN_RECORDINGS)
+    if not labels or centroids.shape[1] != windows.shape[1]:
+        return None
+    sims = normalize(windows) @ centroids.T
+    best = sims.argmax(axis=1)
+    if np.all(best == best[0]) and sims[np.arange(len(best)), best].min() >= SAME_VOICE:
+        return labels[best[0]]
+    return None
+
+# ============================================================
+# Diarization
+# ============================================================
+
+def waveform_input(samples):
+    """pyannote's in-memory audio input (no torchaudio decoding of the file)."""
+    import torch
+    return {"waveform": torch.from_numpy(np.ascontiguousarray(samples)).unsqueeze(0), "sample_rate": SAMPLE_RATE}
+
+def sample_windows(samples, hf_token):
+    """Embeddings of QUICK_WINDOWS windows spread over the recording (None if it is too short)."""
+    duration = len(samples) / SAMPLE_RATE
+    if duration < QUICK_WINDOWS * QUICK_WINDOW_S:
+        return None
+    from pyannote.audio import Inference, Model
+    from pyannote.core import Segment
+    inference = Inference(Model.from_pretrained(EMBEDDING_MODEL, use_auth_token=hf_token), window="whole")
+    audio = waveform_input(samples)
+    starts = np.linspace(0, duration - QUICK_WINDOW_S, QUICK_WINDOWS)
+    return np.stack([np.asarray(inference.crop(audio, Segment(s, s + QUICK_WINDOW_S))).ravel() for s in starts])
+
+def run_pipeline(samples, hf_token):
+    """Full pyannote diarization: ([[start, end, speaker]], {speaker: embedding})."""
+    from pyannote.audio import Pipeline
+    pipeline = Pipeline.from_pretrained(PIPELINE_MODEL, use_auth_token=hf_token)
+    diarization, embeddings = pipeline(waveform_input(samples), return_embeddings=True)
+    turns = [[round(turn.start, 3), round(turn.end, 3), speaker]
+             for turn, _, speaker in diarization.itertracks(yield_label=True)]
+    # Embeddings come in the order of diarization.labels()
+    speakers = {speaker: embeddings[k].tolist() for k, speaker in enumerate(diarization.labels())}
+    return turns, speakers
+
+def diarize(wav_path, hf_token, threads=None, db_path=None):
+    """Speaker turns of a preprocessed recording, cached by its content.
+    Returns {turns: [[start, end, speaker]], speakers: {speaker: embedding},
+    voices: {speaker: voice label}, quick: bool}."""
+    cache_file = CACHE_DIR / f"{file_sha256(wav_path)}.json"
+    try:
+        with open(cache_file, 'r') as f:
+            entry = json.load(f)
+        if entry.get('version') == CACHE_VERSION:
+            return entry
+    except (OSError, ValueError):
+        pass
+
+    samples = read_wav(wav_path)
+    if samples is None:
+        raise DiarizationError(f"{wav_path} is not a 16 kHz mono 16-bit WAV")
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    with stage_metrics("diarize", file=Path(wav_path).name, audio_seconds=len(samples) / SAMPLE_RATE) as m:
+        # Only worth loading the embedding model once some voice is well known
+        with closing(connect(db_path)) as conn:
+            familiar = bool(known_voices(conn, QUICK_MIN_RECORDINGS)[0])
+        windows = sample_windows(samples, hf_token) if familiar else None
+        voice = known_single_voice(windows, db_path) if windows is not None else None
+        if voice is not None:
+            # A memo by someone the index knows well: one speaker, no pipeline
+            turns = [[0.0, round(len(samples) / SAMPLE_RATE, 3), "SPEAKER_00"]]
+            speakers = {"SPEAKER_00": normalize(windows).mean(axis=0).tolist()}
+        else:
+            turns, speakers = run_pipeline(samples, hf_token)
+        voices = assign_voices(speakers, db_path)
+        m.update(speakers=len(speakers), quick=voice is not None)
+
+    entry = {"version": CACHE_VERSION, "turns": turns, "speakers": speakers, "voices": voices,
+             "quick": voice is not None}
+    write_json(cache_file, entry)
+    return entry
+
+# ============================================================
+# Transcripts
+# ============================================================
+
+def speaker_for(start, end, starts, ends, labels):
+    """Label of the turn overlapping [start, end] most (nearest turn if none overlaps)."""
+    overlap = np.minimum(ends, end) - np.maximum(starts, start)
+    best = int(overlap.argmax())
+    if overlap[best] <= 0:
+        best = int(np.minimum(np.abs(starts - end), np.abs(ends - start)).argmin())
+    return labels[best]
+
+def apply_speakers(data, entry, names=None):
+    """Label the segments and words of a WhisperX transcript from a diarize() entry,
+    the way whisperx's assign_word_speakers does, with stable voice labels."""
+    turns = entry.get('turns') or []
+    if not turns:
+        return data
+    names = names or {}
+    voices = entry.get('voices', {})
+    starts = np.array([t[0] for t in turns], dtype=np.float64)
+    ends = np.array([t[1] for t in turns], dtype=np.float64)
+    labels = [names.get(voices.get(t[2], t[2]), voices.get(t[2], t[2])) for t in turns]
+    for seg in data.get('segments', []):
+        if 'start' in seg and 'end' in seg:
+            seg['speaker'] = speaker_for(seg['start'], seg['end'], starts, ends, labels)
+        for word in seg.get('words', []):
+            if 'start' in word and 'end' in word:
+                word['speaker'] = speaker_for(word['start'], word['end'], starts, ends, labels)
+            elif 'speaker' in seg:
+                word['speaker'] = seg['speaker']
+    if 'word_segments' in data:
+        data['word_segments'] = [w for seg in data.get('segments', []) for w in seg.get('words', [])]
+    return data
+
+def label_transcript(json_path, entry, output_path=None, db_path=None):
+    """Write json_path with speakers from entry to output_path (default: in place)."""
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    write_json(output_path or json_path, apply_speakers(data, entry, voice_names(db_path)))
+
+def reused_turns(match):
+    """A diarize() entry made from the speakers of a reused transcript (a fingerprint
+    match, spliced to this recording): no pyannote run, and the voice index is not
+    told about the copy, which would count it as another recording of the same voices."""
+    data = splice_transcript(match['json'], match['offset_s'], match['duration_s'])
+    turns = [[seg['start'], seg['end'], seg['speaker']] for seg in data.get('segments', [])
+             if 'speaker' in seg and 'start' in seg and 'end' in seg]
+    return {"version": CACHE_VERSION, "turns": turns, "speakers": {}, "voices": {}, "quick": False,
+            "reused": match['name']}
+
+def has_speakers(json_path):
+    try:
+        with open(json_path, 'r') as f:
+            return any('speaker' in seg for seg in json.load(f).get('segments', []))
+    except (OSError, ValueError):
+        return True  # not a transcript we can label
+
+def hf_token():
+    load_dotenv()
+    token = os.getenv('HF_TOKEN')
+    if not token or token == 'your_huggingface_token_here':
+        raise DiarizationError("HF_TOKEN not configured in .env")
+    return token
+
+# ============================================================
+# CLI
+# ============================================================
+
+@contextmanager
+def wav_input(audio):
+    """audio itself if it is a 16 kHz mono WAV, else a temporary untrimmed decode of it."""
+    if Path(audio).suffix.lower() == '.wav' and read_wav(audio) is not None:
+        yield audio
+        return
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, temp_wav = tempfile.mkstemp(dir=CACHE_DIR, prefix=f"temp_{Path(audio).stem}.", suffix='.wav')
+    os.close(fd)
+    try:
+        result, _ = run_measured(['ffmpeg', '-i', str(audio), '-ar', str(SAMPLE_RATE), '-ac', '1',
+                                  '-c:a', 'pcm_s16le', '-y', temp_wav], capture_output=True)
+        if result.returncode != 0:
+            raise DiarizationError(f"could not decode {audio} with ffmpeg")
+        yield Path(temp_wav)
+    finally:
+        Path(temp_wav).unlink(missing_ok=True)
+
+def cmd_run(args):
+    with wav_input(args.audio) as wav_path:
+        entry = diarize(wav_path, hf_token(), threads=args.threads)
+    if args.turns_out:
+        write_json(args.turns_out, entry)
+    if args.transcript:
+        label_transcript(args.transcript, entry)
+    how = "known voice, pipeline skipped" if entry['quick'] else "pyannote"
+    print(f"✅ {Path(args.audio).name}: {len(set(entry['voices'].values()))} speaker(s) ({how})")
+
+def cmd_pending(args):
+    """Lazy mode: diarize every root transcript that has no speakers yet."""
+    root_dir = Path(".")
+    todo = [j for j in root_files(root_dir)['json']
+            if not j.name.startswith('temp_') and (root_dir / f"{j.stem}.m4a").exists() and not has_speakers(j)]
+    if not todo:
+        print("✅ Every transcript has speakers")
+        return
+    token = hf_token()
+    for i, json_path in enumerate(todo, 1):
+        print(f"[{i}/{len(todo)}] {json_path.name}")
+        # pipeline.py keeps its preprocessed audio; otherwise make a temporary copy,
+        # trimmed the way the transcript's audio was (transcripts without an offset
+        # map predate vad.py, so a kept VAD-trimmed wav is on another timeline)
+        wav_file = root_dir / ".cache" / "audio" / f"{json_path.stem}.wav"
+        temp_wav = None
+        if not wav_file.exists() or load_offsets(json_path.stem) is None:
+            temp_wav = wav_file = CACHE_DIR / f"temp_{json_path.stem}.wav"
+            wav_file.parent.mkdir(parents=True, exist_ok=True)
+            if not preprocess_for_transcript(root_dir / f"{json_path.stem}.m4a", wav_file, json_path.stem):
+                print(f"   ❌ Could not preprocess {json_path.stem}.m4a")
+                continue
+        try:
+            label_transcript(json_path, diarize(wav_file, token, threads=args.threads))
+            print(f"   ✅ Speakers added")
+        finally:
+            if temp_wav is not None and temp_wav.exists():
+                temp_wav.unlink()
+
+def cmd_voices(args):
+    with closing(connect()) as conn:
+        rows = conn.execute("SELECT label, name, recordings FROM voices ORDER BY label").fetchall()
+    if not rows:
+        print("No voices indexed yet")
+        return
+    for label, name, recordings in rows:
+        print(f"   {label}  {name or '-':<20} heard in {recordings} recording(s)")
+
+def cmd_name(args):
+    with closing(connect()) as conn:
+        updated = conn.execute("UPDATE voices SET name = ? WHERE label = ?", (args.name, args.label)).rowcount
+    if not updated:
+        raise DiarizationError(f"unknown voice {args.label} (see: diarize.py voices)")
+    print(f"✅ {args.label} is now shown as {args.name} in newly labelled transcripts")
+
+def main():
+    parser = argparse.ArgumentParser(description="Speaker diarization with a local index of known voices")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("run", help="diarize one preprocessed 16 kHz WAV (other audio is decoded untrimmed)")
+    p.add_argument("audio", type=Path)
+    p.add_argument("--transcript", type=Path, help="WhisperX JSON to label in place")
+    p.add_argument("--turns-out", type=Path, help="also write the speaker turns here")
+    p.add_argument("--threads", type=int)
+    p.set_defaults(func=cmd_run)
+    p = sub.add_parser("pending", help="label root transcripts that have no speakers")
+    p.add_argument("--threads", type=int)
+    p.set_defaults(func=cmd_pending)
+    sub.add_parser("voices", help="list known voices").set_defaults(func=cmd_voices)
+    p = sub.add_parser("name", help="show a voice under a name")
+    p.add_argument("label")
+    p.add_argument("name")
+    p.set_defaults(func=cmd_name)
+    args = parser.parse_args()
+    if np is None:
+        raise DiarizationError("numpy is required for diarization")
+    args.func(args)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -1,87 +1,128 @@
 #!/usr/bin/env python3
 """
-Embed a single note into the Vector Database
+Embed notes into the Vector Database
 Called automatically after transcription or can be run manually.
-Usage: python3 0-Second-Brain/scripts/embed-note.py "1-Raw/md/Recording_123.md"
+Several files are embedded in one batch (one model load).
+Usage: python3 0-Second-Brain/scripts/embed-note.py "1-Raw/md/Recording_123.md" [...]
 """
 
 import chromadb
-from sentence_transformers import SentenceTransformer
 from pathlib import Path
 import sys
+import compact_index
+from metrics import stage_metrics
+from segment_index import index_transcripts, segments_collection, transcript_json_for
+from related_notes import update_graph
+from vector_db import STORE_POINTERS, load_model, notes_collection, pointer_metadata, storage_mode
+from vector_writer import upsert_ops, write
 
-def embed_note(file_path):
-    """Embed a single markdown file into the vector database."""
+def embed_notes(file_paths):
+    """Embed markdown files into the vector database with one model load and batched encoding."""
     
     # Setup paths (scripts are in 0-Second-Brain/scripts/, DB is at root)
     base_path = Path(__file__).parent.parent.parent  # Go up to 2nd Brain root
     db_path = base_path / ".chroma"  # .chroma/ at root level
-    file_path = Path(file_path)
-    
-    # Validate file exists
-    if not file_path.exists():
-        print(f"❌ File not found: {file_path}", file=sys.stderr)
-        return False
     
-    # Read content
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except Exception as e:
-        print(f"❌ Error reading file: {e}", file=sys.stderr)
-        return False
+    ok = True
+    notes = []
+    for file_path in map(Path, file_paths):
+        # Validate file exists
+        if not file_path.exists():
+            print(f"❌ File not found: {file_path}", file=sys.stderr)
+            ok = False
+            continue
+        
+        # Read content
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except Exception as e:
+            print(f"❌ Error reading file: {e}", file=sys.stderr)
+            ok = False
+            continue
+        
+        # Skip empty files
+        if not content.strip():
+            print(f"⚠️  Skipping empty file: {file_path.name}")
+            continue
+        
+        notes.append((file_path, content))
     
-    # Skip empty files
-    if not content.strip():
-        print(f"⚠️  Skipping empty file: {file_path.name}")
-        return True
+    if not notes:
+        return ok
     
     try:
         # Initialize ChromaDB
         client = chromadb.PersistentClient(path=str(db_path))
-        collection = client.get_or_create_collection(
-            name="notes",
-            metadata={"description": "Second Brain notes and transcriptions"}
-        )
+        collection = notes_collection(client)
         
-        # Load embedding model (cached after first load)
-        model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+        # Load embedding model (cached after first load; backend from EMBEDDING_BACKEND)
+        model = load_model()
         
-        # Generate embedding
-        embedding = model.encode(content, convert_to_tensor=False)
+        # Generate embeddings in one batched call
+        contents = [content for _, content in notes]
+        with stage_metrics("embed", file=notes[0][0].name if len(notes) == 1 else None,
+                           items=len(notes), unit="docs", chars=sum(map(len, contents))):
+            embeddings = model.encode(contents, batch_size=32, convert_to_tensor=False)
         
-        # Create unique ID from file path
-        try:
-            relative_path = file_path.relative_to(base_path)
-        except ValueError:
-            # If file is not relative to base_path, use absolute path
-            relative_path = file_path
-        
-        file_id = str(relative_path).replace('/', '_')
+        # Pointer-only collections keep path, hash and excerpt offsets instead of the text
+        pointer_only = storage_mode(collection) == STORE_POINTERS
         
-        # Store in database (upsert = update if exists, insert if new)
-        collection.upsert(
-            embeddings=[embedding.tolist()],
-            documents=[content],
-            metadatas=[{
+        ids, metadatas = [], []
+        for file_path, _ in notes:
+            # Create unique ID from file path
+            try:
+                relative_path = file_path.relative_to(base_path)
+            except ValueError:
+                # If file is not relative to base_path, use absolute path
+                relative_path = file_path
+            
+            ids.append(str(relative_path).replace('/', '_'))
+            metadatas.append({
                 "file": str(relative_path),
                 "filename": file_path.name,
-                "directory": file_path.parent.name
-            }],
-            ids=[file_id]
-        )
+                "directory": file_path.parent.name,
+                **(pointer_metadata(file_path.read_bytes()) if pointer_only else {})
+            })
+        
+        # Store in database (upsert = update if exists, insert if new) through the single
+        # writer, so concurrent embed runs don't contend on .chroma's SQLite store
+        write(upsert_ops(collection.name, ids, embeddings, None if pointer_only else contents, metadatas), client)
+        
+        # Compact mode: project the new vectors with the fitted projection
+        compact_index.add(ids, embeddings)
+        
+        # Transcript notes also get their segments indexed with timestamps
+        transcripts = [(transcript_json_for(p, base_path), p) for p, _ in notes]
+        transcripts = [(j, p) for j, p in transcripts if j is not None]
+        segment_count = 0
+        if transcripts:
+            segment_count = index_transcripts(segments_collection(client), model, transcripts, base_path, client)
         
-        print(f"✅ Embedded: {file_path.name}")
-        return True
+        # Keep the related-notes graph in step (only rows touched by these notes change)
+        try:
+            update_graph(collection)
+        except Exception as e:
+            print(f"⚠️  Could not update related-notes graph: {e}", file=sys.stderr)
+        
+        for file_path, _ in notes:
+            print(f"✅ Embedded: {file_path.name}")
+        if segment_count:
+            print(f"🎙️  Indexed {segment_count} timestamped segments")
+        return ok
         
     except Exception as e:
         print(f"❌ Error embedding file: {e}", file=sys.stderr)
         return False
 
+def embed_note(file_path):
+    """Embed a single markdown file into the vector database."""
+    return embed_notes([file_path])
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python3 0-Second-Brain/scripts/embed-note.py <path-to-markdown-file>", file=sys.stderr)
+    if len(sys.argv) < 2:
+        print("Usage: python3 0-Second-Brain/scripts/embed-note.py <path-to-markdown-file> [...]", file=sys.stderr)
         sys.exit(1)
     
-    success = embed_note(sys.argv[1])
+    success = embed_notes(sys.argv[1:])
     sys.exit(0 if success else 1)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Acoustic fingerprints of transcribed recordings, to skip re-transcribing duplicates.
+
+Phone sync can drop the same voice memo twice under different names, or a
+trimmed copy of it. Every transcribed recording leaves a compact fingerprint
+of its preprocessed 16 kHz audio in .cache/fingerprints/fingerprints.sqlite:
+one 32-bit spectral hash per 32 ms frame (the signs of energy differences
+between 33 log-spaced bands, across bands and across frames - about 7.5 KB
+per minute of speech).
+
+Before a new recording goes to WhisperX, its fingerprint is matched against
+the stored ones: shared hashes vote for a time offset, and the bit error rate
+at that offset confirms the match. An identical source file, or audio that is
+a (possibly trimmed) copy of an already transcribed recording, gets the
+existing transcript - cut to the matching window and shifted to its own
+timeline - instead of a new transcription. A recording that only partly
+overlaps an earlier one is transcribed as usual.
+
+Needs numpy; without it every recording is simply transcribed.
+
+Usage: python3 .2ndBrain/.scripts/fingerprint.py a.wav b.wav   (compare two preprocessed recordings)
+"""
+
+import json
+import sqlite3
+import sys
+import wave
+from contextlib import closing
+from pathlib import Path
+from atomic import write_json
+from catalog import sha256_of
+from metrics import stage_metrics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BASE_PATH = Path(__file__).parent.parent.parent  # Go up to 2nd Brain root
+DB_PATH = BASE_PATH / ".cache" / "fingerprints" / "fingerprints.sqlite"
+
+SAMPLE_RATE = 16000
+FRAME = 2048
+HOP = 512  # 32 ms per hash
+BAND_EDGES_HZ = (300, 3000)  # speech band
+BITS = 32
+NOISE_FLOOR = 1.0  # relative to the median band energy
+BLOCK_FRAMES = 4096  # frames per FFT block (bounds memory on long recordings)
+
+MAX_BIT_ERROR = 0.35  # mean fraction of differing bits for the same audio
+MIN_COVERAGE = 0.9  # share of the new recording the old one must cover
+MIN_FRAMES = int(5 * SAMPLE_RATE / HOP)  # ignore recordings shorter than ~5 s
+COMMON_HASH = 64  # hashes seen more often than this (silence, hum) don't vote
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    name TEXT PRIMARY KEY,
+    source_sha256 TEXT NOT NULL,
+    frames INTEGER NOT NULL,
+    hashes BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS recordings_source ON recordings (source_sha256);
+"""
+
+def connect(db_path=None):
+    path = Path(db_path or DB_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.executescript(SCHEMA)
+    return conn
+
+def read_wav(path):
+    """Samples of a 16 kHz mono 16-bit WAV (what preprocess_audio writes) as float32, or None."""
+    try:
+        with wave.open(str(path), 'rb') as w:
+            if w.getframerate() != SAMPLE_RATE or w.getnchannels() != 1 or w.getsampwidth() != 2:
+                return None
+            data = w.readframes(w.getnframes())
+    except (OSError, EOFError, wave.Error):
+        return None
+    return np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+
+def band_matrix():
+    """(FRAME // 2 + 1, BITS + 1) matrix summing FFT power into log-spaced bands."""
+    edges = np.geomspace(BAND_EDGES_HZ[0], BAND_EDGES_HZ[1], BITS + 2)
+    freqs = np.fft.rfftfreq(FRAME, 1 / SAMPLE_RATE)
+    band = np.searchsorted(edges, freqs, side='right') - 1
+    matrix = np.zeros((len(freqs), BITS + 1), dtype=np.float32)
+    inside = (band >= 0) & (band <= BITS)
+    matrix[np.flatnonzero(inside), band[inside]] = 1
+    return matrix
+
+def fingerprint(samples):
+    """uint32 hash per HOP of audio: bit m is set when band m's energy lead over
+    band m+1 grew since the previous frame."""
+    count = 1 + (len(samples) - FRAME) // HOP if len(samples) >= FRAME else 0
+    if count < 2:
+        return np.empty(0, dtype=np.uint32)
+    window = np.hanning(FRAME).astype(np.float32)
+    bands = band_matrix()
+    energies = np.empty((count, BITS + 1), dtype=np.float32)
+    for start in range(0, count, BLOCK_FRAMES):
+        idx = np.arange(start, min(start + BLOCK_FRAMES, count))[:, None] * HOP + np.arange(FRAME)
+        spectrum = np.abs(np.fft.rfft(samples[idx] * window, axis=1)) ** 2
+        energies[start:start + len(idx)] = spectrum.astype(np.float32) @ bands
+    # A floor relative to the recording's level keeps near-silent bands from hashing noise
+    energies = np.log(energies + NOISE_FLOOR * float(np.median(energies)) + 1e-10)
+    diff = energies[:, :-1] - energies[:, 1:]
+    bits = (diff[1:] - diff[:-1]) > 0
+    return np.packbits(bits, axis=1, bitorder='little').view('<u4').ravel()
+
+def bit_error(a, b):
+    """Mean fraction of differing bits between two equal-length hash arrays."""
+    return float(np.unpackbits(np.bitwise_xor(a, b).view(np.uint8)).mean())
+
+def best_offset(query, stored):
+    """Offset d maximizing hash agreement of query[i] with stored[i + d], by vote."""
+    order = np.argsort(stored, kind='stable')
+    sorted_hashes = stored[order]
+    left = np.searchsorted(sorted_hashes, query, side='left')
+    right = np.searchsorted(sorted_hashes, query, side='right')
+    counts = right - left
+    voters = np.flatnonzero((counts > 0) & (counts <= COMMON_HASH))
+    if not len(voters):
+        return None
+    reps = counts[voters]
+    starts = np.repeat(left[voters] - np.cumsum(reps) + reps, reps) + np.arange(reps.sum())
+    offsets = order[starts] - np.repeat(voters, reps)
+    votes = np.bincount(offsets + len(query))
+    return int(np.argmax(votes)) - len(query)
+
+def compare(query, stored):
+    """(offset, bit error, share of query covered, share of stored covered), or None."""
+    offset = best_offset(query, stored)
+    if offset is None:
+        return None
+    q_start = max(0, -offset)
+    q_end = min(len(query), len(stored) - offset)
+    if q_end - q_start < MIN_FRAMES:
+        return None
+    error = bit_error(query[q_start:q_end], stored[q_start + offset:q_end + offset])
+    overlap = q_end - q_start
+    return offset, error, overlap / len(query), overlap / len(stored)
+
+def transcript_json_for(name, base_path=None):
+    """Where the transcript of recording `name` lives now (root, or 1-Raw/json after cleanup)."""
+    base = Path(base_path or BASE_PATH)
+    for candidate in (base / f"{name}.json", base / "1-Raw" / "json" / f"{name}.json"):
+        if candidate.exists():
+            return candidate
+    return None
+
+def find_duplicate(source, wav_path, name, db_path=None, base_path=None):
+    """Match a recording against every transcribed one. Returns a dict (name, json,
+    kind, offset_s, duration_s, bit_error) for a reusable transcript, else None.
+    Returns the computed fingerprint too, so remember() needn't recompute it."""
+    if np is None:
+        return None, None
+    source_hash = sha256_of(source, base_path)  # hashed by the catalog scan already
+    with closing(connect(db_path)) as conn:
+        exact = conn.execute("SELECT name FROM recordings WHERE source_sha256 = ? AND name != ?",
+                             (source_hash, name)).fetchall()
+        for (other,) in exact:
+            json_path = transcript_json_for(other, base_path)
+            if json_path is not None:
+                return {"name": other, "json": json_path, "kind": "identical file", "offset_s": 0.0,
+                        "duration_s": None, "bit_error": 0.0}, None
+
+        samples = read_wav(wav_path) if wav_path is not None else None
+        if samples is None:
+            return None, None
+        with stage_metrics("fingerprint", file=Path(source).name, audio_seconds=len(samples) / SAMPLE_RATE) as m:
+            query = fingerprint(samples)
+            best = None
+            if len(query) >= MIN_FRAMES:
+                for other, blob in conn.execute("SELECT name, hashes FROM recordings WHERE name != ?", (name,)):
+                    result = compare(query, np.frombuffer(blob, dtype='<u4'))
+                    if result is None:
+                        continue
+                    offset, error, covered, _ = result
+                    if error <= MAX_BIT_ERROR and covered >= MIN_COVERAGE and (best is None or error < best[2]):
+                        best = (other, offset, error, result[3])
+            m['match'] = best[0] if best else None
+    if best is None:
+        return None, (source_hash, query)
+    other, offset, error, stored_covered = best
+    json_path = transcript_json_for(other, base_path)
+    if json_path is None:
+        return None, (source_hash, query)
+    return {
+        "name": other,
+        "json": json_path,
+        "kind": "duplicate" if stored_covered >= MIN_COVERAGE else "trimmed copy",
+        "offset_s": offset * HOP / SAMPLE_RATE,
+        "duration_s": len(samples) / SAMPLE_RATE,
+        "bit_error": error,
+    }, (source_hash, query)
+
+def remember(name, fingerprint_info, db_path=None):
+    """Store the fingerprint of a recording that now has a transcript."""
+    if np is None or fingerprint_info is None:
+        return
+    source_hash, hashes = fingerprint_info
+    with closing(connect(db_path)) as conn:
+        conn.execute("INSERT OR REPLACE INTO recordings VALUES (?, ?, ?, ?)",
+                     (name, source_hash, len(hashes), hashes.astype('<u4').tobytes()))
+        conn.commit()
+
+def splice_transcript(json_path, offset_s, duration_s):
+    """The part of a WhisperX transcript heard in [offset_s, offset_s + duration_s],
+    with times shifted so the window starts at 0."""
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    end_s = float('inf') if duration_s is None else offset_s + duration_s
+
+    def inside(item):
+        if 'start' not in item or 'end' not in item:
+            return True
+        return offset_s <= (item['start'] + item['end']) / 2 < end_s
+
+    def shifted(item):
+        item = dict(item)
+        for key in ('start', 'end'):
+            if key in item:
+                item[key] = round(max(0.0, item[key] - offset_s), 3)
+        return item
+
+    segments = []
+    for seg in data.get('segments', []):
+        if not inside(seg):
+            continue
+        seg = shifted(seg)
+        if 'words' in seg:
+            seg['words'] = [shifted(w) for w in seg['words'] if inside(w)]
+        segments.append(seg)
+    data['segments'] = segments
+    if 'word_segments' in data:
+        data['word_segments'] = [w for seg in segments for w in seg.get('words', [])]
+    return data
+
+def reuse_transcript(match, json_path):
+    """Write the matched recording's transcript (spliced to this recording) to json_path."""
+    data = splice_transcript(match['json'], match['offset_s'], match['duration_s'])
+    write_json(json_path, data)
+    return json_path
+
+def try_reuse(source, wav_path, json_path):
+    """If source is a copy of an already transcribed recording, write that transcript
+    (spliced to fit) to json_path. Returns (match or None, fingerprint info for remember())."""
+    match, info = find_duplicate(source, wav_path, Path(json_path).stem)
+    if match is not None:
+        reuse_transcript(match, json_path)
+    return match, info
+
+def main():
+    if np is None:
+        print("❌ numpy is required for fingerprints", file=sys.stderr)
+        sys.exit(1)
+    if len(sys.argv) != 3:
+        print("Usage: python3 .2ndBrain/.scripts/fingerprint.py a.wav b.wav", file=sys.stderr)
+        sys.exit(1)
+    prints = []
+    for path in sys.argv[1:]:
+        samples = read_wav(path)
+        if samples is None:
+            print(f"❌ {path}: not a 16 kHz mono 16-bit WAV", file=sys.stderr)
+            sys.exit(1)
+        prints.append(fingerprint(samples))
+    result = compare(prints[1], prints[0])
+    if result is None:
+        print("No match")
+        return
+    offset, error, covered_b, covered_a = result
+    same = error <= MAX_BIT_ERROR
+    print(f"{'✅ Same audio' if same else '❌ Different audio'}: bit error {error:.1%}, "
+          f"{sys.argv[2]} starts at {offset * HOP / SAMPLE_RATE:.2f}s of {sys.argv[1]}, "
+          f"covers {covered_b:.0%} of it / {covered_a:.0%} of {sys.argv[1]}")
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,31 @@
 Initialize Vector Database for Second Brain
 Creates ChromaDB and embeds all existing markdown files.
 Run once during setup.
+Usage: python3 0-Second-Brain/scripts/init-vector-db.py [--pointer-only | --store-documents]
+           [--space l2|cosine|ip] [--M N] [--construction-ef N] [--search-ef N]
+       --pointer-only stores path, hash and excerpt offsets instead of note text
+       (switching modes rebuilds the collection)
+       --space/--M/--construction-ef set the HNSW index (changing them rebuilds it),
+       --search-ef only changes how hard queries search; pick values with tune-index.py
 """
 
+import argparse
 import chromadb
-from sentence_transformers import SentenceTransformer
 from pathlib import Path
 import sys
+import compact_index
+from catalog import note_files
+from metrics import stage_metrics
+from related_notes import update_graph
+from segment_index import index_transcripts, segments_collection, transcript_json_for
+from vector_db import BUILD_SETTINGS, SPACES, STORE_DOCUMENTS, STORE_POINTERS, UPSERT_BATCH, index_settings, load_model, notes_collection, pointer_metadata, search_ef_metadata, storage_mode
+from vector_writer import upsert_ops, write
 
-def init_vector_db():
-    """Initialize the vector database and embed all existing notes."""
+def init_vector_db(storage=None, settings=None):
+    """Initialize the vector database and embed all existing notes.
+    storage (STORE_DOCUMENTS / STORE_POINTERS) switches the notes storage mode,
+    settings ({space, M, construction_ef, search_ef}, None = keep) the HNSW index."""
+    settings = {key: value for key, value in (settings or {}).items() if value is not None}
     
     print("🚀 Initializing Vector Database...")
     
@@ -23,28 +39,33 @@ def init_vector_db():
     print(f"📁 Creating database at: {db_path}")
     client = chromadb.PersistentClient(path=str(db_path))
     
-    # Create or get collection
-    collection = client.get_or_create_collection(
-        name="notes",
-        metadata={"description": "Second Brain notes and transcriptions"}
-    )
+    # Create or get collection (a different storage mode or index means starting it over;
+    # a new collection is created with defaults and, if need be, rebuilt while still empty)
+    collection = notes_collection(client, storage or STORE_DOCUMENTS)
+    current = index_settings(collection)
+    rebuild = [key for key in BUILD_SETTINGS if key in settings and settings[key] != current[key]]
+    if storage is not None and storage_mode(collection) != storage:
+        print(f"♻️  Switching notes storage to '{storage}' mode - rebuilding collection")
+        rebuild.append("storage")
+    elif rebuild:
+        print(f"♻️  New index settings ({', '.join(f'{key}={settings[key]}' for key in rebuild)}) - rebuilding collection")
+    if rebuild:
+        # Keep the settings the collection had unless new ones were given
+        settings = {**current, **settings}
+        storage = storage or storage_mode(collection)
+        client.delete_collection("notes")
+        collection = notes_collection(client, storage, settings)
+    elif settings.get("search_ef") not in (None, current["search_ef"]):
+        print(f"🔧 Setting search_ef={settings['search_ef']}")
+        collection.modify(metadata=search_ef_metadata(collection, settings["search_ef"]))
+    pointer_only = storage_mode(collection) == STORE_POINTERS
     
     # Load embedding model
     print("🤖 Loading embedding model (sentence-transformers/all-MiniLM-L6-v2)...")
-    model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+    model = load_model()
     
-    # Find all markdown files to embed
-    markdown_dirs = [
-        base_path / "1-Raw" / "md",
-        base_path / "2-Lists",
-        base_path / "3-Memos",
-        base_path / "4-Wisdom"
-    ]
-    
-    all_files = []
-    for md_dir in markdown_dirs:
-        if md_dir.exists():
-            all_files.extend(list(md_dir.glob("*.md")))
+    # Find all markdown files to embed (stage folders and their subfolders, from the vault catalog)
+    all_files = note_files(base_path)
     
     if not all_files:
         print("⚠️  No markdown files found to embed.")
@@ -54,47 +75,89 @@ def init_vector_db():
     
     # Embed each file
     embedded_count = 0
-    for file_path in all_files:
-        try:
-            # Read content
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Skip empty files
-            if not content.strip():
-                continue
-            
-            # Generate embedding
-            embedding = model.encode(content, convert_to_tensor=False)
-            
-            # Create unique ID from file path
-            file_id = str(file_path.relative_to(base_path)).replace('/', '_')
-            
-            # Store in database
-            collection.upsert(
-                embeddings=[embedding.tolist()],
-                documents=[content],
-                metadatas=[{
-                    "file": str(file_path.relative_to(base_path)),
-                    "filename": file_path.name,
-                    "directory": file_path.parent.name
-                }],
-                ids=[file_id]
-            )
+    rows = []
+    with stage_metrics("embed", unit="docs") as m:
+        for file_path in all_files:
+            try:
+                # Read content
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                
+                # Skip empty files
+                if not content.strip():
+                    continue
+                
+                # Generate embedding
+                embedding = model.encode(content, convert_to_tensor=False)
+                
+                # Create unique ID from file path
+                file_id = str(file_path.relative_to(base_path)).replace('/', '_')
+                
+                # Queue for the single vector writer (stored in batches)
+                rows.extend(upsert_ops(
+                    collection.name,
+                    [file_id],
+                    [embedding],
+                    None if pointer_only else [content],
+                    [{
+                        "file": str(file_path.relative_to(base_path)),
+                        "filename": file_path.name,
+                        "directory": file_path.parent.name,
+                        **(pointer_metadata(file_path.read_bytes()) if pointer_only else {})
+                    }]
+                ))
+                
+                embedded_count += 1
+                print(f"  ✓ {file_path.relative_to(base_path)}")
+                
+            except Exception as e:
+                print(f"  ✗ Error embedding {file_path.name}: {e}")
             
-            embedded_count += 1
-            print(f"  ✓ {file_path.relative_to(base_path)}")
-            
-        except Exception as e:
-            print(f"  ✗ Error embedding {file_path.name}: {e}")
+            if len(rows) >= UPSERT_BATCH:
+                write(rows, client)
+                rows = []
+        write(rows, client)
+        m['items'] = embedded_count
+    
+    # Index transcript segments so searches can point at moments in recordings
+    transcripts = [(transcript_json_for(f, base_path), f) for f in all_files]
+    transcripts = [(j, f) for j, f in transcripts if j is not None]
+    if transcripts:
+        print(f"🎙️  Indexing timestamped segments of {len(transcripts)} transcripts...")
+        segment_count = index_transcripts(segments_collection(client), model, transcripts, base_path, client)
+        print(f"  ✓ {segment_count} segments")
+    
+    # Precompute related notes for every note in one pass
+    print("🔗 Updating related-notes graph...")
+    recomputed, total = update_graph(collection)
+    print(f"  ✓ {recomputed}/{total} notes updated")
+    
+    # Compact mode: refit the projection on the re-embedded notes
+    compact = compact_index.load_index()
+    if compact is not None:
+        print("📉 Refitting compact index...")
+        compact = compact_index.build(collection, compact['components'].shape[0], compact['method'])
+        print(f"  ✓ {len(compact['ids'])} notes, {compact['components'].shape[0]} dims")
     
     print(f"\n✅ Successfully embedded {embedded_count}/{len(all_files)} files")
     print(f"📊 Database location: {db_path}")
     print(f"🔍 Ready for semantic search!")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the vector database and embed every note.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--pointer-only", dest="storage", action="store_const", const=STORE_POINTERS,
+                      help="store path, hash and excerpt offsets instead of note text")
+    mode.add_argument("--store-documents", dest="storage", action="store_const", const=STORE_DOCUMENTS,
+                      help="store the note text (default)")
+    parser.add_argument("--space", choices=SPACES, help="distance of the HNSW index")
+    parser.add_argument("--M", type=int, help="HNSW links per node")
+    parser.add_argument("--construction-ef", type=int, help="HNSW candidate list size while building")
+    parser.add_argument("--search-ef", type=int, help="HNSW candidate list size while searching")
+    args = parser.parse_args()
     try:
-        init_vector_db()
+        init_vector_db(args.storage, {"space": args.space, "M": args.M,
+                                      "construction_ef": args.construction_ef, "search_ef": args.search_ef})
     except Exception as e:
         print(f"❌ Error: {e}", file=sys.stderr)
         sys.exit(1)
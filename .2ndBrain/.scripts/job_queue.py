@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Persistent SQLite job queue for the ingestion stages.
+
+Every stage run (preprocess, transcribe, OCR, markdown, embed, raw-text) is a
+row with its state, attempt count and timings. Workers claim pending jobs
+atomically, so an interrupted run - laptop asleep, whisperx crash - resumes
+where it stopped: finished jobs are never redone, and jobs left 'running' by
+a dead worker are reset and their partial output removed.
+
+Usage: python3 .2ndBrain/.scripts/job_queue.py [--failed]   (show queue status)
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from pathlib import Path
+
+DB_PATH = Path(".cache") / "pipeline" / "pipeline.sqlite"
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stage TEXT NOT NULL,
+    target TEXT NOT NULL,
+    key TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_id TEXT,
+    worker TEXT,
+    scratch TEXT,
+    error TEXT,
+    enqueued_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    duration REAL,
+    UNIQUE (target, key)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, run_id);
+"""
+
+def connect(db_path=DB_PATH):
+    """Open the pipeline database (WAL, so readers never block the writer)."""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def worker_alive(worker):
+    """True unless worker is a process on this host that no longer exists."""
+    host, _, pid = (worker or "").rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class JobQueue:
+    """Jobs keyed by (target, input key): the same inputs are never processed twice."""
+
+    def __init__(self, db_path=DB_PATH, run_id=None):
+        self.db_path = Path(db_path)
+        self.run_id = run_id or f"{worker_id()}:{time.time():.0f}"
+        with closing(connect(self.db_path)) as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        return connect(self.db_path)
+
+    def recover(self):
+        """Reset jobs orphaned by a dead worker; delete their partial outputs.
+        Returns the recovered rows."""
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute("SELECT * FROM jobs WHERE state = 'running'").fetchall()
+            orphaned = [row for row in rows if not worker_alive(row['worker'])]
+            for row in orphaned:
+                for path in json.loads(row['scratch'] or '[]'):
+                    Path(path).unlink(missing_ok=True)
+                conn.execute(
+                    "UPDATE jobs SET state = 'pending', worker = NULL, error = ? WHERE id = ?",
+                    ("interrupted", row['id'])
+                )
+            conn.execute("COMMIT")
+            return orphaned
+        finally:
+            conn.close()
+
+    def enqueue(self, stage, target, key, scratch=(), retry_failed=False):
+        """Queue a job for this run. Returns 'pending', or 'running' / 'failed' if it was not queued.
+
+        Callers only enqueue targets that are out of date, so finished work is
+        never queued again. A job that failed MAX_ATTEMPTS times stays failed
+        unless retry_failed is set; one held by another live worker is left alone."""
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM jobs WHERE target = ? AND key = ?", (target, key)).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO jobs (stage, target, key, run_id, scratch, enqueued_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (stage, target, key, self.run_id, json.dumps([str(p) for p in scratch]), time.time())
+                )
+                state = 'pending'
+            elif row['state'] == 'running' and worker_alive(row['worker']):
+                state = 'running'
+            elif row['state'] == 'failed' and row['attempts'] >= MAX_ATTEMPTS and not retry_failed:
+                state = 'failed'
+            else:
+                attempts = 0 if retry_failed or row['state'] == 'done' else row['attempts']
+                conn.execute(
+                    "UPDATE jobs SET state = 'pending', run_id = ?, attempts = ?, scratch = ?, enqueued_at = ? WHERE id = ?",
+                    (self.run_id, attempts, json.dumps([str(p) for p in scratch]), time.time(), row['id'])
+                )
+                state = 'pending'
+            conn.execute("COMMIT")
+            return state
+        finally:
+            conn.close()
+
+    def claim(self, worker=None, stages=None):
+        """Atomically take the oldest pending job of this run (restricted to stages), or None."""
+        if stages is not None and not stages:
+            return None
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            query = "SELECT * FROM jobs WHERE state = 'pending' AND run_id = ?"
+            params = [self.run_id]
+            if stages is not None:
+                query += f" AND stage IN ({', '.join('?' * len(stages))})"
+                params.extend(stages)
+            row = conn.execute(query + " ORDER BY id LIMIT 1", params).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET state = 'running', worker = ?, attempts = attempts + 1, "
+                    "started_at = ?, finished_at = NULL, error = NULL WHERE id = ?",
+                    (worker or worker_id(), time.time(), row['id'])
+                )
+            conn.execute("COMMIT")
+            return row
+        finally:
+            conn.close()
+
+    def finish(self, job_id, error=None):
+        """Mark a claimed job done, or failed with error (retried next run while attempts remain)."""
+        now = time.time()
+        with closing(self._conn()) as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, finished_at = ?, duration = ? - started_at, worker = NULL "
+                "WHERE id = ?",
+                ('done' if error is None else 'failed', error, now, now, job_id)
+            )
+
+    def status(self):
+        """Rows for every job, most recent first."""
+        with closing(self._conn()) as conn:
+            return conn.execute("SELECT * FROM jobs ORDER BY id DESC").fetchall()
+
+def main():
+    show_failed = '--failed' in sys.argv[1:]
+    if not DB_PATH.exists():
+        print("✅ No pipeline jobs recorded yet")
+        return
+
+    rows = JobQueue(DB_PATH).status()
+    counts = {}
+    for row in rows:
+        counts.setdefault(row['stage'], {}).setdefault(row['state'], 0)
+        counts[row['stage']][row['state']] += 1
+
+    print(f"📋 Pipeline jobs ({DB_PATH})")
+    print("=" * 60)
+    for stage, states in sorted(counts.items()):
+        summary = ", ".join(f"{n} {state}" for state, n in sorted(states.items()))
+        print(f"   {stage:<12} {summary}")
+
+    for row in rows:
+        if row['state'] == 'running' or (show_failed and row['state'] == 'failed'):
+            icon = "⏳" if row['state'] == 'running' else "❌"
+            print(f"\n{icon} {row['stage']}: {row['target']} (attempt {row['attempts']}/{MAX_ATTEMPTS})")
+            if row['error']:
+                print(f"   {row['error'][:300]}")
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,36 @@
 #!/usr/bin/env python3
 """
 Convert WhisperX JSON transcription to readable Markdown format.
-Usage: python3 0-Second-Brain/scripts/json-to-markdown.py "1-Raw/json/FILENAME.json"
+Usage: python3 0-Second-Brain/scripts/json-to-markdown.py [--no-embed] "1-Raw/json/FILENAME.json" [...]
+       python3 0-Second-Brain/scripts/json-to-markdown.py [--no-embed] --all
+       (--all converts every new or changed JSON in 1-Raw/json in one process)
 """
 
-import json
+import os
+import subprocess
 import sys
 from pathlib import Path
 from datetime import datetime
+from catalog import query
+from metrics import stage_metrics
+from transcript_store import load_segments
+from vad import original_time
 
-def json_to_markdown(json_path):
-    """Convert WhisperX JSON to readable Markdown."""
-    
-    with open(json_path, 'r') as f:
-        data = json.load(f)
-    
-    segments = data.get('segments', [])
-    language = data.get('language', 'Unknown')
+JSON_DIR = Path('1-Raw/json')
+MD_DIR = Path('1-Raw/md')
+
+def iter_markdown(json_path):
+    """Yield the Markdown for a WhisperX JSON piece by piece, one segment at a time."""
+
+    segments, language = load_segments(json_path)
+    if language is None:
+        language = 'Unknown'
     filename = Path(json_path).stem
-    
+    # Times shown are the original recording's (transcripts are on the trimmed timeline)
+    at = original_time(filename)
+
     if segments:
-        duration = segments[-1]['end'] - segments[0]['start']
+        duration = at(segments[-1]['end']) - at(segments[0]['start'])
         speakers = set()
         for seg in segments:
             if 'speaker' in seg:
@@ -29,83 +39,93 @@ def json_to_markdown(json_path):
     else:
         duration = 0
         num_speakers = 0
-    
-    full_transcript = ' '.join([seg['text'].strip() for seg in segments])
-    
+
     date_str = datetime.now().strftime('%Y-%m-%d')
-    md = f"# Transcription: {filename}\n\n"
-    md += f"**Date**: {date_str}  \n"
-    md += f"**Duration**: ~{int(duration)} seconds  \n"
-    md += f"**Language**: {language.upper()}  \n"
-    md += f"**Speakers**: {num_speakers}"
-    
+    header = f"# Transcription: {filename}\n\n"
+    header += f"**Date**: {date_str}  \n"
+    header += f"**Duration**: ~{int(duration)} seconds  \n"
+    header += f"**Language**: {language.upper()}  \n"
+    header += f"**Speakers**: {num_speakers}"
+
     if num_speakers > 0 and speakers:
         speaker_list = ', '.join(sorted(speakers))
-        md += f" ({speaker_list})"
-    
-    md += "\n\n---\n\n"
-    md += "## Full Transcript\n\n"
-    md += f"> {full_transcript}\n\n"
-    md += "---\n\n"
-    md += "## Detailed Transcript with Timestamps\n\n"
-    
+        header += f" ({speaker_list})"
+
+    header += "\n\n---\n\n"
+    header += "## Full Transcript\n\n"
+    yield header
+
+    yield "> "
+    for i, seg in enumerate(segments):
+        yield (" " if i else "") + seg['text'].strip()
+    yield "\n\n"
+
+    yield "---\n\n"
+    yield "## Detailed Transcript with Timestamps\n\n"
+
     for segment in segments:
         speaker = segment.get('speaker', 'UNKNOWN')
-        start = segment['start']
-        end = segment['end']
-        
-        md += f"### {speaker} ({start:.1f}s - {end:.1f}s)\n\n"
-        
+        start = at(segment['start'])
+        end = at(segment['end'])
+
+        parts = [f"### {speaker} ({start:.1f}s - {end:.1f}s)\n\n"]
+
         if 'words' in segment:
-            md += "| Time | Word | Confidence |\n"
-            md += "|------|------|------------|\n"
-            
+            parts.append("| Time | Word | Confidence |\n")
+            parts.append("|------|------|------------|\n")
+
             for word in segment['words']:
-                w_start = word['start']
-                w_end = word['end']
-                w_text = word['word']
                 w_score = word.get('score', 0) * 100
-                md += f"| {w_start:.2f}s - {w_end:.2f}s | {w_text} | {w_score:.1f}% |\n"
-            
-            md += "\n"
-    
-    md += "---\n\n"
-    md += "## Notes\n\n"
-    md += "*Add your notes and action items here*\n\n"
-    md += "---\n\n"
-    md += "*Transcribed with WhisperX (diarization enabled)*  \n"
-    md += f"*Source JSON: `{Path(json_path).name}`*\n"
-    
-    return md
+                parts.append(f"| {at(word['start']):.2f}s - {at(word['end']):.2f}s | {word['word']} | {w_score:.1f}% |\n")
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python3 0-Second-Brain/scripts/json-to-markdown.py <json_file>")
-        sys.exit(1)
-    
-    json_path = sys.argv[1]
-    
-    if not Path(json_path).exists():
-        print(f"Error: File not found: {json_path}")
-        sys.exit(1)
-    
-    markdown = json_to_markdown(json_path)
-    
-    # Save to 1-Raw/md/ with same filename
-    json_file = Path(json_path)
-    md_path = Path('1-Raw/md') / f"{json_file.stem}.md"
-    
-    with open(md_path, 'w') as f:
-        f.write(markdown)
-    
-    print(f"✅ Created: {md_path}")
-    
-    # Auto-embed into vector database
+            parts.append("\n")
+
+        yield "".join(parts)
+
+    footer = "---\n\n"
+    footer += "## Notes\n\n"
+    footer += "*Add your notes and action items here*\n\n"
+    footer += "---\n\n"
+    footer += "*Transcribed with WhisperX (diarization enabled)*  \n"
+    footer += f"*Source JSON: `{Path(json_path).name}`*\n"
+    yield footer
+
+def json_to_markdown(json_path):
+    """Convert WhisperX JSON to readable Markdown."""
+    return "".join(iter_markdown(json_path))
+
+def write_markdown(json_path, md_path):
+    """Stream the Markdown for json_path into md_path (replaced only once complete)."""
+    md_path = Path(md_path)
+    tmp_path = md_path.with_suffix('.md.tmp')
+    try:
+        with open(tmp_path, 'w') as f:
+            for chunk in iter_markdown(json_path):
+                f.write(chunk)
+        os.replace(tmp_path, md_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return md_path
+
+def pending_json_files(json_dir=JSON_DIR, md_dir=MD_DIR):
+    """JSON files whose Markdown is missing or older than the JSON."""
+    pending = []
+    for json_file in query('json', json_dir, root=Path('.')):
+        md_path = md_dir / f"{json_file.stem}.md"
+        try:
+            if md_path.stat().st_mtime_ns >= json_file.stat().st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        pending.append(json_file)
+    return pending
+
+def embed_notes(md_paths):
+    """Embed the new notes with one embed-note.py run (one model load, batched encode)."""
     try:
-        import subprocess
         embed_script = Path(__file__).parent / "embed-note.py"  # Now in same scripts folder
         result = subprocess.run(
-            ["python3", str(embed_script), str(md_path)],
+            [sys.executable, str(embed_script), *[str(p) for p in md_paths]],
             capture_output=True,
             text=True
         )
@@ -116,5 +136,51 @@ def main():
     except Exception as e:
         print(f"⚠️  Warning: Could not auto-embed note: {e}")
 
+def main():
+    # --no-embed leaves embedding to the caller (e.g. pipeline.py runs it as its own stage)
+    auto_embed = '--no-embed' not in sys.argv[1:]
+    bulk = '--all' in sys.argv[1:]
+    args = [a for a in sys.argv[1:] if a not in ('--no-embed', '--all')]
+
+    if bulk == bool(args):
+        print("Usage: python3 0-Second-Brain/scripts/json-to-markdown.py [--no-embed] <json_file> [...]")
+        print("       python3 0-Second-Brain/scripts/json-to-markdown.py [--no-embed] --all")
+        sys.exit(1)
+
+    if bulk:
+        json_files = pending_json_files()
+        if not json_files:
+            print(f"✅ All transcripts in {JSON_DIR} already converted")
+            return
+    else:
+        json_files = [Path(a) for a in args]
+        for json_file in json_files:
+            if not json_file.exists():
+                print(f"Error: File not found: {json_file}")
+                sys.exit(1)
+
+    # Save to 1-Raw/md/ with same filename
+    created = []
+    with stage_metrics("markdown", file=json_files[0].name if len(json_files) == 1 else None,
+                       items=len(json_files), unit="docs") as m:
+        for json_file in json_files:
+            md_path = MD_DIR / f"{json_file.stem}.md"
+            try:
+                write_markdown(json_file, md_path)
+            except Exception as e:
+                if not bulk:
+                    raise
+                print(f"❌ Error converting {json_file.name}: {e}")
+                continue
+            created.append(md_path)
+            print(f"✅ Created: {md_path}")
+        m['items'] = len(created)
+
+    if auto_embed and created:
+        embed_notes(created)
+
+    if len(created) < len(json_files):
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Find candidate destinations for every item in RAW-TEXT.md in one pass.
+
+RAW-TEXT.md is split into candidate items (speaker turns of transcripts,
+markdown bullets and paragraphs, OCR text blocks), all items are embedded in
+one batch and matched against every note embedding with a single vectorized
+top-k. The result is a candidate-destination table for building
+PROCESSING-PLAN.md, instead of one semantic-search.py run per item.
+
+Only 2-Lists, 3-Memos and 4-Wisdom notes are destinations (raw transcripts in
+1-Raw are skipped). Each candidate is still checked before it goes in the plan.
+
+Item embeddings are cached by text, and the table records the RAW-TEXT.md hash
+and vector database it was built from: an up-to-date table is served as is,
+and an edited RAW-TEXT.md only re-embeds the items that changed. The review
+hard stops run this in the background (--watch) while waiting for "approved".
+
+Usage: python3 .2ndBrain/.scripts/match-raw-text.py [RAW-TEXT.md] [-k 3] [--output .cache/plan-candidates.md]
+       python3 .2ndBrain/.scripts/match-raw-text.py --watch [RAW-TEXT.md]   (refresh until the caller exits)
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from dedupe import embed_items
+from metrics import stage_metrics
+from raw_text import COMPILE_FOOTER, PROCESS_FOOTER
+from related_notes import BLOCK, load_embeddings, top_k
+from vector_db import BASE_PATH, DB_PATH, connect, notes_collection
+
+OUTPUT_PATH = BASE_PATH / ".cache" / "plan-candidates.md"
+EMBEDDINGS_PATH = BASE_PATH / ".cache" / "plan-candidates" / "embeddings.npz"
+STAMP = re.compile(r'^<!-- candidates: (.*) -->$')
+POLL_SECONDS = 2
+K = 3
+MIN_SCORE = 0.3  # below this a candidate is shown as "no close match"
+SKIP_PREFIXES = ("1-Raw/",)
+
+SECTIONS = {
+    "## 🎵 Audio Transcripts": "audio",
+    "## 📝 Markdown Files": "markdown",
+    "## 🖼️ OCR Extracted Text": "ocr",
+}
+SOURCE = re.compile(r'^### \[\d+\] (.+)$')
+TURN = re.compile(r'^\*\*([^*]+):\*\* (.*\S)\s*$')
+BULLET = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+(?:\[[ xX]\]\s+)?(.*\S)\s*$')
+METADATA = re.compile(r'^\*\*[^*]+\*\*:')  # OCR header lines (**Date**: ...)
+FOOTER_LINES = {line for line in (COMPILE_FOOTER + PROCESS_FOOTER).splitlines() if line}
+
+def is_content(line):
+    """False for lines that only structure the document (headings, rules, fences, embeds)."""
+    stripped = line.strip()
+    return bool(stripped) and not (
+        stripped.startswith('#') or stripped.startswith('```') or stripped.startswith('![[')
+        or stripped == '---' or (stripped.startswith('*') and stripped.endswith('*') and not BULLET.match(stripped))
+    )
+
+def parse_raw_text(path):
+    """Candidate items of RAW-TEXT.md as dicts (section, source, kind, label, line, text)."""
+    items = []
+    section = source = None
+    paragraph = []
+
+    def flush():
+        if paragraph:
+            text = " ".join(t for _, t in paragraph)
+            items.append({"section": section, "source": source, "kind": "block",
+                          "label": None, "line": paragraph[0][0], "text": text})
+            paragraph.clear()
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+            if line in SECTIONS or line.strip() in FOOTER_LINES:
+                flush()
+                section, source = SECTIONS.get(line), None
+                continue
+            match = SOURCE.match(line)
+            if match and section:
+                flush()
+                source = match.group(1)
+                continue
+            if not (section and source) or not is_content(line):
+                flush()
+                continue
+
+            if section == "audio" and (match := TURN.match(line)):
+                flush()
+                items.append({"section": section, "source": source, "kind": "turn",
+                              "label": match.group(1), "line": line_no, "text": match.group(2)})
+            elif match := BULLET.match(line):
+                flush()
+                items.append({"section": section, "source": source, "kind": "bullet",
+                              "label": None, "line": line_no, "text": match.group(1)})
+            elif section == "ocr" and METADATA.match(line.strip()):
+                flush()
+            else:
+                paragraph.append((line_no, line.strip()))
+        flush()
+
+    # The same text can appear twice (a -ocr.md file is listed as markdown and as OCR)
+    seen, unique = set(), []
+    for item in items:
+        key = " ".join(item['text'].lower().split())
+        if re.search(r'\w', key) and key not in seen:
+            seen.add(key)
+            unique.append(item)
+    return unique
+
+def match_items(queries, collection, k=K):
+    """[(file, score)] top-k destinations per item embedding, in one blocked matrix top-k."""
+    ids, files, vectors = load_embeddings(collection)
+    keep = [i for i, f in enumerate(files) if not f.startswith(SKIP_PREFIXES)]
+    files = [files[i] for i in keep]
+    if not files:
+        return [[] for _ in queries]
+    vectors = vectors[keep]
+
+    matches = []
+    with stage_metrics("match", items=len(queries), unit="items", notes=len(files), k=k):
+        for start in range(0, len(queries), BLOCK):
+            neighbors, scores = top_k(queries[start:start + BLOCK], vectors, None, k)
+            for row, row_scores in zip(neighbors, scores):
+                matches.append([(files[j], float(s)) for j, s in zip(row, row_scores)])
+    return matches
+
+def file_sha256(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+def source_stamp(raw_path, k, min_score):
+    """What a candidate table depends on: the RAW-TEXT.md content, the vector database and the options."""
+    try:
+        vault = (DB_PATH / "chroma.sqlite3").stat().st_mtime_ns
+    except OSError:
+        vault = 0
+    return f"raw={file_sha256(raw_path)} vault={vault} k={k} min={min_score}"
+
+def is_fresh(output, stamp):
+    try:
+        with open(output, 'r', encoding='utf-8') as f:
+            match = STAMP.match(f.readline().strip())
+    except OSError:
+        return False
+    return bool(match) and match.group(1) == stamp
+
+def build_candidates(raw_path, output, k=K, min_score=MIN_SCORE, collection=None):
+    """Write the candidate table for raw_path. Returns the item count, or None when
+    RAW-TEXT.md was edited while matching (the result is discarded, not written)."""
+    stamp = source_stamp(raw_path, k, min_score)
+    items = parse_raw_text(raw_path)
+    if items:
+        queries, _ = embed_items(items, cache_path=EMBEDDINGS_PATH)
+        matches = match_items(queries, collection or notes_collection(connect()), k)
+    else:
+        matches = []
+    if source_stamp(raw_path, k, min_score) != stamp:
+        return None
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    # Unique temp name: the --watch child and a foreground run may write at the same time
+    fd, tmp_path = tempfile.mkstemp(dir=output.parent, prefix=f"{output.stem}.", suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(f"<!-- candidates: {stamp} -->\n")
+        f.write(format_table(items, matches, raw_path, min_score))
+    os.replace(tmp_path, output)
+    return len(items)
+
+def watch(raw_path, output, k=K, min_score=MIN_SCORE):
+    """Keep the table current while the process that started us (a review hard stop) is waiting."""
+    parent = os.getppid()
+    collection = None
+    last = None
+    while os.getppid() == parent:
+        try:
+            stat = raw_path.stat()
+            key = (stat.st_mtime_ns, stat.st_size, source_stamp(raw_path, k, min_score))
+        except OSError:
+            key = None
+        if key is not None and key != last:
+            if not is_fresh(output, key[2]):
+                collection = collection or notes_collection(connect())
+                if build_candidates(raw_path, output, k, min_score, collection) is None:
+                    continue  # edited mid-run: start over on the new text
+            last = key
+        time.sleep(POLL_SECONDS)
+
+def cell(text, limit=120):
+    text = " ".join(text.split())
+    if len(text) > limit:
+        text = text[:limit - 3] + "..."
+    return text.replace('|', '\\|')
+
+def format_table(items, matches, raw_path, min_score=MIN_SCORE):
+    lines = ["# 🧭 Candidate Destinations", "",
+             f"**{len(items)} items** from `{raw_path}` matched against the vault in one pass.",
+             "Verify each candidate (semantic-search.py, or open the note) before it goes in PROCESSING-PLAN.md.", "",
+             "| # | Source | Item | Candidate destinations |",
+             "|---|--------|------|------------------------|"]
+    for n, (item, candidates) in enumerate(zip(items, matches), 1):
+        source = item['source'] if not item['label'] else f"{item['source']} · {item['label']}"
+        close = [f"`{cell(file)}` {score:.0%}" for file, score in candidates if score >= min_score]
+        destinations = "<br>".join(close) if close else "— no close match (new file?)"
+        lines.append(f"| {n} | {cell(source, 60)} (line {item['line']}) | {cell(item['text'])} | {destinations} |")
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Candidate destinations for every RAW-TEXT.md item.")
+    parser.add_argument("raw_text", nargs="?", default="RAW-TEXT.md")
+    parser.add_argument("-k", type=int, default=K, help="candidates per item")
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE, help="hide weaker candidates")
+    parser.add_argument("--output", default=str(OUTPUT_PATH))
+    parser.add_argument("--watch", action="store_true", help="refresh in the background until the caller exits")
+    args = parser.parse_args()
+
+    raw_path = Path(args.raw_text)
+    if args.watch:
+        watch(raw_path, args.output, args.k, args.min_score)
+        return
+    if not raw_path.exists():
+        print(f"❌ {raw_path} not found. Run compile-raw-text.py first.", file=sys.stderr)
+        sys.exit(1)
+
+    if is_fresh(args.output, source_stamp(raw_path, args.k, args.min_score)):
+        print(f"✅ Candidate destinations already up to date (precomputed during review): {args.output}")
+        return
+
+    count = build_candidates(raw_path, args.output, args.k, args.min_score)
+    if count is None:
+        print(f"❌ {raw_path} changed while matching - run again", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ {count} items matched, candidate destinations written to {args.output}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
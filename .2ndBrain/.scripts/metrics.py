@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Structured per-stage performance metrics.
+
+Every stage appends one JSON line to .cache/metrics/metrics.jsonl with wall
+time, CPU time (this process plus the child processes it ran), peak RSS and,
+where it applies, audio duration vs. processing time (real-time factor) and
+items/sec (images, docs, files).
+
+Usage: python3 .2ndBrain/.scripts/metrics.py [--stage NAME] [--runs N]
+       Summarises all recorded runs per stage and flags regressions.
+"""
+
+import argparse
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import profiling
+
+BASE_PATH = Path(__file__).parent.parent.parent  # Go up to 2nd Brain root
+METRICS_PATH = BASE_PATH / ".cache" / "metrics" / "metrics.jsonl"
+
+# Stages slower than this multiple of their historical median are flagged
+REGRESSION_FACTOR = 1.25
+
+def run_id():
+    """One id per top-level run; child scripts inherit it through the environment."""
+    if 'SECOND_BRAIN_RUN_ID' not in os.environ:
+        os.environ['SECOND_BRAIN_RUN_ID'] = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+    return os.environ['SECOND_BRAIN_RUN_ID']
+
+def _maxrss_mb(usage):
+    # ru_maxrss is KiB on Linux but bytes on macOS
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+class StageMetrics(dict):
+    """The record being built for one stage; callers add fields such as
+    items=3, unit='images' or audio_seconds=812.4 while the stage runs."""
+
+    def __init__(self, stage, **fields):
+        super().__init__(stage=stage, **fields)
+        self.child_usages = []
+
+    def add_child(self, usage):
+        """Attribute a child process's rusage (from run_measured) to this stage."""
+        self.child_usages.append(usage)
+
+def run_measured(args, metrics=None, **popen_kwargs):
+    """subprocess.run() that also returns the child's exact rusage via wait4.
+
+    Unlike RUSAGE_CHILDREN deltas this stays correct when several stages run
+    concurrently in one process. Output is captured when capture_output=True."""
+    capture = popen_kwargs.pop('capture_output', False)
+    if capture:
+        popen_kwargs['stdout'] = subprocess.PIPE
+        popen_kwargs['stderr'] = subprocess.PIPE
+    start = time.perf_counter()
+    process = subprocess.Popen(args, **popen_kwargs)
+
+    # Drain pipes on threads so the child never blocks on a full pipe
+    outputs = {}
+    readers = []
+    for name in ('stdout', 'stderr'):
+        stream = getattr(process, name)
+        if stream is not None:
+            reader = threading.Thread(target=lambda n=name, s=stream: outputs.__setitem__(n, s.read()), daemon=True)
+            reader.start()
+            readers.append(reader)
+
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    for reader in readers:
+        reader.join()
+    if metrics is not None:
+        metrics.add_child(usage)
+    profiling.record_child(args, time.perf_counter() - start, usage)
+
+    completed = subprocess.CompletedProcess(args, process.returncode, outputs.get('stdout'), outputs.get('stderr'))
+    return completed, usage
+
+def record(entry):
+    """Append one metrics line (never fails the calling stage)."""
+    try:
+        METRICS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        # One write() on an O_APPEND descriptor keeps concurrent writers' lines intact
+        fd = os.open(METRICS_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode('utf-8'))
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+@contextmanager
+def stage_metrics(stage, per_thread=False, **fields):
+    """Time a stage and record it.
+
+    By default CPU and peak RSS of child processes come from RUSAGE_CHILDREN,
+    which is exact for the sequential scripts. Threaded callers (pipeline.py)
+    pass per_thread=True and attribute children explicitly with run_measured().
+    With SECOND_BRAIN_PROFILE=1 the stage is also profiled (see profiling.py).
+    """
+    m = StageMetrics(stage, **fields)
+    with profiling.StageProfile(stage):
+        children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu_before = time.thread_time() if per_thread else time.process_time()
+        start = time.perf_counter()
+        status = 'ok'
+        try:
+            yield m
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            wall = time.perf_counter() - start
+            cpu = (time.thread_time() if per_thread else time.process_time()) - cpu_before
+            peak_rss = _maxrss_mb(resource.getrusage(resource.RUSAGE_SELF))
+            children_peak = None
+
+            if per_thread:
+                for usage in m.child_usages:
+                    cpu += usage.ru_utime + usage.ru_stime
+                    children_peak = max(children_peak or 0, _maxrss_mb(usage))
+            else:
+                children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+                cpu += (children_after.ru_utime - children_before.ru_utime) + (children_after.ru_stime - children_before.ru_stime)
+                # RUSAGE_CHILDREN holds the largest child ever reaped; it only says
+                # something about this stage if it grew while the stage ran
+                if children_after.ru_maxrss > children_before.ru_maxrss:
+                    children_peak = _maxrss_mb(children_after)
+
+            entry = {
+                'ts': time.time(),
+                'run': run_id(),
+                'host': socket.gethostname(),
+                'script': Path(sys.argv[0]).name,
+                'status': status,
+                'wall_s': round(wall, 4),
+                'cpu_s': round(cpu, 4),
+                'peak_rss_mb': round(peak_rss, 1),
+            }
+            if children_peak is not None:
+                entry['children_peak_rss_mb'] = round(children_peak, 1)
+            entry.update((k, v) for k, v in m.items() if v is not None)
+            if m.get('audio_seconds'):
+                entry['rtf'] = round(wall / m['audio_seconds'], 4)
+            if m.get('items') and wall > 0:
+                entry[f"{m.get('unit', 'items')}_per_sec"] = round(m['items'] / wall, 3)
+            record(entry)
+
+# ============================================================
+# Summary
+# ============================================================
+
+def load_entries(path=None):
+    entries = []
+    try:
+        with open(path or METRICS_PATH, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # torn line from a killed writer
+    except OSError:
+        pass
+    return entries
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+def summarize(entries):
+    """Per stage: counts, wall/CPU totals and percentiles, RTF, throughput, peak RSS."""
+    by_stage = {}
+    for entry in entries:
+        by_stage.setdefault(entry['stage'], []).append(entry)
+
+    summary = {}
+    for stage, rows in sorted(by_stage.items()):
+        ok = [r for r in rows if r.get('status') == 'ok']
+        walls = [r['wall_s'] for r in ok]
+        rates = {}
+        for r in ok:
+            for key, value in r.items():
+                if key.endswith('_per_sec'):
+                    rates.setdefault(key, []).append(value)
+        rss = [max(r.get('peak_rss_mb', 0), r.get('children_peak_rss_mb', 0)) for r in ok]
+        summary[stage] = {
+            'runs': len({r['run'] for r in rows}),
+            'count': len(rows),
+            'errors': len(rows) - len(ok),
+            'wall_total_s': sum(walls),
+            'wall_p50_s': percentile(walls, 50),
+            'wall_p95_s': percentile(walls, 95),
+            'cpu_total_s': sum(r['cpu_s'] for r in ok),
+            'rtf_p50': percentile([r['rtf'] for r in ok if 'rtf' in r], 50),
+            'rates_p50': {key: percentile(values, 50) for key, values in rates.items()},
+            'peak_rss_mb': max(rss) if rss else None,
+        }
+    return summary
+
+def find_regressions(entries):
+    """Stages whose latest run is REGRESSION_FACTOR slower than the median of earlier runs.
+    Normalised by RTF for audio stages and per item elsewhere, so bigger inputs don't count."""
+    by_stage_run = {}
+    for entry in entries:
+        if entry.get('status') != 'ok':
+            continue
+        cost = entry.get('rtf')
+        if cost is None:
+            cost = entry['wall_s'] / entry['items'] if entry.get('items') else entry['wall_s']
+        by_stage_run.setdefault(entry['stage'], {}).setdefault(entry['run'], []).append((entry['ts'], cost))
+
+    regressions = []
+    for stage, runs in by_stage_run.items():
+        ordered = sorted(runs.values(), key=lambda costs: max(ts for ts, _ in costs))
+        if len(ordered) < 2:
+            continue
+        latest = statistics.median(cost for _, cost in ordered[-1])
+        history = statistics.median(cost for costs in ordered[:-1] for _, cost in costs)
+        if history > 0 and latest > history * REGRESSION_FACTOR:
+            regressions.append((stage, latest, history))
+    return regressions
+
+def fmt(value, suffix=""):
+    if value is None:
+        return "-"
+    return f"{value:.2f}{suffix}" if isinstance(value, float) else f"{value}{suffix}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise recorded stage metrics.")
+    parser.add_argument("--stage", help="only this stage")
+    parser.add_argument("--runs", type=int, help="only the last N runs")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    entries = load_entries()
+    if args.stage:
+        entries = [e for e in entries if e['stage'] == args.stage]
+    if args.runs:
+        last_seen = {}
+        for entry in entries:
+            last_seen[entry['run']] = max(last_seen.get(entry['run'], 0), entry['ts'])
+        keep = set(sorted(last_seen, key=last_seen.get)[-args.runs:])
+        entries = [e for e in entries if e['run'] in keep]
+
+    if not entries:
+        print(f"No metrics recorded yet ({METRICS_PATH})")
+        return
+
+    summary = summarize(entries)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"📈 Stage metrics ({len(entries)} records, {len({e['run'] for e in entries})} runs)")
+    print("=" * 96)
+    print(f"{'stage':<14}{'n':>5}{'err':>5}{'wall p50':>10}{'wall p95':>10}{'total':>10}{'cpu/wall':>9}{'RTF p50':>9}{'peak MB':>9}  throughput p50")
+    for stage, s in summary.items():
+        parallelism = s['cpu_total_s'] / s['wall_total_s'] if s['wall_total_s'] else None
+        rates = ", ".join(f"{v:.2f} {k[:-len('_per_sec')]}/s" for k, v in s['rates_p50'].items())
+        print(f"{stage:<14}{s['count']:>5}{s['errors']:>5}{fmt(s['wall_p50_s'], 's'):>10}{fmt(s['wall_p95_s'], 's'):>10}"
+              f"{fmt(s['wall_total_s'], 's'):>10}{fmt(parallelism):>9}{fmt(s['rtf_p50']):>9}{fmt(s['peak_rss_mb']):>9}  {rates or '-'}")
+
+    regressions = find_regressions(entries)
+    if regressions:
+        print(f"\n⚠️  Possible regressions (latest run vs. median of earlier runs):")
+        for stage, latest, history in regressions:
+            print(f"   {stage}: {latest:.3f} vs {history:.3f} ({latest / history:.1f}x)")
+    else:
+        print(f"\n✅ No regressions against earlier runs")
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ from PIL import Image
 from pathlib import Path
 import re
 import sys
+from metrics import stage_metrics
 
 def find_images_in_markdown(md_path):
     """Find all image references in a markdown file."""
@@ -97,22 +98,23 @@ def process_markdown_with_ocr(md_path):
     
     # Process each image
     results = []
-    for i, (alt, img_path) in enumerate(images, 1):
-        print(f"Processing image {i}/{len(images)}: {Path(img_path).name}")
-        
-        text = ocr_image(img_path, md_path)
-        
-        results.append({
-            'alt': alt,
-            'path': img_path,
-            'text': text
-        })
-        
-        # Show preview
-        preview = text[:100].replace('\n', ' ')
-        if len(text) > 100:
-            preview += "..."
-        print(f"  ✓ Extracted: {preview}\n")
+    with stage_metrics("ocr", file=md_path.name, items=len(images), unit="images"):
+        for i, (alt, img_path) in enumerate(images, 1):
+            print(f"Processing image {i}/{len(images)}: {Path(img_path).name}")
+            
+            text = ocr_image(img_path, md_path)
+            
+            results.append({
+                'alt': alt,
+                'path': img_path,
+                'text': text
+            })
+            
+            # Show preview
+            preview = text[:100].replace('\n', ' ')
+            if len(text) > 100:
+                preview += "..."
+            print(f"  ✓ Extracted: {preview}\n")
     
     # Create output markdown
     output_path = md_path.parent / f"{md_path.stem}-ocr.md"
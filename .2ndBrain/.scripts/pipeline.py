@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+"""
+Make-style build of the whole ingestion pipeline.
+
+Models every stage as a target in a dependency DAG and rebuilds only what is
+out of date, judged by content hashes rather than timestamps:
+
+    m4a   → .cache/audio/<stem>.wav → .cache/asr/<stem>.json (WhisperX)
+                                    → .cache/diarization/<stem>.turns.json (diarize.py, in parallel)
+          ASR + speaker turns → <stem>.json → 1-Raw/md/<stem>.md → embedding
+    image → <stem>-ocr.md
+    md with images → <stem>-ocr.md
+    every JSON / markdown / OCR output → RAW-TEXT.md
+
+Independent branches (different recordings, images) run in parallel on
+worker threads that claim jobs from the persistent queue in job_queue.py,
+so an interrupted run picks up exactly where it stopped. resources.py
+decides which jobs may start and how many threads each one gets.
+Unlike compile-raw-text.py this does NOT wait for approval - review
+RAW-TEXT.md afterwards as usual.
+
+Usage: python3 .2ndBrain/.scripts/pipeline.py [--jobs N] [--dry-run] [--model NAME] [--retry-failed]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+from contextlib import closing
+from pathlib import Path
+from dotenv import load_dotenv
+import profiling
+from audio import diarization_mode, get_audio_duration, preprocess_audio, recover_temp_files, whisperx_command
+from catalog import root_files, sha256_of
+from atomic import write_json
+from diarize import label_transcript, reused_turns
+from fingerprint import find_duplicate, remember, try_reuse
+from job_queue import DB_PATH, JobQueue, connect
+from metrics import run_id, run_measured, stage_metrics
+from resources import ResourceBudget, thread_env
+from raw_text import COMPILE_FOOTER, SectionCache, iter_raw_text_sections, write_raw_text
+from vad import read_offsets, save_offsets, write_offsets
+
+SCRIPTS_DIR = Path(__file__).parent
+CHUNK_SIZE = 1024 * 1024
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS targets (name TEXT PRIMARY KEY, key TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT
+);
+"""
+
+class PipelineError(Exception):
+    """A stage ran but did not produce its target."""
+
+class Target:
+    """One node of the build graph.
+
+    recipe identifies the command; if it changes, the target is rebuilt.
+    intermediate targets may be deleted without forcing a rebuild downstream
+    (each run deletes the ones nothing out of date needs any more).
+    virtual targets have no file of their own (e.g. a Chroma embedding).
+    scratch lists temporary files removed if the stage is interrupted.
+    """
+
+    def __init__(self, name, stage, deps, recipe, action, path=None, intermediate=False, scratch=()):
+        self.name = name
+        self.stage = stage
+        self.deps = deps
+        self.recipe = recipe
+        self.action = action
+        self.path = path
+        self.intermediate = intermediate
+        self.scratch = list(scratch)
+
+    @property
+    def virtual(self):
+        return self.path is None
+
+# ============================================================
+# Build state (content hashes + recorded target keys)
+# ============================================================
+
+class BuildState:
+    """Recorded keys per target plus a (size, mtime) -> hash cache for files,
+    kept next to the job queue in .cache/pipeline/pipeline.sqlite."""
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = Path(db_path)
+        self.lock = threading.Lock()
+        with closing(connect(self.db_path)) as conn:
+            conn.executescript(STATE_SCHEMA)
+            self.targets = {row['name']: row['key'] for row in conn.execute("SELECT name, key FROM targets")}
+            self.hashes = {row['path']: dict(row) for row in conn.execute("SELECT * FROM file_hashes")}
+
+    def file_hash(self, path):
+        """SHA-256 of a file, skipping the read while size and mtime are unchanged."""
+        stat = path.stat()
+        key = str(path.resolve())
+        with self.lock:
+            entry = self.hashes.get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                h.update(block)
+        entry = {'path': key, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': h.hexdigest()}
+        with self.lock, closing(connect(self.db_path)) as conn:
+            self.hashes[key] = entry
+            conn.execute("INSERT OR REPLACE INTO file_hashes VALUES (:path, :size, :mtime_ns, :sha256)", entry)
+        return entry['sha256']
+
+    def record(self, target, key):
+        with self.lock, closing(connect(self.db_path)) as conn:
+            self.targets[target.name] = key
+            conn.execute("INSERT OR REPLACE INTO targets VALUES (?, ?)", (target.name, key))
+
+    def forget(self, target):
+        with self.lock, closing(connect(self.db_path)) as conn:
+            self.targets.pop(target.name, None)
+            conn.execute("DELETE FROM targets WHERE name = ?", (target.name,))
+
+    def recorded_key(self, target):
+        with self.lock:
+            return self.targets.get(target.name)
+
+# ============================================================
+# Stage actions
+# ============================================================
+
+def run_script(script, *args, threads=1):
+    """Run a sibling script with its thread pools capped, raising PipelineError on failure.
+    The scripts record their own stage metrics under this run's id."""
+    result, _ = run_measured(
+        profiling.script_command(SCRIPTS_DIR / script, *args),
+        capture_output=True,
+        text=True,
+        env=thread_env(threads)
+    )
+    if result.returncode != 0:
+        raise PipelineError(result.stderr.strip() or result.stdout.strip() or f"{script} failed")
+    return result.stdout
+
+def offsets_sidecar(wav_file):
+    """Where the offset map of a preprocessed wav waits until a transcript is made from it."""
+    return wav_file.with_suffix('.offsets.json')
+
+def preprocess_action(m4a_file, wav_file):
+    def action(threads=1):
+        wav_file.parent.mkdir(parents=True, exist_ok=True)
+        offsets = {}
+        with stage_metrics("preprocess", per_thread=True, file=m4a_file.name) as m:
+            if not preprocess_audio(m4a_file, wav_file, metrics=m, offsets=offsets):
+                raise PipelineError(f"ffmpeg could not preprocess {m4a_file.name}")
+        if offsets:
+            write_offsets(offsets_sidecar(wav_file), offsets)
+    return action
+
+def transcribe_action(wav_file, json_file, model, m4a_file):
+    def action(threads=1):
+        json_file.parent.mkdir(parents=True, exist_ok=True)
+        # The same memo synced twice, or a trimmed copy of one: reuse its transcript
+        match, fingerprint_info = try_reuse(m4a_file, wav_file, json_file)
+        if match:
+            print(f"   ♻️  {json_file.name}: {match['kind']} of {match['name']}, transcript reused")
+            remember(json_file.stem, fingerprint_info)
+            keep_offsets(wav_file, m4a_file)
+            return
+        # WhisperX names its output after the input stem, so no temp_ renaming is needed
+        cmd = whisperx_command(wav_file, wav_file.parent, model=model, threads=threads)
+        with stage_metrics("transcribe", per_thread=True, file=json_file.name, model=model, threads=threads,
+                           audio_seconds=get_audio_duration(wav_file)) as m:
+            result, _ = run_measured(cmd, m, shell=True, capture_output=True, text=True, env=thread_env(threads))
+            produced = wav_file.with_suffix('.json')
+            if result.returncode != 0 or not produced.exists():
+                raise PipelineError(result.stderr.strip()[-500:] or "whisperx failed")
+        os.replace(produced, json_file)
+        remember(json_file.stem, fingerprint_info)
+        keep_offsets(wav_file, m4a_file)
+    return action
+
+def keep_offsets(wav_file, m4a_file):
+    """A transcript was made from wav_file: its offset map becomes the recording's."""
+    offsets = read_offsets(offsets_sidecar(wav_file))
+    if offsets:
+        save_offsets(m4a_file.stem, offsets)
+
+def diarize_action(wav_file, turns_file, m4a_file, json_file):
+    def action(threads=1):
+        # A copy of a recording that already has speakers takes them from its transcript,
+        # like transcribe.py does (diarization runs next to ASR, so it checks for itself)
+        match, _ = find_duplicate(m4a_file, wav_file, json_file.stem)
+        if match is not None:
+            entry = reused_turns(match)
+            if entry['turns']:
+                print(f"   ♻️  {json_file.name}: speakers of {match['name']} reused")
+                write_json(turns_file, entry)
+                return
+        run_script("diarize.py", "run", wav_file, "--turns-out", turns_file, "--threads", threads, threads=threads)
+    return action
+
+def speakers_action(asr_file, turns_file, json_file):
+    def action(threads=1):
+        with open(turns_file, 'r') as f:
+            entry = json.load(f)
+        label_transcript(asr_file, entry, output_path=json_file)
+    return action
+
+def markdown_action(json_file):
+    def action(threads=1):
+        run_script("json-to-markdown.py", "--no-embed", json_file, threads=threads)
+    return action
+
+def embed_action(md_file):
+    def action(threads=1):
+        run_script("embed-note.py", md_file, threads=threads)
+    return action
+
+def ocr_image_action(image_file, ocr_file, work_dir):
+    def action(threads=1):
+        # ocr-images.py works on markdown, so wrap the image in a stub note
+        # kept out of the root (an absolute link resolves from anywhere)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        stub = work_dir / f"{image_file.stem}.md"
+        with open(stub, 'w', encoding='utf-8') as f:
+            f.write(f"![[{image_file.resolve()}]]")
+        run_script("ocr-images.py", stub, threads=threads)
+        os.replace(work_dir / f"{image_file.stem}-ocr.md", ocr_file)
+    return action
+
+def ocr_markdown_action(md_file):
+    def action(threads=1):
+        run_script("ocr-images.py", md_file, threads=threads)
+    return action
+
+def raw_text_action(root_dir, m4a_files, md_files, image_files, ocr_files):
+    def action(threads=1):
+        cache = SectionCache(root_dir / ".cache" / "raw-text")
+        with stage_metrics("raw-text", per_thread=True, items=len(m4a_files) + len(md_files), unit="sources") as m:
+            sections = iter_raw_text_sections(m4a_files, md_files, image_files, ocr_files, root_dir, COMPILE_FOOTER, cache)
+            write_raw_text(root_dir / "RAW-TEXT.md", sections)
+            cache.save()
+            m.update(cache_hits=cache.hits, cache_misses=cache.misses)
+    return action
+
+# ============================================================
+# Graph construction
+# ============================================================
+
+def discover_root_files(root_dir):
+    """Classify everything at root (from the vault catalog, refreshed in one scandir pass)."""
+    return root_files(root_dir)
+
+def has_image_refs(md_file):
+    try:
+        with open(md_file, 'r') as f:
+            return any(x in f.read() for x in ['![', '.jpg', '.jpeg', '.png'])
+    except:
+        return False
+
+def build_graph(root_dir, model="large-v3"):
+    """Return (targets by name, root file listing) for everything currently at root."""
+    files = discover_root_files(root_dir)
+    cache_dir = root_dir / ".cache"
+    diarization = diarization_mode()
+    targets = {}
+
+    def add(target):
+        targets[target.name] = target
+        return target
+
+    raw_text_deps = []
+    originals = {}  # source SHA-256 -> transcript target of its first copy
+
+    for m4a_file in files['m4a']:
+        # Identical copies in one run: later ones wait for the first transcript, then reuse it
+        source_hash = sha256_of(m4a_file, root_dir)
+        after = [originals[source_hash]] if source_hash in originals else []
+        wav_file = cache_dir / "audio" / f"{m4a_file.stem}.wav"
+        json_file = root_dir / f"{m4a_file.stem}.json"
+        md_file = root_dir / "1-Raw" / "md" / f"{m4a_file.stem}.md"
+
+        wav = add(Target(str(wav_file), "preprocess", [str(m4a_file)], "ffmpeg-16k-mono-vad",
+                         preprocess_action(m4a_file, wav_file), path=wav_file, intermediate=True,
+                         scratch=[offsets_sidecar(wav_file)]))
+        asr_file = cache_dir / "asr" / f"{m4a_file.stem}.json"
+        turns_file = cache_dir / "diarization" / f"{m4a_file.stem}.turns.json"
+        # A transcript made by transcribe.py (no ASR output here) is adopted as it is.
+        # DIARIZATION=lazy leaves speakers to compile-raw-text.py (diarize.py pending).
+        if diarization == 'now' and (asr_file.exists() or not json_file.exists()):
+            # Speakers are their own stage: diarization runs next to ASR, then both are merged
+            asr = add(Target(str(asr_file), "transcribe", [wav.name] + after, f"whisperx-{model}",
+                             transcribe_action(wav_file, asr_file, model, m4a_file), path=asr_file,
+                             scratch=[wav_file.with_suffix('.json')]))
+            turns = add(Target(str(turns_file), "diarize", [wav.name] + after, "pyannote-3.1-voices",
+                               diarize_action(wav_file, turns_file, m4a_file, json_file), path=turns_file))
+            transcript = add(Target(str(json_file), "speakers", [asr.name, turns.name], "speakers-v1",
+                                    speakers_action(asr_file, turns_file, json_file), path=json_file))
+        else:
+            transcript = add(Target(str(json_file), "transcribe", [wav.name] + after, f"whisperx-{model}",
+                                    transcribe_action(wav_file, json_file, model, m4a_file), path=json_file,
+                                    scratch=[wav_file.with_suffix('.json')]))
+        markdown = add(Target(str(md_file), "markdown", [transcript.name], "json-to-markdown",
+                              markdown_action(json_file), path=md_file))
+        add(Target(f"embed:{md_file}", "embed", [markdown.name], "embed-note",
+                   embed_action(md_file)))
+        raw_text_deps.append(transcript.name)
+        originals.setdefault(source_hash, transcript.name)
+
+    for image_file in files['image']:
+        ocr_file = root_dir / f"{image_file.stem}-ocr.md"
+        work_dir = cache_dir / "ocr"
+        add(Target(str(ocr_file), "ocr", [str(image_file)], "tesseract",
+                   ocr_image_action(image_file, ocr_file, work_dir), path=ocr_file,
+                   scratch=[work_dir / f"{image_file.stem}.md", work_dir / f"{image_file.stem}-ocr.md"]))
+        raw_text_deps.append(str(ocr_file))
+
+    for md_file in files['md']:
+        raw_text_deps.append(str(md_file))
+        if has_image_refs(md_file):
+            ocr_file = root_dir / f"{md_file.stem}-ocr.md"
+            add(Target(str(ocr_file), "ocr", [str(md_file)], "tesseract",
+                       ocr_markdown_action(md_file), path=ocr_file))
+            raw_text_deps.append(str(ocr_file))
+
+    # OCR output left over from earlier runs is still part of RAW-TEXT.md
+    for ocr_file in files['ocr']:
+        if str(ocr_file) not in raw_text_deps:
+            raw_text_deps.append(str(ocr_file))
+
+    if raw_text_deps:
+        raw_text = root_dir / "RAW-TEXT.md"
+        ocr_files = sorted(Path(name) for name in raw_text_deps if name.endswith('-ocr.md'))
+        add(Target(str(raw_text), "raw-text", raw_text_deps, "raw-text-v1",
+                   raw_text_action(root_dir, files['m4a'], files['md'], files['image'], ocr_files), path=raw_text))
+
+    return targets, files
+
+def topological_order(targets):
+    order, seen = [], set()
+
+    def visit(name):
+        if name in seen or name not in targets:
+            return
+        seen.add(name)
+        for dep in targets[name].deps:
+            visit(dep)
+        order.append(name)
+
+    for name in targets:
+        visit(name)
+    return order
+
+# ============================================================
+# Out-of-date analysis and execution
+# ============================================================
+
+class Builder:
+    """Decides which targets are stale and runs them, independent branches in parallel."""
+
+    def __init__(self, targets, state, budget=None):
+        self.targets = targets
+        self.state = state
+        self.budget = budget or ResourceBudget()
+
+    def dep_identity(self, name):
+        """What a dependent's key is built from: file content, or the key of an intermediate."""
+        target = self.targets.get(name)
+        if target is None:
+            return self.state.file_hash(Path(name))
+        if target.intermediate or target.virtual or not target.path.exists():
+            return self.expected_key(target)
+        return self.state.file_hash(target.path)
+
+    def expected_key(self, target):
+        h = hashlib.sha256(target.recipe.encode('utf-8'))
+        for dep in target.deps:
+            h.update(b'\0' + dep.encode('utf-8') + b'=' + self.dep_identity(dep).encode('utf-8'))
+        return h.hexdigest()
+
+    def adopt(self, target):
+        """Record an output built before the pipeline tracked it (e.g. by transcribe.py)
+        as up to date when it is newer than its sources, like make would - together with
+        the intermediates it is built from, so they are not re-made just to be recorded."""
+        if (target.path is None or target.intermediate or self.state.recorded_key(target) is not None
+                or not target.path.exists()):
+            return
+        if target.path.stat().st_mtime < self.newest_source_mtime(target.name):
+            return
+        self.state.record(target, self.expected_key(target))
+        for dep in target.deps:
+            dep_target = self.targets.get(dep)
+            if dep_target is not None and dep_target.intermediate and self.state.recorded_key(dep_target) is None:
+                self.state.record(dep_target, self.expected_key(dep_target))
+
+    def is_stale(self, target):
+        if self.state.recorded_key(target) != self.expected_key(target):
+            return True
+        return target.path is not None and not target.intermediate and not target.path.exists()
+
+    def newest_source_mtime(self, name):
+        """Latest mtime among the original source files that name is built from."""
+        target = self.targets.get(name)
+        if target is None:
+            path = Path(name)
+            return path.stat().st_mtime if path.exists() else 0
+        return max((self.newest_source_mtime(dep) for dep in target.deps), default=0)
+
+    def plan(self):
+        """Stale targets plus any missing intermediates they need on disk."""
+        order = topological_order(self.targets)
+        # Adopt first: an adopted output also records the intermediates it was built from
+        for name in order:
+            self.adopt(self.targets[name])
+        stale = {name for name in order if self.is_stale(self.targets[name])}
+        # Downstream of a stale target is stale too (until restat proves otherwise)
+        for name in order:
+            if any(dep in stale for dep in self.targets[name].deps):
+                stale.add(name)
+        needed = set(stale)
+        for name in reversed(order):
+            if name in needed:
+                for dep in self.targets[name].deps:
+                    dep_target = self.targets.get(dep)
+                    if dep_target is not None and dep_target.intermediate and not dep_target.path.exists():
+                        needed.add(dep)
+        return [name for name in order if name in needed]
+
+    def run(self, job_queue, jobs=4, retry_failed=False):
+        """Build everything out of date through job_queue with `jobs` worker threads.
+        Workers only take jobs the resource budget can admit right now.
+        Returns (built, skipped, failed) target names."""
+        todo = self.plan()
+        built, skipped, failed = [], [], []
+        pending = list(todo)
+        finished = set(self.targets) - set(todo)
+        queued = set()
+        results = queue.Queue()
+        wake = threading.Condition()
+        stop = threading.Event()
+
+        workers = [
+            threading.Thread(target=self.worker, args=(job_queue, wake, stop, results), daemon=True)
+            for _ in range(max(1, jobs))
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            while pending or queued:
+                for name in list(pending):
+                    target = self.targets[name]
+                    if any(dep in failed or dep in skipped for dep in target.deps):
+                        pending.remove(name)
+                        skipped.append(name)
+                        print(f"   ⏭️  {target.stage}: {name} (dependency failed)")
+                    elif all(dep in finished or dep not in self.targets for dep in target.deps):
+                        pending.remove(name)
+                        key = self.expected_key(target)
+                        # Restat: inputs rebuilt with identical content leave this up to date
+                        if self.state.recorded_key(target) == key and (target.virtual or target.path.exists()):
+                            finished.add(name)
+                            continue
+                        scratch = target.scratch + ([] if target.virtual else [target.path])
+                        state = job_queue.enqueue(target.stage, name, key, scratch, retry_failed)
+                        if state == 'pending':
+                            queued.add(name)
+                        else:
+                            failed.append(name)
+                            reason = "failed too often, use --retry-failed" if state == 'failed' else "held by another run"
+                            print(f"   ❌ {target.stage}: {name} ({reason})")
+                with wake:
+                    wake.notify_all()
+
+                if not queued:
+                    continue
+                name, error = results.get()
+                if name is None:
+                    raise PipelineError(f"a worker stopped: {error}")
+                queued.discard(name)
+                target = self.targets[name]
+                if error is None:
+                    finished.add(name)
+                    built.append(name)
+                    print(f"   ✅ {target.stage}: {name}")
+                else:
+                    failed.append(name)
+                    print(f"   ❌ {target.stage}: {name} - {error}")
+        finally:
+            stop.set()
+            with wake:
+                wake.notify_all()
+
+        return built, skipped, failed
+
+    def prune_intermediates(self, job_queue):
+        """Delete intermediate files (and their scratch files, e.g. the offsets sidecar)
+        that no out-of-date or running target still needs. Returns how many were removed."""
+        needed = {dep for name in self.plan() for dep in self.targets[name].deps}
+        running = {row['target'] for row in job_queue.status() if row['state'] == 'running'}
+        needed |= {dep for name in running if name in self.targets for dep in self.targets[name].deps}
+        removed = 0
+        for target in self.targets.values():
+            if target.intermediate and target.name not in needed and target.path.exists():
+                for path in [target.path] + target.scratch:
+                    path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def worker(self, job_queue, wake, stop, results):
+        """Claim admissible jobs from the queue until stopped; report each outcome on results."""
+        stages = sorted({target.stage for target in self.targets.values()})
+        while not stop.is_set():
+            try:
+                with self.budget.lock:
+                    job = job_queue.claim(stages=self.budget.admissible_stages(stages))
+                    grant = self.budget.reserve(job['stage']) if job is not None else None
+                target = self.targets[job['target']] if job is not None else None
+            except Exception as e:
+                # Without a result the scheduler would wait forever: report and stop
+                results.put((None, str(e) or type(e).__name__))
+                return
+            if job is None:
+                with wake:
+                    wake.wait(timeout=1)
+                continue
+            print(f"   ▶️  {target.stage}: {target.name} ({grant.threads} thread{'s' if grant.threads > 1 else ''})", flush=True)
+            # The old record stays until the new output is recorded: a failed rebuild keeps
+            # its old key (still out of date), and is never adopted as an untracked output
+            existed = target.path is not None and target.path.exists()
+            error = None
+            try:
+                try:
+                    target.action(threads=grant.threads)
+                    if target.path is not None and not target.path.exists():
+                        raise PipelineError(f"{target.stage} did not produce {target.path}")
+                    self.state.record(target, job['key'])
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+                    if not existed and target.path is not None:
+                        target.path.unlink(missing_ok=True)  # partial output of this attempt
+                job_queue.finish(job['id'], error=error)
+            except Exception as e:
+                error = error or f"could not finish the job: {e}"
+            finally:
+                self.budget.release(grant)
+                results.put((target.name, error))
+                with wake:
+                    wake.notify_all()
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild out-of-date ingestion outputs.")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="max parallel stages (default: one per physical core, limited by RAM)")
+    parser.add_argument("--dry-run", "-n", action="store_true", help="show what would be rebuilt")
+    parser.add_argument("--model", default="large-v3", help="WhisperX model (default: large-v3)")
+    parser.add_argument("--retry-failed", action="store_true", help="retry jobs that failed too often")
+    args = parser.parse_args()
+
+    load_dotenv()
+    root_dir = Path(".")
+    # Group every stage's metrics (including child scripts) under one run id
+    run_id()
+
+    # Resume: clean up after an interrupted transcribe.py or pipeline run
+    recover_temp_files(root_dir)
+    job_queue = JobQueue(root_dir / DB_PATH)
+    for job in job_queue.recover():
+        print(f"♻️  Resuming interrupted {job['stage']}: {job['target']}")
+
+    print("📊 Scanning root directory...")
+    targets, files = build_graph(root_dir, model=args.model)
+    print(f"🎵 Audio: {len(files['m4a'])}  📝 Markdown: {len(files['md'])}  🖼️  Images: {len(files['image'])}")
+
+    if not targets:
+        print("\n✅ No files to process at root")
+        return
+
+    budget = ResourceBudget()
+    budget.set_transcribe_model(args.model)
+    builder = Builder(targets, BuildState(root_dir / DB_PATH), budget)
+
+    if args.dry_run:
+        todo = builder.plan()
+        print(f"\n📋 {len(todo)} target(s) out of date:")
+        for name in todo:
+            print(f"   - {targets[name].stage}: {name}")
+        return
+
+    jobs = args.jobs or budget.cores
+    print(f"\n🔧 Building with up to {jobs} parallel job(s): {budget.describe()}")
+    built, skipped, failed = builder.run(job_queue, jobs=jobs, retry_failed=args.retry_failed)
+    pruned = builder.prune_intermediates(job_queue)
+    if pruned:
+        print(f"🧹 Removed {pruned} preprocessed audio file(s) nothing out of date needs")
+
+    print(f"\n{'='*60}")
+    print(f"✅ Rebuilt {len(built)} target(s), {len(targets) - len(built) - len(skipped) - len(failed)} already up to date")
+    if failed or skipped:
+        print(f"❌ {len(failed)} failed, {len(skipped)} skipped because a dependency failed")
+        print(f"📋 Details: python3 .2ndBrain/.scripts/job_queue.py --failed")
+    print(f"{'='*60}")
+    if "RAW-TEXT.md" in {Path(name).name for name in built}:
+        print(f"📝 Review RAW-TEXT.md and fix any transcription errors, then tell AI: 'approved'")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
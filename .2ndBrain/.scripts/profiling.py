@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Opt-in profiling for the pipeline scripts.
+
+Set SECOND_BRAIN_PROFILE=1 (or launch through `profiling.py run`) and every
+stage wrapped in metrics.stage_metrics() also gets:
+  - a cProfile dump per stage (<stage>-<pid>.prof, open with snakeviz/pstats)
+  - wall-clock stack samples of all threads, exported as folded stacks
+    (<script>-<pid>.folded) for flamegraph.pl, speedscope or inferno
+  - timings of every child process (ffmpeg, whisperx, tesseract, sibling
+    scripts) in children.jsonl
+
+`run` additionally profiles the whole script, including the top-level imports
+(torch, chromadb, sentence-transformers) and model loads that happen before
+any stage starts. WhisperX runs under `python -m cProfile` when profiling.
+
+Everything for one run lands in .cache/profiles/<run id>/.
+
+Usage: python3 .2ndBrain/.scripts/profiling.py run <script.py> [args...]
+       python3 .2ndBrain/.scripts/profiling.py report [run id]
+"""
+
+import atexit
+import cProfile
+import json
+import os
+import pstats
+import runpy
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+BASE_PATH = Path(__file__).parent.parent.parent  # Go up to 2nd Brain root
+PROFILES_DIR = BASE_PATH / ".cache" / "profiles"
+SAMPLE_INTERVAL = float(os.getenv('SECOND_BRAIN_PROFILE_INTERVAL', '0.005'))
+
+_lock = threading.Lock()
+_thread_stages = {}  # thread id -> stack of active stage names
+_sampler = None
+_whole_script = threading.local()
+
+def enabled():
+    return os.getenv('SECOND_BRAIN_PROFILE', '') not in ('', '0')
+
+def profile_dir():
+    """Directory for this run (shares the metrics run id)."""
+    from metrics import run_id
+    path = PROFILES_DIR / run_id()
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def _safe(name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+# ============================================================
+# Sampling profiler (all threads, wall clock)
+# ============================================================
+
+class Sampler(threading.Thread):
+    """Samples every thread's Python stack at a fixed interval.
+
+    Unlike cProfile this sees time spent blocked in C extensions and
+    subprocess waits, and it works across threads. Each sample is rooted at
+    the stage its thread was running, so a flame graph splits by stage."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                with _lock:
+                    stages = _thread_stages.get(thread_id)
+                    stage = stages[-1] if stages else "(outside stages)"
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})".replace(';', ':'))
+                    frame = frame.f_back
+                stack.append(stage.replace(';', ':'))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        """Folded-stack format: 'frame;frame;frame count' per line."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+def _ensure_sampler():
+    global _sampler
+    with _lock:
+        if _sampler is None:
+            _sampler = Sampler()
+            _sampler.start()
+            atexit.register(_flush_sampler)
+
+def _flush_sampler():
+    if _sampler is None:
+        return
+    _sampler.stop_event.set()
+    _sampler.join(timeout=1)
+    if _sampler.stacks:
+        script = Path(sys.argv[0]).stem or "python"
+        _sampler.write(profile_dir() / f"{_safe(script)}-{os.getpid()}.folded")
+
+# ============================================================
+# Hooks used by metrics.py
+# ============================================================
+
+class StageProfile:
+    """Profiles one stage; a no-op unless profiling is enabled."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.profiler = None
+
+    def __enter__(self):
+        if not enabled():
+            return self
+        _ensure_sampler()
+        with _lock:
+            _thread_stages.setdefault(threading.get_ident(), []).append(self.stage)
+        # One cProfile per thread: under `run` the whole-script profile already covers this
+        if not getattr(_whole_script, 'active', False):
+            try:
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+            except ValueError:
+                self.profiler = None  # another profiler owns this thread (Python 3.12+)
+        return self
+
+    def __exit__(self, *exc):
+        if not enabled():
+            return False
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(profile_dir() / f"{_safe(self.stage)}-{os.getpid()}-{threading.get_ident()}.prof")
+        with _lock:
+            stages = _thread_stages.get(threading.get_ident())
+            if stages:
+                stages.pop()
+        return False
+
+def current_stage():
+    with _lock:
+        stages = _thread_stages.get(threading.get_ident())
+        return stages[-1] if stages else None
+
+def record_child(args, wall, usage=None):
+    """Log one finished child process (its command, wall and CPU time, peak RSS)."""
+    if not enabled():
+        return
+    command = args if isinstance(args, str) else " ".join(str(a) for a in args)
+    entry = {
+        'ts': time.time(),
+        'pid': os.getpid(),
+        'stage': current_stage(),
+        'command': command[:300],
+        'wall_s': round(wall, 4),
+    }
+    if usage is not None:
+        entry['user_s'] = round(usage.ru_utime, 4)
+        entry['sys_s'] = round(usage.ru_stime, 4)
+        entry['maxrss_kb'] = usage.ru_maxrss // (1024 if sys.platform == 'darwin' else 1)
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    fd = os.open(profile_dir() / "children.jsonl", os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+def python_prefix(name):
+    """Interpreter prefix for a Python child: profiled with cProfile when enabled."""
+    if not enabled():
+        return "python3"
+    return f'python3 -m cProfile -o "{profile_dir() / (_safe(name) + ".prof")}"'
+
+def script_command(script, *args):
+    """argv for running a sibling script, through `profiling.py run` when enabled."""
+    script = str(script)
+    if not enabled():
+        return [sys.executable, script, *[str(a) for a in args]]
+    return [sys.executable, str(Path(__file__)), "run", script, *[str(a) for a in args]]
+
+# ============================================================
+# CLI
+# ============================================================
+
+def run_script(script, args):
+    """Run a script as __main__ under cProfile and the sampler, imports included."""
+    os.environ['SECOND_BRAIN_PROFILE'] = '1'
+    from metrics import run_id
+    run_id()
+
+    script = Path(script)
+    sys.argv = [str(script), *args]
+    sys.path.insert(0, str(script.parent))
+    _ensure_sampler()
+    with _lock:
+        _thread_stages.setdefault(threading.get_ident(), []).append(f"script:{script.stem}")
+
+    profiler = cProfile.Profile()
+    _whole_script.active = True
+    exit_code = 0
+    profiler.enable()
+    try:
+        runpy.run_path(str(script), run_name="__main__")
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        profiler.disable()
+        _whole_script.active = False
+        profiler.dump_stats(profile_dir() / f"script-{_safe(script.stem)}-{os.getpid()}.prof")
+    return exit_code
+
+def report(run=None):
+    if not PROFILES_DIR.exists():
+        print(f"No profiles recorded yet ({PROFILES_DIR})")
+        return
+    runs = sorted(PROFILES_DIR.iterdir(), key=lambda p: p.stat().st_mtime)
+    run_dir = PROFILES_DIR / run if run else (runs[-1] if runs else None)
+    if run_dir is None or not run_dir.exists():
+        print(f"No such profile run: {run}")
+        return
+
+    print(f"🔬 Profile run: {run_dir.name}")
+    print("=" * 60)
+
+    children = []
+    children_file = run_dir / "children.jsonl"
+    if children_file.exists():
+        with open(children_file, 'r', encoding='utf-8') as f:
+            children = [json.loads(line) for line in f if line.strip()]
+    if children:
+        print("\n⏱️  Child processes by wall time:")
+        for child in sorted(children, key=lambda c: -c['wall_s'])[:15]:
+            cpu = child.get('user_s', 0) + child.get('sys_s', 0)
+            print(f"   {child['wall_s']:>9.2f}s wall {cpu:>9.2f}s cpu  [{child.get('stage') or '-'}] {child['command'][:70]}")
+
+    for prof in sorted(run_dir.glob("*.prof")):
+        print(f"\n📄 {prof.name} - top functions by cumulative time:")
+        stats = pstats.Stats(str(prof))
+        rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:8]
+        for (filename, line, name), (_, calls, _, cumulative, _) in rows:
+            print(f"   {cumulative:>9.2f}s {calls:>8} calls  {name} ({Path(filename).name}:{line})")
+
+    folded = sorted(run_dir.glob("*.folded"))
+    if folded:
+        print("\n🔥 Flame graphs (folded stacks):")
+        for path in folded:
+            print(f"   {path}")
+        print("   Render with: flamegraph.pl FILE > flame.svg   (or drop the file on https://www.speedscope.app)")
+
+def main():
+    if len(sys.argv) >= 3 and sys.argv[1] == "run":
+        sys.exit(run_script(sys.argv[2], sys.argv[3:]))
+    if len(sys.argv) in (2, 3) and sys.argv[1] == "report":
+        report(sys.argv[2] if len(sys.argv) == 3 else None)
+        return
+    print("Usage: python3 .2ndBrain/.scripts/profiling.py run <script.py> [args...]", file=sys.stderr)
+    print("       python3 .2ndBrain/.scripts/profiling.py report [run id]", file=sys.stderr)
+    sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Shared RAW-TEXT.md compiler used by compile-raw-text.py and process.py.
+Sections are produced by a generator and streamed straight to disk, so memory
+stays bounded by the largest single input rather than the whole document.
+Rendered transcripts are cached under .cache/raw-text/ by source hash, so a
+re-compile only re-renders the JSON files that changed. Markdown and OCR
+sections are the source text verbatim and are copied straight through.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from atomic import replacing
+from transcript_store import load_segments
+
+COMPILE_FOOTER = (
+    "**Next Step: Review this file, fix any transcription errors, then tell AI: 'approved'**\n"
+    "**AI will then read RAW-TEXT.md and create PROCESSING-PLAN.md using semantic search**\n"
+)
+
+PROCESS_FOOTER = "**AI: Read all text above and create PROCESSING-PLAN.md with specific actions**\n"
+
+# Bump when the transcript rendering below changes, to invalidate cached sections
+RENDER_VERSION = 1
+
+CHUNK_SIZE = 1024 * 1024
+
+class SectionCache:
+    """Rendered transcript sections on disk, keyed by the source file's SHA-256.
+
+    A manifest remembers (size, mtime) -> hash per source so unchanged files
+    are not even re-hashed on the next compile.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.manifest_path = self.cache_dir / "manifest.json"
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        self.used = {}
+        self.hits = 0
+        self.misses = 0
+
+    def file_hash(self, path):
+        """SHA-256 of path, reusing the manifest entry while size and mtime match."""
+        stat = path.stat()
+        entry = self.manifest.get(str(path.resolve()))
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            digest = entry['sha256']
+        else:
+            h = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    h.update(block)
+            digest = h.hexdigest()
+        self.used[str(path.resolve())] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        return digest
+
+    def section_path(self, path):
+        return self.cache_dir / f"transcript-v{RENDER_VERSION}-{self.file_hash(path)}.md"
+
+    def save(self):
+        """Write the manifest and drop cached sections no longer backed by a source."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        keep = {f"transcript-v{RENDER_VERSION}-{e['sha256']}.md" for e in self.used.values()}
+        for cached in self.cache_dir.glob("transcript-*.md"):
+            if cached.name not in keep:
+                cached.unlink()
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.used, f)
+        os.replace(tmp_path, self.manifest_path)
+
+def render_transcript(json_file):
+    """Yield the speaker-labelled transcript of a WhisperX JSON piece by piece."""
+    segments, _ = load_segments(json_file)
+    if segments:
+        current_speaker = None
+        for seg in segments:
+            speaker = seg.get('speaker', 'SPEAKER_00')
+            text = seg.get('text', '').strip()
+
+            # Show speaker label when speaker changes
+            if speaker != current_speaker:
+                yield f"\n**{speaker}:** "
+                current_speaker = speaker
+
+            yield text + " "
+        yield "\n\n"
+    else:
+        yield "*No transcript available*\n\n"
+
+def iter_transcript(json_file, cache=None):
+    """Yield a transcript section, splicing it from cache when the JSON is unchanged."""
+    if cache is None:
+        try:
+            yield from render_transcript(json_file)
+        except Exception as e:
+            yield f"*Error reading transcript: {e}*\n\n"
+        return
+
+    try:
+        section_path = cache.section_path(json_file)
+    except OSError as e:
+        yield f"*Error reading transcript: {e}*\n\n"
+        return
+
+    if section_path.exists():
+        cache.hits += 1
+        with open(section_path, 'r', encoding='utf-8', newline='') as f:
+            yield from iter(lambda: f.read(CHUNK_SIZE), '')
+        return
+
+    # Render once, teeing chunks into the cache; only complete renders are kept
+    cache.misses += 1
+    cache.cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = section_path.with_suffix('.tmp')
+    complete = False
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as out:
+            try:
+                for chunk in render_transcript(json_file):
+                    out.write(chunk)
+                    yield chunk
+                complete = True
+            except Exception as e:
+                yield f"*Error reading transcript: {e}*\n\n"
+        if complete:
+            os.replace(tmp_path, section_path)
+    finally:
+        if not complete:
+            tmp_path.unlink(missing_ok=True)
+
+def iter_file_section(i, path):
+    """Yield a '### [i] name' section holding the full text of a markdown file."""
+    try:
+        with open(path, 'r') as f:
+            content = f.read()
+        yield f"### [{i}] {path.name}\n"
+        yield content
+        yield "\n\n"
+    except:
+        yield f"### [{i}] {path.name}\nError reading\n\n"
+
+def ocr_outputs(files, root_dir):
+    """Root -ocr.md files for RAW-TEXT.md: those in a root_files() listing plus the ones
+    OCR made since from its markdown and images (the listing predates the OCR run)."""
+    made = (Path(root_dir) / f"{path.stem}-ocr.md" for path in files['md'] + files['image'])
+    return sorted(set(files['ocr']) | {path for path in made if path.exists()})
+
+def iter_raw_text_sections(m4a_files, md_files, image_files, ocr_files, root_dir, footer=COMPILE_FOOTER, cache=None):
+    """Yield RAW-TEXT.md in order: transcripts with speakers, markdown, OCR.
+    The file lists come from the caller's one catalog listing (see ocr_outputs).
+    With a SectionCache, unchanged transcripts are spliced from disk instead of re-rendered."""
+    yield "# 🗂️ Raw Text (Transcripts, Markdown, OCR)\n\n"
+    yield f"**Generated from {len(m4a_files)} audio, {len(md_files)} markdown, {len(image_files)} images**\n\n"
+    yield "---\n\n"
+
+    # Audio transcripts - read directly from JSON to get speaker info (from root)
+    if m4a_files:
+        yield "## 🎵 Audio Transcripts\n\n"
+        for i, m4a_file in enumerate(m4a_files, 1):
+            json_file = root_dir / f"{m4a_file.stem}.json"
+            yield f"### [{i}] {m4a_file.name}\n\n"
+
+            if json_file.exists():
+                yield from iter_transcript(json_file, cache)
+            else:
+                yield "*JSON file not found*\n\n"
+
+    # Markdown files (exclude system files)
+    if md_files:
+        yield "## 📝 Markdown Files\n\n"
+        for i, md_file in enumerate(md_files, 1):
+            yield from iter_file_section(i, md_file)
+
+    # OCR results (-ocr.md files)
+    if ocr_files:
+        yield "## 🖼️ OCR Extracted Text\n\n"
+        for i, ocr_file in enumerate(ocr_files, 1):
+            yield from iter_file_section(i, ocr_file)
+
+    yield "---\n\n"
+    yield footer
+
+def write_raw_text(output_file, sections):
+    """Stream sections to output_file as they are produced (replaced only once complete,
+    so a failure mid-stream keeps the previous copy for review)."""
+    output_file = Path(output_file)
+    with replacing(output_file) as f:
+        for chunk in sections:
+            f.write(chunk)
+    return output_file
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Precomputed "related notes" graph.
+
+The k nearest neighbours (cosine similarity) of every note embedding are
+computed in one blocked matrix pass and stored in .cache/related/related.sqlite,
+so "what else is this note similar to?" is an indexed lookup instead of another
+semantic-search.py run. Updates are incremental: only notes whose embedding
+changed (plus rows that pointed at them) are recomputed.
+
+Usage: python3 .2ndBrain/.scripts/related_notes.py [update]           (refresh the graph)
+       python3 .2ndBrain/.scripts/related_notes.py show "3-Memos/note.md"
+       python3 .2ndBrain/.scripts/related_notes.py clusters [--threshold 0.8]
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from pathlib import Path
+
+import numpy as np
+
+from metrics import stage_metrics
+from vector_db import BASE_PATH, connect, notes_collection
+
+GRAPH_PATH = BASE_PATH / ".cache" / "related" / "related.sqlite"
+K = 10
+BLOCK = 1024  # rows per similarity block (BLOCK x n float32 in memory)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS edges (
+    id TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    neighbor TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (id, rank)
+);
+CREATE INDEX IF NOT EXISTS notes_file ON notes (file);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def open_graph(path=None):
+    path = Path(path or GRAPH_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.executescript(SCHEMA)
+    return conn
+
+def fingerprint(vector):
+    return hashlib.sha1(np.ascontiguousarray(vector, dtype=np.float32).tobytes()).hexdigest()
+
+def normalize(embeddings):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+def top_k(rows, matrix, row_indexes, k):
+    """Top-k (indexes, scores) of rows against matrix, skipping each row's own column
+    (row_indexes=None when the rows are not part of matrix)."""
+    scores = rows @ matrix.T
+    if row_indexes is not None:
+        scores[np.arange(len(rows)), row_indexes] = -np.inf
+    k = min(k, matrix.shape[0] - (row_indexes is not None))
+    if k <= 0:
+        return np.empty((len(rows), 0), dtype=np.int64), np.empty((len(rows), 0), dtype=np.float32)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+def load_embeddings(collection):
+    """(ids, files, unit vectors) for every note in the collection."""
+    data = collection.get(include=["embeddings", "metadatas"])
+    ids = list(data['ids'])
+    files = [(m or {}).get('file', i) for i, m in zip(ids, data['metadatas'])]
+    if not ids:
+        return ids, files, np.empty((0, 0), dtype=np.float32)
+    return ids, files, normalize(data['embeddings'])
+
+def update_graph(collection, k=K, path=None):
+    """Bring the stored graph up to date with the collection. Returns (recomputed, total)."""
+    ids, files, vectors = load_embeddings(collection)
+    index = {note_id: i for i, note_id in enumerate(ids)}
+    prints = [fingerprint(v) for v in vectors]
+
+    with closing(open_graph(path)) as conn, stage_metrics("related-notes", unit="notes") as m:
+        stored_k = conn.execute("SELECT value FROM meta WHERE key = 'k'").fetchone()
+        old_prints = dict(conn.execute("SELECT id, fingerprint FROM notes"))
+        rebuild = stored_k is None or int(stored_k[0]) != k
+        if rebuild:
+            old_prints = {}  # new graph or different k: start from scratch
+
+        changed = {note_id for note_id, fp in zip(ids, prints) if old_prints.get(note_id) != fp}
+        removed = set(old_prints) - set(ids)
+        stale = changed | removed
+
+        # Rows that keep their neighbours unless a changed note now beats them
+        keep = {}
+        if stale != set(ids) and old_prints:
+            for note_id, rank, neighbor, score in conn.execute("SELECT id, rank, neighbor, score FROM edges ORDER BY id, rank"):
+                if note_id not in changed and note_id in index:
+                    keep.setdefault(note_id, []).append((neighbor, score))
+        recompute = set(changed)
+        for note_id in ids:
+            neighbors = keep.get(note_id, [])
+            if any(n in stale for n, _ in neighbors) or len(neighbors) < min(k, len(ids) - 1):
+                recompute.add(note_id)  # lost a neighbour (or never had enough): needs its full row
+
+        new_edges = {}
+        rows = [index[note_id] for note_id in ids if note_id in recompute]
+        for start in range(0, len(rows), BLOCK):
+            block = np.array(rows[start:start + BLOCK])
+            neighbors, scores = top_k(vectors[block], vectors, block, k)
+            for r, i in enumerate(block):
+                new_edges[ids[i]] = [(ids[j], float(s)) for j, s in zip(neighbors[r], scores[r])]
+
+        # Unchanged rows: merge in changed notes that now rank in their top k
+        changed_rows = np.array([index[note_id] for note_id in changed], dtype=np.int64)
+        merge_ids = [note_id for note_id in keep if note_id not in recompute]
+        if len(changed_rows) and merge_ids:
+            for start in range(0, len(merge_ids), BLOCK):
+                chunk = merge_ids[start:start + BLOCK]
+                scores = vectors[[index[n] for n in chunk]] @ vectors[changed_rows].T
+                for r, note_id in enumerate(chunk):
+                    floor = keep[note_id][-1][1] if len(keep[note_id]) >= k else -np.inf
+                    better = [(ids[changed_rows[c]], float(scores[r, c])) for c in np.flatnonzero(scores[r] > floor)]
+                    if better:
+                        merged = sorted(keep[note_id] + better, key=lambda e: -e[1])[:k]
+                        new_edges[note_id] = merged
+
+        conn.execute("BEGIN")
+        if rebuild:
+            conn.execute("DELETE FROM notes")
+            conn.execute("DELETE FROM edges")
+        for note_id in removed:
+            conn.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+            conn.execute("DELETE FROM edges WHERE id = ?", (note_id,))
+        for note_id, neighbors in new_edges.items():
+            conn.execute("DELETE FROM edges WHERE id = ?", (note_id,))
+            conn.executemany(
+                "INSERT INTO edges (id, rank, neighbor, score) VALUES (?, ?, ?, ?)",
+                [(note_id, rank, n, s) for rank, (n, s) in enumerate(neighbors)]
+            )
+        conn.executemany(
+            "INSERT OR REPLACE INTO notes (id, file, fingerprint) VALUES (?, ?, ?)",
+            [(note_id, files[index[note_id]], prints[index[note_id]]) for note_id in changed]
+        )
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('k', ?)", (str(k),))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('updated', ?)", (str(time.time()),))
+        conn.commit()
+        m.update(items=len(ids), recomputed=len(recompute), merged=len(new_edges) - len(recompute))
+    return len(recompute), len(ids)
+
+def related(file, limit=K, path=None):
+    """[(file, score)] most similar to a note, best first (an indexed lookup)."""
+    with closing(open_graph(path)) as conn:
+        return conn.execute(
+            "SELECT n.file, e.score FROM notes AS src "
+            "JOIN edges AS e ON e.id = src.id JOIN notes AS n ON n.id = e.neighbor "
+            "WHERE src.file = ? ORDER BY e.rank LIMIT ?",
+            (file, limit)
+        ).fetchall()
+
+def clusters(threshold, path=None):
+    """Groups of notes linked by edges scoring at least threshold (merge candidates)."""
+    with closing(open_graph(path)) as conn:
+        edges = conn.execute(
+            "SELECT a.file, b.file, e.score FROM edges AS e "
+            "JOIN notes AS a ON a.id = e.id JOIN notes AS b ON b.id = e.neighbor WHERE e.score >= ?",
+            (threshold,)
+        ).fetchall()
+    parent = {}
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    best = {}
+    for a, b, score in edges:
+        parent[find(a)] = find(b)
+        best[frozenset((a, b))] = score
+    groups = {}
+    for node in parent:
+        groups.setdefault(find(node), []).append(node)
+    result = []
+    for members in groups.values():
+        if len(members) > 1:
+            top = max(s for pair, s in best.items() if pair <= set(members))
+            result.append((top, sorted(members)))
+    return sorted(result, key=lambda g: (-g[0], g[1]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Related-notes graph over the note embeddings.")
+    sub = parser.add_subparsers(dest="command")
+    update = sub.add_parser("update", help="refresh the graph (default)")
+    update.add_argument("-k", type=int, default=K, help="neighbours per note")
+    show = sub.add_parser("show", help="notes related to one note")
+    show.add_argument("file")
+    show.add_argument("-n", type=int, default=K)
+    cluster = sub.add_parser("clusters", help="groups of very similar notes (merge candidates)")
+    cluster.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    if args.command == "show":
+        rows = related(args.file, args.n)
+        if not rows:
+            print(f"No related notes recorded for {args.file} (run: related_notes.py update)")
+            return
+        print(f"🔗 Related to {args.file}:")
+        for file, score in rows:
+            print(f"   {score:.2%}  {file}")
+        return
+
+    if args.command == "clusters":
+        groups = clusters(args.threshold)
+        if not groups:
+            print(f"✅ No groups of notes above {args.threshold:.0%} similarity")
+            return
+        print(f"🧩 {len(groups)} groups of closely related notes (consider merging):")
+        for score, members in groups:
+            print(f"\n   up to {score:.2%} similar:")
+            for member in members:
+                print(f"   - {member}")
+        return
+
+    client = connect()
+    recomputed, total = update_graph(notes_collection(client), getattr(args, 'k', K))
+    print(f"✅ Related-notes graph up to date: {total} notes, {recomputed} rows recomputed ({GRAPH_PATH})")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,131 @@
+"""
+CPU and memory budgeting for pipeline stages.
+
+Each stage has a rough memory footprint and a thread range. The budget hands
+out physical cores so concurrent torch/OpenMP pools never add up to more than
+the machine has, and only admits a job when its memory estimate fits in the
+headroom left by jobs already running - so whisperx large-v3 and an embedding
+rebuild can share a 16 GB laptop without swapping.
+"""
+
+import os
+import threading
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+GB = 1024 ** 3
+
+# Rough resident footprints (GB) and thread ranges per stage
+STAGE_PROFILES = {
+    "preprocess": {"mem_gb": 0.3, "min_threads": 1, "max_threads": 1},
+    "transcribe": {"mem_gb": 4.2, "min_threads": 2, "max_threads": None},
+    "diarize": {"mem_gb": 1.2, "min_threads": 1, "max_threads": 4},
+    "speakers": {"mem_gb": 0.2, "min_threads": 1, "max_threads": 1},
+    "markdown": {"mem_gb": 0.2, "min_threads": 1, "max_threads": 1},
+    "embed": {"mem_gb": 1.2, "min_threads": 1, "max_threads": 4},
+    "ocr": {"mem_gb": 0.4, "min_threads": 1, "max_threads": 1},
+    "raw-text": {"mem_gb": 0.2, "min_threads": 1, "max_threads": 1},
+}
+
+# WhisperX footprint by model (ASR + alignment, int8 on CPU; pyannote runs in diarize.py)
+TRANSCRIBE_MEM_GB = {"tiny": 1.2, "base": 1.4, "small": 2.0, "medium": 3.2, "large-v2": 4.2, "large-v3": 4.2}
+
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "OMP_THREAD_LIMIT",
+)
+
+def physical_cores():
+    """Physical cores (hyperthreads don't help torch's GEMMs)."""
+    cores = psutil.cpu_count(logical=False) if psutil else None
+    return cores or os.cpu_count() or 1
+
+def available_memory():
+    """Bytes of memory available without swapping (None if unknown)."""
+    return psutil.virtual_memory().available if psutil else None
+
+def total_memory():
+    return psutil.virtual_memory().total if psutil else None
+
+def thread_env(threads, base=None):
+    """Environment that caps every BLAS/OpenMP pool (torch, tesseract, numpy) at `threads`."""
+    env = dict(os.environ if base is None else base)
+    for var in THREAD_ENV_VARS:
+        env[var] = str(threads)
+    return env
+
+class Grant:
+    """Cores and memory reserved for one running job."""
+
+    def __init__(self, stage, threads, mem_bytes):
+        self.stage = stage
+        self.threads = threads
+        self.mem_bytes = mem_bytes
+
+class ResourceBudget:
+    """Admission control: cores are handed out exactly, memory against measured headroom."""
+
+    def __init__(self, cores=None, safety_gb=None, profiles=None):
+        self.cores = cores or physical_cores()
+        total = total_memory()
+        # Keep 10% of RAM (at least 1.5 GB) for the OS, Obsidian, the browser...
+        self.safety_bytes = int((safety_gb if safety_gb is not None else max(1.5, (total or 0) / GB * 0.1)) * GB)
+        available = available_memory()
+        # What the pipeline may commit in total: headroom measured before any job started
+        self.capacity_bytes = None if available is None else max(0, available - self.safety_bytes)
+        self.profiles = profiles or STAGE_PROFILES
+        self.lock = threading.RLock()
+        self.free_cores = self.cores
+        self.running = []
+
+    def set_transcribe_model(self, model):
+        self.profiles = dict(self.profiles)
+        self.profiles["transcribe"] = dict(self.profiles["transcribe"], mem_gb=TRANSCRIBE_MEM_GB.get(model, 4.2))
+
+    def committed_bytes(self):
+        return sum(grant.mem_bytes for grant in self.running)
+
+    def admits(self, stage):
+        """Could a `stage` job start right now?"""
+        profile = self.profiles.get(stage, STAGE_PROFILES["raw-text"])
+        with self.lock:
+            if not self.running:
+                return True  # never deadlock: a lone job always runs
+            if self.free_cores < profile["min_threads"]:
+                return False
+            if self.capacity_bytes is None:
+                return True
+            # Estimates of running jobs count in full (models load gradually, so
+            # live free memory alone would admit too much), and nothing new starts
+            # while something outside the pipeline has pushed us into the reserve
+            if self.committed_bytes() + profile["mem_gb"] * GB > self.capacity_bytes:
+                return False
+            return available_memory() >= self.safety_bytes
+
+    def admissible_stages(self, stages):
+        return [stage for stage in stages if self.admits(stage)]
+
+    def reserve(self, stage):
+        """Reserve cores and memory for a job that is starting (call after admits())."""
+        profile = self.profiles.get(stage, STAGE_PROFILES["raw-text"])
+        with self.lock:
+            # Unbounded stages leave one core for the light stages queued behind them
+            max_threads = profile["max_threads"] or max(1, self.cores - 1)
+            threads = max(1, min(max_threads, self.free_cores))
+            grant = Grant(stage, threads, int(profile["mem_gb"] * GB))
+            self.free_cores -= threads
+            self.running.append(grant)
+            return grant
+
+    def release(self, grant):
+        with self.lock:
+            self.running.remove(grant)
+            self.free_cores += grant.threads
+
+    def describe(self):
+        available = available_memory()
+        memory = f"{available / GB:.1f} GB available" if available is not None else "memory unknown (psutil missing)"
+        return f"{self.cores} physical cores, {memory}, {self.safety_bytes / GB:.1f} GB reserved for the system"
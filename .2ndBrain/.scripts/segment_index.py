@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Segment-level index of transcripts.
+
+Every WhisperX segment (speaker, start, end, text) of a transcript note is
+embedded as its own record in the "segments" collection, next to the
+whole-note "notes" collection. semantic-search.py then answers with the note,
+the time range and the speaker of the matching moment, without reopening the
+JSON or scanning the note's word table. Times are stored on the original
+recording's timeline (vad.py's offset map), not the trimmed one WhisperX saw.
+
+Segments are indexed whenever a 1-Raw/md transcript note is embedded
+(embed-note.py, init-vector-db.py).
+
+Usage: python3 .2ndBrain/.scripts/segment_index.py   (re-index every transcript note)
+"""
+
+import sys
+from pathlib import Path
+from catalog import query
+from metrics import stage_metrics
+from transcript_store import load_segments
+from vad import original_time
+from vector_db import BASE_PATH, connect, load_model, open_collection, relative_to_vault
+from vector_writer import delete_ops, upsert_ops, write
+
+COLLECTION = "segments"
+
+def segments_collection(client):
+    return open_collection(client, COLLECTION, {"description": "Timestamped transcript segments"})
+
+def transcript_json_for(md_path, base_path=None):
+    """The WhisperX JSON behind a 1-Raw/md transcript note, or None for other notes."""
+    md_path = Path(md_path)
+    if md_path.parent.name != "md" or md_path.parent.parent.name != "1-Raw":
+        return None
+    for candidate in (md_path.parent.parent / "json" / f"{md_path.stem}.json",
+                      Path(base_path or BASE_PATH) / f"{md_path.stem}.json"):
+        if candidate.exists():
+            return candidate
+    return None
+
+def segment_units(json_path):
+    """(index, speaker, start, end, text) for each segment with text, times in the original recording."""
+    segments, _ = load_segments(json_path)
+    at = original_time(Path(json_path).stem)
+    for i, seg in enumerate(segments):
+        text = seg.get('text', '').strip()
+        if not text or 'start' not in seg or 'end' not in seg:
+            continue
+        yield i, seg.get('speaker', 'UNKNOWN'), at(seg['start']), at(seg['end']), text
+
+def index_transcripts(collection, model, transcripts, base_path=None, client=None):
+    """Replace the segment records of each (json_path, md_path) with one batched encode,
+    written through the single vector writer. Returns the number of segments indexed."""
+    ids, texts, metadatas, notes = [], [], [], []
+    for json_path, md_path in transcripts:
+        note = relative_to_vault(md_path, base_path)
+        notes.append(note)
+        for i, speaker, start, end, text in segment_units(json_path):
+            ids.append(f"{note}#{i}")
+            texts.append(text)
+            metadatas.append({
+                "file": note,
+                "filename": Path(md_path).name,
+                "speaker": speaker,
+                "start": float(start),
+                "end": float(end),
+                "segment": i,
+            })
+
+    # Drop records of segments that no longer exist (re-transcribed or edited JSON),
+    # in the same queued write as the new ones
+    rows = []
+    for note in notes:
+        rows.extend(delete_ops(collection.name, where={"file": note}))
+    if ids:
+        with stage_metrics("embed-segments", items=len(ids), unit="segments", transcripts=len(notes)):
+            embeddings = model.encode(texts, batch_size=64, convert_to_tensor=False)
+        rows.extend(upsert_ops(collection.name, ids, embeddings, texts, metadatas))
+    write(rows, client)
+    return len(ids)
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    mins, secs = divmod(rest, 60)
+    return f"{hours}:{mins:02d}:{secs:02d}" if hours else f"{mins}:{secs:02d}"
+
+def main():
+    transcripts = []
+    for md_path in query('md', '1-Raw/md'):
+        json_path = transcript_json_for(md_path)
+        if json_path is not None:
+            transcripts.append((json_path, md_path))
+    if not transcripts:
+        print("⚠️  No transcript notes found to index.")
+        return
+
+    print(f"🎙️  Indexing segments of {len(transcripts)} transcripts...")
+    client = connect()
+    count = index_transcripts(segments_collection(client), load_model(), transcripts, client=client)
+    print(f"✅ Indexed {count} segments")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
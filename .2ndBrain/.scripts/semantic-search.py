@@ -6,11 +6,14 @@ Usage: python3 0-Second-Brain/scripts/semantic-search.py "morning routines"
 """
 
 import chromadb
-from sentence_transformers import SentenceTransformer
 from pathlib import Path
 import sys
+from metrics import stage_metrics
+import compact_index
+from segment_index import COLLECTION as SEGMENTS, format_timestamp
+from vector_db import EXCERPT_CHARS, index_settings, load_model, read_excerpt, similarity
 
-def semantic_search(query, n_results=10):
+def semantic_search(query, n_results=10, n_segments=5):
     """Search the vector database for semantically similar notes."""
     
     # Setup paths (scripts are in 0-Second-Brain/scripts/, DB is at root)
@@ -26,45 +29,85 @@ def semantic_search(query, n_results=10):
         # Initialize ChromaDB
         client = chromadb.PersistentClient(path=str(db_path))
         collection = client.get_collection(name="notes")
+        space = index_settings(collection)["space"]
+        
+        # Compact mode (compact_index.py build): reduced-vector first pass, full-vector rerank
+        compact = compact_index.load_index()
+        if compact is not None and not compact_index.covers(compact, collection):
+            print("⚠️  Compact index is out of date - searching the full index (run: compact_index.py build)", file=sys.stderr)
+            compact = None
         
         # Load embedding model
         print("🔍 Searching for:", query)
         print("=" * 60)
-        model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-        
-        # Generate query embedding
-        query_embedding = model.encode(query, convert_to_tensor=False)
+        model = load_model()
         
-        # Search database
-        results = collection.query(
-            query_embeddings=[query_embedding.tolist()],
-            n_results=n_results
-        )
+        with stage_metrics("search", items=1, unit="queries", n_results=n_results,
+                           index="compact" if compact is not None else "hnsw"):
+            # Generate query embedding
+            query_embedding = model.encode(query, convert_to_tensor=False)
+            
+            # Search database
+            if compact is not None:
+                matches = [(doc, metadata, score) for _, score, doc, metadata
+                        in compact_index.search(compact, collection, query_embedding, n_results)]
+            else:
+                results = collection.query(
+                    query_embeddings=[query_embedding.tolist()],
+                    n_results=n_results
+                )
+                # Similarity from the distance, which depends on the collection's space
+                matches = [(doc, metadata, similarity(distance, space)) for doc, metadata, distance in zip(
+                    results['documents'][0],
+                    results['metadatas'][0],
+                    results['distances'][0]
+                )]
         
         # Display results
-        if not results['documents'][0]:
+        if not matches:
             print("No results found.")
             return True
         
-        for i, (doc, metadata, distance) in enumerate(zip(
-            results['documents'][0],
-            results['metadatas'][0],
-            results['distances'][0]
-        ), 1):
-            # Calculate similarity score (1 - distance, as lower distance = more similar)
-            similarity = 1 - distance
-            
-            print(f"\n{i}. 📄 {metadata['file']} (similarity: {similarity:.2%})")
+        for i, (doc, metadata, score) in enumerate(matches, 1):
+            print(f"\n{i}. 📄 {metadata['file']} (similarity: {score:.2%})")
             print(f"   Directory: {metadata['directory']}")
             
-            # Show relevant excerpt (first 200 chars)
-            excerpt = doc[:200].replace('\n', ' ').strip()
-            if len(doc) > 200:
-                excerpt += "..."
+            # Show relevant excerpt (first 200 chars); pointer-only records read it from the file
+            if doc is None and 'sha256' in metadata:
+                excerpt, changed = read_excerpt(metadata, base_path)
+                excerpt = excerpt.replace('\n', ' ').strip()
+                if metadata['chars'] > EXCERPT_CHARS:
+                    excerpt += "..."
+                if changed:
+                    excerpt += " ⚠️ (changed since indexed - re-run embed-note.py)"
+            else:
+                doc = doc or ""
+                excerpt = doc[:EXCERPT_CHARS].replace('\n', ' ').strip()
+                if len(doc) > EXCERPT_CHARS:
+                    excerpt += "..."
             print(f"   Preview: {excerpt}")
             print("-" * 60)
         
-        print(f"\n✅ Found {len(results['documents'][0])} relevant notes")
+        print(f"\n✅ Found {len(matches)} relevant notes")
+        
+        # Moments in recordings: matching transcript segments with time range and speaker
+        try:
+            segments = client.get_collection(name=SEGMENTS)
+        except Exception:
+            segments = None  # not indexed yet
+        if segments is not None and n_segments and segments.count():
+            with stage_metrics("search-segments", items=1, unit="queries", n_results=n_segments):
+                hits = segments.query(
+                    query_embeddings=[query_embedding.tolist()],
+                    n_results=n_segments
+                )
+            if hits['documents'][0]:
+                print(f"\n🎙️  Moments in recordings:")
+                segment_space = index_settings(segments)["space"]
+                for doc, metadata, distance in zip(hits['documents'][0], hits['metadatas'][0], hits['distances'][0]):
+                    span = f"{format_timestamp(metadata['start'])}-{format_timestamp(metadata['end'])}"
+                    print(f"   • {metadata['file']} @ {span} {metadata['speaker']} (similarity: {similarity(distance, segment_space):.2%})")
+                    print(f"     \"{doc[:160]}{'...' if len(doc) > 160 else ''}\"")
         return True
         
     except Exception as e:
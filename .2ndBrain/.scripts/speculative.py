@@ -0,0 +1,42 @@
+"""
+Background precompute while a hard stop waits for a human.
+
+compile-raw-text.py and approve-processing-plan.py block on input() for as long
+as the review takes. Meanwhile match-raw-text.py --watch loads the embedding
+model, embeds every RAW-TEXT.md item and matches it against the vault, so the
+planning lookups are already on disk when the human types "approved". It
+re-runs whenever RAW-TEXT.md is edited, never writes results for text that
+changed mid-run, and exits on its own once the hard stop returns.
+
+Set SECOND_BRAIN_NO_PRECOMPUTE=1 to turn it off.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from resources import thread_env
+
+SCRIPTS_DIR = Path(__file__).parent
+THREADS = 2  # leave the rest of the machine to the person reviewing
+
+def start_precompute(raw_text="RAW-TEXT.md"):
+    """Start the background matcher for raw_text (None if disabled or it cannot start)."""
+    if os.environ.get("SECOND_BRAIN_NO_PRECOMPUTE") or not Path(raw_text).exists():
+        return None
+    try:
+        return subprocess.Popen(
+            [sys.executable, str(SCRIPTS_DIR / "match-raw-text.py"), "--watch", str(raw_text)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=thread_env(THREADS),
+            preexec_fn=(lambda: os.nice(10)) if hasattr(os, "nice") else None,
+        )
+    except OSError:
+        return None
+
+def cancel_precompute(process):
+    """Stop the background matcher (the review was cancelled, its results won't be used)."""
+    if process is not None and process.poll() is None:
+        process.terminate()
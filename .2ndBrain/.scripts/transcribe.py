@@ -5,123 +5,34 @@ JSON files are created in root directory for review.
 Usage: python3 0-Second-Brain/scripts/transcribe.py
 """
 
-import subprocess
-import threading
-import time
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from audio import diarization_mode, diarize_command, get_audio_duration, get_transcript, preprocess_audio, recover_temp_files, run_command_with_progress, whisperx_command
+from catalog import root_files
+from fingerprint import remember, try_reuse
+from metrics import stage_metrics
+from resources import physical_cores, thread_env
+from vad import save_offsets
 
 # Load environment variables
 load_dotenv()
 HF_TOKEN = os.getenv('HF_TOKEN')
 
-if not HF_TOKEN or HF_TOKEN == 'your_huggingface_token_here':
+if diarization_mode() != 'off' and (not HF_TOKEN or HF_TOKEN == 'your_huggingface_token_here'):
     print("❌ Error: HuggingFace token not configured")
     print("   Please edit .env file and add your HF_TOKEN")
     print("   Get token from: https://huggingface.co/settings/tokens")
     exit(1)
 
-def run_command_with_progress(cmd, description="Processing"):
-    """Run command with live progress feedback."""
-    process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    
-    def show_progress():
-        start_time = time.time()
-        spinner = ['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏']
-        i = 0
-        while process.poll() is None:
-            elapsed = time.time() - start_time
-            mins, secs = divmod(int(elapsed), 60)
-            if mins > 0:
-                time_str = f"{mins}m {secs}s"
-            else:
-                time_str = f"{secs}s"
-            print(f"\r   {spinner[i % len(spinner)]} {description}... {time_str} elapsed", end="", flush=True)
-            i += 1
-            time.sleep(0.3)
-        
-        elapsed = time.time() - start_time
-        mins, secs = divmod(int(elapsed), 60)
-        if mins > 0:
-            time_str = f"{mins}m {secs}s"
-        else:
-            time_str = f"{secs}s"
-        print(f"\r   ✓ {description} complete ({time_str})                    ")
-    
-    progress_thread = threading.Thread(target=show_progress, daemon=True)
-    progress_thread.start()
-    
-    stdout, stderr = process.communicate()
-    progress_thread.join(timeout=1)
-    
-    return process.returncode == 0
-
-def get_audio_duration(file_path):
-    """Get audio duration in seconds using ffprobe."""
-    try:
-        cmd = f'ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 "{file_path}"'
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        return float(result.stdout.strip())
-    except:
-        return 0
-
-def preprocess_audio(input_file, output_file):
-    """Preprocess audio to 16kHz mono WAV and trim silences."""
-    original_duration = get_audio_duration(input_file)
-    
-    cmd = (
-        f'ffmpeg -i "{input_file}" '
-        f'-ar 16000 -ac 1 '
-        f'-af "silenceremove='
-        f'start_periods=1:start_duration=0.2:start_threshold=-40dB:'
-        f'stop_periods=-1:stop_duration=0.3:stop_threshold=-40dB,'
-        f'silenceremove=start_periods=0:start_duration=0:start_threshold=-40dB:'
-        f'detection=peak" '
-        f'-y "{output_file}" 2>&1'
-    )
-    
-    print(f"   🔧 Preprocessing (16kHz mono + aggressive silence removal)...", flush=True)
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-    
-    if result.returncode == 0 and Path(output_file).exists():
-        processed_duration = get_audio_duration(output_file)
-        time_saved = original_duration - processed_duration
-        
-        if time_saved > 0:
-            percent_saved = (time_saved / original_duration) * 100
-            mins_saved, secs_saved = divmod(int(time_saved), 60)
-            if mins_saved > 0:
-                time_saved_str = f"{mins_saved}m {secs_saved}s"
-            else:
-                time_saved_str = f"{secs_saved}s"
-            
-            orig_mins, orig_secs = divmod(int(original_duration), 60)
-            proc_mins, proc_secs = divmod(int(processed_duration), 60)
-            print(f"   ✅ Removed {time_saved_str} of silence ({percent_saved:.1f}%) • {orig_mins}:{orig_secs:02d} → {proc_mins}:{proc_secs:02d}")
-        else:
-            print(f"   ✅ Preprocessed (minimal silence detected)")
-        return True
-    else:
-        print(f"   ⚠️  Preprocessing failed, will use original file")
-        return False
-
-def get_transcript(json_path):
-    """Extract clean transcript from JSON."""
-    try:
-        import json
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-        segments = data.get('segments', [])
-        return ' '.join([seg['text'].strip() for seg in segments])
-    except:
-        return "Error reading transcript"
-
 def main():
     root_dir = Path(".")
     
+    # Resume after an interrupted run: keep finished temp_ transcripts, drop the rest
+    recover_temp_files(root_dir)
+    
     print("🎵 Scanning for audio files...")
-    m4a_files = list(root_dir.glob("*.m4a"))
+    m4a_files = root_files(root_dir)['m4a']
     
     if not m4a_files:
         print("✅ No audio files to transcribe")
@@ -141,20 +52,41 @@ def main():
         
         # Preprocess audio
         preprocessed_wav = Path(f"temp_{m4a_file.stem}.wav")
-        preprocess_success = preprocess_audio(m4a_file, preprocessed_wav)
+        offsets = {}
+        with stage_metrics("preprocess", file=m4a_file.name) as m:
+            preprocess_success = preprocess_audio(m4a_file, preprocessed_wav, metrics=m, offsets=offsets)
+            m['status'] = 'ok' if preprocess_success else 'error'
         
         input_file = preprocessed_wav if preprocess_success else m4a_file
         
-        # Transcribe - output directly to root
-        # Upgraded to 'large-v3' model for maximum accuracy
-        cmd = f'python3 -m whisperx "{input_file}" --model large-v3 --compute_type int8 --device cpu --diarize --hf_token {HF_TOKEN} --output_dir "." --output_format json --language en'
-        success = run_command_with_progress(cmd, "Transcribing")
-        
-        # Rename JSON if temp file was used
-        if preprocess_success:
-            temp_json_path = root_dir / f"temp_{m4a_file.stem}.json"
-            if temp_json_path.exists():
-                temp_json_path.rename(json_path)
+        # The same memo synced twice, or a trimmed copy of one: reuse its transcript
+        match, fingerprint_info = try_reuse(m4a_file, preprocessed_wav if preprocess_success else None, json_path)
+        if match:
+            print(f"   ♻️  {match['kind'].capitalize()} of {match['name']} - reused its transcript instead of transcribing")
+        else:
+            # Transcribe - output directly to root
+            # Upgraded to 'large-v3' model for maximum accuracy
+            # One file at a time, so give torch every physical core (but not hyperthreads)
+            threads = physical_cores()
+            cmd = whisperx_command(input_file, ".", model="large-v3", threads=threads)
+            with stage_metrics("transcribe", file=m4a_file.name, model="large-v3", threads=threads,
+                               audio_seconds=get_audio_duration(input_file)) as m:
+                success = run_command_with_progress(cmd, "Transcribing", env=thread_env(threads))
+                m['status'] = 'ok' if success else 'error'
+            
+            # Rename JSON if temp file was used
+            if preprocess_success:
+                temp_json_path = root_dir / f"temp_{m4a_file.stem}.json"
+                if temp_json_path.exists():
+                    temp_json_path.rename(json_path)
+            
+            # Speakers are a separate stage (diarize.py): cached, and skipped for a
+            # well-known single voice. Reused transcripts already have theirs.
+            if json_path.exists() and diarization_mode() == 'now':
+                # Without preprocessed audio the transcript came from the original file: diarize that
+                cmd = diarize_command("run", input_file, "--transcript", json_path, "--threads", threads)
+                if not run_command_with_progress(cmd, "Identifying speakers", env=thread_env(threads)):
+                    print(f"   ⚠️  Speaker detection failed - transcript kept without speakers")
         
         # Clean up preprocessed file
         if preprocessed_wav.exists():
@@ -162,6 +94,9 @@ def main():
         
         # Verify JSON was created
         if json_path.exists():
+            remember(m4a_file.stem, fingerprint_info)
+            if offsets:
+                save_offsets(m4a_file.stem, offsets)  # maps this transcript's times to the recording
             transcript = get_transcript(json_path)
             print(f"   ✅ Transcribed: \"{transcript[:60]}...\"")
         else:
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Compact columnar store for WhisperX transcripts.
+
+WhisperX JSON keeps every word as its own dict, so an hour-long recording is
+megabytes of JSON that must be parsed whole just to walk the segments. A .wxt
+store holds the same transcript as flat arrays - segment and word timings and
+scores as float64, words and speakers as indexes into string tables, segment
+text as one UTF-8 blob with offsets - and is memory-mapped on open, so readers
+only touch the segments they use and can select segments by time range.
+
+Stores live in .cache/transcripts/<stem>-<hash of the JSON's path>.wxt (the
+root copy and the 1-Raw/json copy of a transcript each get their own) and are
+rebuilt from the JSON whenever its size or mtime changes. Without numpy, readers fall back to JSON.
+
+Usage: python3 .2ndBrain/.scripts/transcript_store.py   (build stores for all transcripts)
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from catalog import query, refresh
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BASE_PATH = Path(__file__).parent.parent.parent  # Go up to 2nd Brain root
+STORE_DIR = BASE_PATH / ".cache" / "transcripts"
+
+MAGIC = b"WXT1"
+ALIGN = 64
+NAN = float('nan')
+
+# Segment flags: which optional keys the JSON segment had
+HAS_TEXT = 1
+HAS_WORDS = 2
+
+class Unsupported(ValueError):
+    """The JSON holds something the store can't represent exactly (e.g. null timings)."""
+
+def _number(value, missing=NAN):
+    if value is missing:
+        return value
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise Unsupported(f"non-numeric value {value!r}")
+    return float(value)
+
+class _Strings:
+    """Interned string table: UTF-8 blob plus offsets."""
+
+    def __init__(self):
+        self.ids = {}
+        self.blob = bytearray()
+        self.offsets = [0]
+
+    def add(self, text):
+        if not isinstance(text, str):
+            raise Unsupported(f"non-string value {text!r}")
+        if text not in self.ids:
+            self.ids[text] = len(self.offsets) - 1
+            self.blob += text.encode('utf-8')
+            self.offsets.append(len(self.blob))
+        return self.ids[text]
+
+def store_path(json_path):
+    """The store of a JSON, keyed by its path relative to the vault root."""
+    json_path = Path(json_path).resolve()
+    try:
+        key = json_path.relative_to(BASE_PATH.resolve())
+    except ValueError:
+        key = json_path
+    digest = hashlib.sha1(key.as_posix().encode('utf-8')).hexdigest()[:12]
+    return STORE_DIR / f"{json_path.stem}-{digest}.wxt"
+
+def build(json_path, path=None):
+    """Convert a WhisperX JSON into a .wxt store (written atomically). Returns its path."""
+    json_path = Path(json_path)
+    path = Path(path or store_path(json_path))
+    stat = json_path.stat()
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+
+    speakers, vocab = _Strings(), _Strings()
+    seg_start, seg_end, seg_speaker, seg_flags = [], [], [], []
+    text_blob, text_offsets, word_offsets = bytearray(), [0], [0]
+    word_start, word_end, word_score, word_id = [], [], [], []
+
+    for seg in data.get('segments', []):
+        seg_start.append(_number(seg.get('start', NAN)))
+        seg_end.append(_number(seg.get('end', NAN)))
+        seg_speaker.append(speakers.add(seg['speaker']) if 'speaker' in seg else -1)
+        flags = 0
+        if 'text' in seg:
+            flags |= HAS_TEXT
+            if not isinstance(seg['text'], str):
+                raise Unsupported(f"non-string text {seg['text']!r}")
+            text_blob += seg['text'].encode('utf-8')
+        text_offsets.append(len(text_blob))
+        if 'words' in seg:
+            flags |= HAS_WORDS
+            for word in seg['words']:
+                word_start.append(_number(word.get('start', NAN)))
+                word_end.append(_number(word.get('end', NAN)))
+                word_score.append(_number(word.get('score', NAN)))
+                word_id.append(vocab.add(word['word']) if 'word' in word else -1)
+        word_offsets.append(len(word_id))
+        seg_flags.append(flags)
+
+    arrays = {
+        'seg_start': np.array(seg_start, dtype='<f8'),
+        'seg_end': np.array(seg_end, dtype='<f8'),
+        'seg_speaker': np.array(seg_speaker, dtype='<i4'),
+        'seg_flags': np.array(seg_flags, dtype='u1'),
+        'seg_text_off': np.array(text_offsets, dtype='<i8'),
+        'seg_word_off': np.array(word_offsets, dtype='<i8'),
+        'word_start': np.array(word_start, dtype='<f8'),
+        'word_end': np.array(word_end, dtype='<f8'),
+        'word_score': np.array(word_score, dtype='<f8'),
+        'word_id': np.array(word_id, dtype='<i4'),
+        'text_blob': np.frombuffer(bytes(text_blob), dtype='u1'),
+        'vocab_off': np.array(vocab.offsets, dtype='<i8'),
+        'vocab_blob': np.frombuffer(bytes(vocab.blob), dtype='u1'),
+        'speaker_off': np.array(speakers.offsets, dtype='<i8'),
+        'speaker_blob': np.frombuffer(bytes(speakers.blob), dtype='u1'),
+    }
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = [array.dtype.str, offset, len(array)]
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    header = json.dumps({
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'language': data.get('language'),
+        'arrays': layout,
+    }).encode('utf-8')
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f"{path.stem}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(header)) + header)
+            data_start = -(-f.tell() // ALIGN) * ALIGN
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name][1])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    return path
+
+class Transcript:
+    """A memory-mapped .wxt store. `segments` behaves like the JSON's segment list."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:4] != MAGIC:
+            raise ValueError(f"not a transcript store: {path}")
+        header_len, = struct.unpack('<I', self._mm[4:8])
+        self.header = json.loads(self._mm[8:8 + header_len])
+        data_start = -(-(8 + header_len) // ALIGN) * ALIGN
+        for name, (dtype, offset, count) in self.header['arrays'].items():
+            setattr(self, name, np.frombuffer(self._mm, dtype=dtype, count=count, offset=data_start + offset))
+        self.language = self.header['language']
+        self._speaker_names = None
+        self._vocab = None
+        self.segments = Segments(self)
+
+    def close(self):
+        self.segments = None
+        for name in self.header['arrays']:
+            setattr(self, name, None)
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # a caller still holds an array view; the map goes with it
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _string(self, blob, offsets, index):
+        return blob[offsets[index]:offsets[index + 1]].tobytes().decode('utf-8')
+
+    def _strings(self, blob, offsets):
+        data = blob.tobytes()
+        bounds = offsets.tolist()
+        return [data[a:b].decode('utf-8') for a, b in zip(bounds, bounds[1:])]
+
+    @property
+    def speaker_names(self):
+        if self._speaker_names is None:
+            self._speaker_names = self._strings(self.speaker_blob, self.speaker_off)
+        return self._speaker_names
+
+    @property
+    def vocab(self):
+        if self._vocab is None:
+            self._vocab = self._strings(self.vocab_blob, self.vocab_off)
+        return self._vocab
+
+    def speaker(self, i):
+        index = int(self.seg_speaker[i])
+        return None if index < 0 else self.speaker_names[index]
+
+    def text(self, i):
+        if not self.seg_flags[i] & HAS_TEXT:
+            return None
+        return self.text_blob[self.seg_text_off[i]:self.seg_text_off[i + 1]].tobytes().decode('utf-8')
+
+    def words(self, i):
+        """The segment's words as WhisperX-shaped dicts, or None if it had no 'words' key."""
+        if not self.seg_flags[i] & HAS_WORDS:
+            return None
+        a, b = int(self.seg_word_off[i]), int(self.seg_word_off[i + 1])
+        vocab = self.vocab
+        words = []
+        for word_id, start, end, score in zip(self.word_id[a:b].tolist(), self.word_start[a:b].tolist(),
+                                              self.word_end[a:b].tolist(), self.word_score[a:b].tolist()):
+            word = {}
+            if word_id >= 0:
+                word['word'] = vocab[word_id]
+            # NaN marks a key the JSON word did not have
+            if start == start:
+                word['start'] = start
+            if end == end:
+                word['end'] = end
+            if score == score:
+                word['score'] = score
+            words.append(word)
+        return words
+
+    def segment(self, i):
+        """Segment i as a read-only mapping with the keys WhisperX wrote; words load on access."""
+        return SegmentView(self, i)
+
+    def segments_between(self, start, end):
+        """Indexes of segments overlapping [start, end) seconds."""
+        return np.flatnonzero((self.seg_start < end) & (self.seg_end > start))
+
+    def speakers(self):
+        """Distinct speakers, touching only the segment speaker column."""
+        return {self.speaker_names[i] for i in np.unique(self.seg_speaker).tolist() if i >= 0}
+
+class SegmentView(Mapping):
+    """One segment, read column by column from the store on demand."""
+
+    __slots__ = ('_t', '_i')
+
+    def __init__(self, transcript, i):
+        self._t = transcript
+        self._i = i
+
+    def __contains__(self, key):
+        t, i = self._t, self._i
+        if key in ('start', 'end'):
+            return not math.isnan((t.seg_start if key == 'start' else t.seg_end)[i])
+        if key == 'text':
+            return bool(t.seg_flags[i] & HAS_TEXT)
+        if key == 'words':
+            return bool(t.seg_flags[i] & HAS_WORDS)
+        if key == 'speaker':
+            return t.seg_speaker[i] >= 0
+        return False
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        t, i = self._t, self._i
+        if key == 'start':
+            return float(t.seg_start[i])
+        if key == 'end':
+            return float(t.seg_end[i])
+        if key == 'text':
+            return t.text(i)
+        if key == 'speaker':
+            return t.speaker(i)
+        return t.words(i)
+
+    def __iter__(self):
+        return (key for key in ('start', 'end', 'text', 'speaker', 'words') if key in self)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+class Segments(Sequence):
+    """Lazy list of segments backed by the store."""
+
+    def __init__(self, transcript):
+        self._t = transcript
+
+    def __len__(self):
+        return len(self._t.seg_start)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._t.segment(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._t.segment(i)
+
+def open_transcript(json_path, create=True):
+    """The up-to-date store for json_path, built on first use; None without numpy
+    or when the JSON can't be represented (callers then read the JSON)."""
+    if np is None:
+        return None
+    json_path = Path(json_path)
+    path = store_path(json_path)
+    stat = json_path.stat()
+    try:
+        transcript = Transcript(path)
+        if (transcript.header['source_size'], transcript.header['source_mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            return transcript
+        transcript.close()
+    except (OSError, ValueError, KeyError):
+        pass
+    if not create:
+        return None
+    try:
+        build(json_path, path)
+    except Unsupported:
+        return None
+    return Transcript(path)
+
+def load_segments(json_path):
+    """(segments, language) for a WhisperX JSON: from the store when possible,
+    otherwise parsed from the JSON. language is None when the JSON has none."""
+    transcript = open_transcript(json_path)
+    if transcript is not None:
+        return transcript.segments, transcript.language
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    return data.get('segments', []), data.get('language')
+
+def main():
+    if np is None:
+        print("❌ numpy is required for transcript stores", file=sys.stderr)
+        sys.exit(1)
+    root = Path(".")
+    refresh(root)
+    json_files = query('json', '', root=root, rescan=False) + query('json', '1-Raw/json', root=root, rescan=False)
+    built = json_bytes = store_bytes = 0
+    for json_file in json_files:
+        try:
+            transcript = open_transcript(json_file)
+        except (OSError, ValueError) as e:
+            print(f"   ✗ {json_file}: {e}")
+            continue
+        if transcript is None:
+            print(f"   ⚠️  {json_file}: kept as JSON only (values the store can't represent)")
+            continue
+        transcript.close()
+        built += 1
+        json_bytes += json_file.stat().st_size
+        store_bytes += store_path(json_file).stat().st_size
+
+    # Drop stores whose transcript is gone
+    stores = {store_path(f).name for f in json_files}
+    for orphan in STORE_DIR.glob("*.wxt") if STORE_DIR.exists() else []:
+        if orphan.name not in stores:
+            orphan.unlink()
+
+    print(f"✅ {built} transcript stores up to date in {STORE_DIR}")
+    if json_bytes:
+        print(f"📦 {json_bytes / 1024 / 1024:.1f} MB JSON → {store_bytes / 1024 / 1024:.1f} MB stores")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Measure HNSW index settings on this vault: recall@k and query latency.
+
+The vault's own embeddings are copied into throw-away in-memory Chroma
+collections, one per combination of space, M, construction_ef and search_ef.
+A sample of the notes is used as queries (each note's own record is left
+out of its results), and every answer is compared with an exact brute-force
+search over the same vectors. The report lists recall@k, p50/p95 query
+latency and build time per setting, and suggests the fastest one that
+reaches the target recall - apply it with init-vector-db.py.
+
+Usage: python3 .2ndBrain/.scripts/tune-index.py [--k 10] [--queries 200] [--collection notes]
+           [--space l2,cosine] [--M 8,16,32] [--construction-ef 100,200] [--search-ef 10,50,100]
+           [--target 0.95] [--output report.md]
+"""
+
+import argparse
+import itertools
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from metrics import stage_metrics
+from related_notes import top_k
+from vector_db import INDEX_DEFAULTS, SPACES, connect, index_metadata, index_settings, upsert_batched
+
+SEED = 0
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+def space_list(value):
+    spaces = [v for v in value.split(',') if v]
+    for space in spaces:
+        if space not in SPACES:
+            raise argparse.ArgumentTypeError(f"unknown space {space!r} (choose from {', '.join(SPACES)})")
+    return spaces
+
+def load_vectors(name):
+    """Embeddings of a collection as float32 rows, plus its current HNSW settings."""
+    collection = connect().get_collection(name=name)
+    data = collection.get(include=["embeddings"])
+    vectors = np.asarray(data['embeddings'], dtype=np.float32)
+    return vectors, index_settings(collection)
+
+def exact_neighbors(vectors, queries, k):
+    """True top-k of each query row (its own row excluded), by cosine similarity.
+    The embeddings are unit length, so l2, cosine and ip rank alike."""
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    neighbors, _ = top_k(unit[queries], unit, queries, k)
+    return neighbors
+
+def percentile_ms(latencies, q):
+    return float(np.percentile(latencies, q)) * 1000
+
+def measure(client, vectors, queries, truth, k, settings):
+    """recall@k, latencies and build time of one HNSW configuration."""
+    name = f"tune-{uuid.uuid4().hex[:12]}"
+    ids = [str(i) for i in range(len(vectors))]
+    started = time.perf_counter()
+    collection = client.create_collection(name=name, metadata=index_metadata(settings))
+    try:
+        upsert_batched(collection, ids, vectors)
+        build_s = time.perf_counter() - started
+        hits, latencies = 0, []
+        for q, expected in zip(queries, truth):
+            started = time.perf_counter()
+            result = collection.query(query_embeddings=[vectors[q].tolist()], n_results=k + 1, include=["distances"])
+            latencies.append(time.perf_counter() - started)
+            found = [int(i) for i in result['ids'][0] if int(i) != q][:k]
+            hits += len(set(found) & set(expected.tolist()))
+    finally:
+        client.delete_collection(name)
+    return {**settings, "recall": hits / (len(queries) * k), "p50_ms": percentile_ms(latencies, 50),
+            "p95_ms": percentile_ms(latencies, 95), "build_s": build_s}
+
+def exact_latency(vectors, queries, k):
+    """p50/p95 of a brute-force numpy search per query, for comparison."""
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    latencies = []
+    for q in queries:
+        started = time.perf_counter()
+        top_k(unit[q:q + 1], unit, np.array([q]), k)
+        latencies.append(time.perf_counter() - started)
+    return percentile_ms(latencies, 50), percentile_ms(latencies, 95)
+
+def recommend(results, target):
+    """Fastest (p95) setting that reaches the target recall, else the most accurate one."""
+    good = [r for r in results if r['recall'] >= target]
+    if good:
+        return min(good, key=lambda r: (r['p95_ms'], r['build_s'])), True
+    return max(results, key=lambda r: (r['recall'], -r['p95_ms'])), False
+
+def format_report(name, n, n_queries, k, current, results, exact, target):
+    lines = [
+        f"# HNSW tuning: {name}",
+        "",
+        f"{n} vectors, {n_queries} sampled queries, recall@{k} against exact search. "
+        f"Current settings: space={current['space']} M={current['M']} "
+        f"construction_ef={current['construction_ef']} search_ef={current['search_ef']}.",
+        "",
+        "| space | M | construction_ef | search_ef | recall@k | p50 ms | p95 ms | build s |",
+        "|---|---|---|---|---|---|---|---|",
+    ]
+    for r in results:
+        marker = " (current)" if all(r[key] == current[key] for key in INDEX_DEFAULTS) else ""
+        lines.append(f"| {r['space']}{marker} | {r['M']} | {r['construction_ef']} | {r['search_ef']} | "
+                     f"{r['recall']:.3f} | {r['p50_ms']:.2f} | {r['p95_ms']:.2f} | {r['build_s']:.2f} |")
+    lines.append(f"| exact (numpy) | - | - | - | 1.000 | {exact[0]:.2f} | {exact[1]:.2f} | - |")
+    best, reached = recommend(results, target)
+    lines.append("")
+    lines.append(f"{'Fastest setting with' if reached else 'No setting reached'} recall@{k} >= {target:.2f}"
+                 f"{'' if reached else '; most accurate'}: space={best['space']} M={best['M']} "
+                 f"construction_ef={best['construction_ef']} search_ef={best['search_ef']} "
+                 f"(recall {best['recall']:.3f}, p95 {best['p95_ms']:.2f} ms).")
+    if name == "notes":
+        lines.append("")
+        lines.append(f"Apply with: `python3 .2ndBrain/.scripts/init-vector-db.py --space {best['space']} --M {best['M']} "
+                     f"--construction-ef {best['construction_ef']} --search-ef {best['search_ef']}`")
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure recall@k and latency of HNSW settings on this vault.")
+    parser.add_argument("--collection", default="notes", help="collection to measure (notes or segments)")
+    parser.add_argument("--k", type=int, default=10, help="neighbours per query (default: 10)")
+    parser.add_argument("--queries", type=int, default=200, help="sampled queries (default: 200)")
+    parser.add_argument("--space", type=space_list, default=["l2", "cosine"], help="comma-separated spaces")
+    parser.add_argument("--M", type=int_list, default=[8, 16, 32], help="comma-separated M values")
+    parser.add_argument("--construction-ef", type=int_list, default=[100, 200], help="comma-separated values")
+    parser.add_argument("--search-ef", type=int_list, default=[10, 50, 100], help="comma-separated values")
+    parser.add_argument("--target", type=float, default=0.95, help="recall the suggestion must reach (default: 0.95)")
+    parser.add_argument("--output", type=Path, help="also write the report (markdown) here")
+    args = parser.parse_args()
+
+    vectors, current = load_vectors(args.collection)
+    if len(vectors) < 2:
+        print(f"⚠️  '{args.collection}' has {len(vectors)} record(s) - nothing to measure")
+        return
+    k = min(args.k, len(vectors) - 1)
+    rng = np.random.default_rng(SEED)
+    queries = np.sort(rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False))
+    truth = exact_neighbors(vectors, queries, k)
+
+    import chromadb
+    client = chromadb.EphemeralClient()
+    combos = list(itertools.product(args.space, args.M, args.construction_ef, args.search_ef))
+    print(f"📐 {len(vectors)} vectors, {len(queries)} queries, {len(combos)} settings to measure")
+    results = []
+    with stage_metrics("tune-index", items=len(combos), unit="settings", vectors=len(vectors)):
+        for space, m, construction_ef, search_ef in combos:
+            settings = {"space": space, "M": m, "construction_ef": construction_ef, "search_ef": search_ef}
+            result = measure(client, vectors, queries, truth, k, settings)
+            results.append(result)
+            print(f"   {space:<6} M={m:<3} construction_ef={construction_ef:<4} search_ef={search_ef:<4} "
+                  f"recall@{k} {result['recall']:.3f}  p95 {result['p95_ms']:.2f} ms")
+
+    report = format_report(args.collection, len(vectors), len(queries), k, current, results,
+                           exact_latency(vectors, queries, k), args.target)
+    print()
+    print(report)
+    if args.output:
+        args.output.write_text(report, encoding='utf-8')
+        print(f"💾 Saved: {args.output}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
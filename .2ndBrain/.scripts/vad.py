@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Voice activity detection: drop non-speech from recordings before ASR.
+
+preprocess_audio() used to trim with two fixed ffmpeg silenceremove filters
+(-40 dB, 0.3 s), which left most of a noisy recording in place, clipped
+quiet speech, and lost where the kept audio came from. Now ffmpeg only
+decodes to 16 kHz mono and this module trims in-process:
+
+  - energy in dB of the speech band (300-3400 Hz) of 20 ms frames, from
+    one FFT over a block of frames at a time - hum, rumble and hiss outside
+    the band don't count as speech
+  - the threshold adapts to each recording: its noise floor (10th
+    percentile) plus a share of the distance to its speech level (95th
+    percentile), so noisy and quiet recordings are judged on their own
+    terms; when the two are too close to tell apart nothing is removed
+  - speech blips under MIN_SPEECH_S are dropped, kept regions are padded by
+    PAD_S, and pauses under MIN_SILENCE_S stay in
+
+The kept regions are the offset map, saved in .cache/vad/<stem>.json when a
+transcript is made from the trimmed audio: transcripts stay on the trimmed
+timeline that WhisperX, diarize.py and align.py work on, and to_original() /
+to_processed() convert times to and from the original recording (used for
+the times shown in transcript notes and search results). Transcripts made
+before this module have no map; their audio is re-made with the old ffmpeg
+filter (audio.LEGACY_SILENCE_FILTER) and their times are shown as stored.
+
+Needs numpy; without it recordings are transcribed untrimmed.
+
+Usage: python3 .2ndBrain/.scripts/vad.py                      (removed audio per file)
+       python3 .2ndBrain/.scripts/vad.py AUDIO.wav [--output TRIMMED.wav]
+"""
+
+import argparse
+import json
+import sys
+import wave
+from pathlib import Path
+from atomic import replacing
+from fingerprint import SAMPLE_RATE, read_wav
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BASE_PATH = Path(__file__).parent.parent.parent  # Go up to 2nd Brain root
+OFFSETS_DIR = BASE_PATH / ".cache" / "vad"
+
+FRAME = 320  # 20 ms
+SPEECH_BAND_HZ = (300, 3400)
+BLOCK_FRAMES = 8192  # frames per FFT block (bounds memory on long recordings)
+NOISE_PERCENTILE = 10
+SPEECH_PERCENTILE = 95
+THRESHOLD_SHARE = 0.3  # of the way from the noise floor to the speech level
+MIN_CONTRAST_DB = 6  # below this nothing is removed (all speech, or all noise)
+MIN_SPEECH_S = 0.1
+MIN_SILENCE_S = 0.3
+PAD_S = 0.15
+
+def available():
+    return np is not None
+
+def frame_db(samples):
+    """Speech-band energy (dB) of each FRAME of the samples."""
+    count = len(samples) // FRAME
+    frames = samples[:count * FRAME].reshape(count, FRAME)
+    window = np.hanning(FRAME).astype(np.float32)
+    freqs = np.fft.rfftfreq(FRAME, 1 / SAMPLE_RATE)
+    band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+    energy = np.empty(count, dtype=np.float64)
+    for start in range(0, count, BLOCK_FRAMES):
+        spectrum = np.fft.rfft(frames[start:start + BLOCK_FRAMES] * window, axis=1)[:, band]
+        energy[start:start + len(spectrum)] = np.sum(spectrum.real ** 2 + spectrum.imag ** 2, axis=1)
+    return 10 * np.log10(energy + 1e-10)
+
+def runs(mask):
+    """(starts, ends) of the True runs of a boolean array (ends exclusive)."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def merge_close(starts, ends, min_gap):
+    """Join regions separated by less than min_gap."""
+    if not len(starts):
+        return starts, ends
+    keep = starts[1:] - ends[:-1] >= min_gap
+    return starts[np.concatenate(([True], keep))], ends[np.concatenate((keep, [True]))]
+
+def speech_regions(samples):
+    """(start, end) sample indexes of the speech in a 16 kHz recording, as an (n, 2) array."""
+    if len(samples) < FRAME:
+        return np.array([[0, len(samples)]], dtype=np.int64)
+    db = frame_db(samples)
+    noise, speech = np.percentile(db, [NOISE_PERCENTILE, SPEECH_PERCENTILE])
+    if speech - noise < MIN_CONTRAST_DB:
+        return np.array([[0, len(samples)]], dtype=np.int64)
+    starts, ends = runs(db > noise + THRESHOLD_SHARE * (speech - noise))
+    frame_s = FRAME / SAMPLE_RATE
+    long_enough = (ends - starts) * frame_s >= MIN_SPEECH_S
+    starts, ends = starts[long_enough], ends[long_enough]
+    if not len(starts):
+        return np.array([[0, len(samples)]], dtype=np.int64)  # no clear speech: leave it to ASR
+    pad = int(round(PAD_S / frame_s))
+    starts, ends = merge_close(np.maximum(starts - pad, 0), np.minimum(ends + pad, len(db)),
+                               int(round(MIN_SILENCE_S / frame_s)))
+    regions = np.stack([starts, ends], axis=1) * FRAME
+    if ends[-1] == len(db):
+        regions[-1, 1] = len(samples)  # speech up to the end keeps the partial last frame
+    return regions
+
+def trim(samples, regions):
+    """(trimmed samples, offset map) - the map lists each kept region as
+    [trimmed start, original start, duration] in seconds."""
+    if not len(regions):
+        return samples[:0], []
+    lengths = regions[:, 1] - regions[:, 0]
+    trimmed_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    trimmed = np.concatenate([samples[start:end] for start, end in regions])
+    offsets = np.stack([trimmed_starts, regions[:, 0], lengths], axis=1) / SAMPLE_RATE
+    return trimmed, offsets.round(4).tolist()
+
+def write_wav(path, samples):
+    pcm = np.clip(np.round(samples * 32768.0), -32768, 32767).astype('<i2')
+    with replacing(path, 'wb') as f, wave.open(f, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(pcm.tobytes())
+
+def trim_file(wav_path, output_path=None):
+    """Trim a decoded 16 kHz WAV in place (or into output_path).
+    Returns (original seconds, kept seconds, offset map), or None if it can't be read."""
+    samples = read_wav(wav_path)
+    if samples is None:
+        return None
+    trimmed, offsets = trim(samples, speech_regions(samples))
+    write_wav(output_path or wav_path, trimmed)
+    return len(samples) / SAMPLE_RATE, len(trimmed) / SAMPLE_RATE, offsets
+
+# ============================================================
+# Offset maps
+# ============================================================
+
+def offsets_path(stem):
+    return OFFSETS_DIR / f"{stem}.json"
+
+def write_offsets(path, offsets):
+    """Write an offset map ({original_seconds, kept_seconds, regions}) to path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with replacing(path, 'w') as f:
+        json.dump(offsets, f)
+
+def read_offsets(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_offsets(stem, offsets):
+    """Record the offset map of a recording - only together with the transcript made
+    from that audio, so a map always matches its transcript's timeline."""
+    write_offsets(offsets_path(stem), offsets)
+
+def load_offsets(stem):
+    """The offset map of a recording's transcript, or None (made before vad.py)."""
+    return read_offsets(offsets_path(stem))
+
+def to_original(times, offsets):
+    """Map times on the trimmed timeline to the original recording (scalar or array)."""
+    if not offsets or not offsets.get('regions'):
+        return times
+    regions = np.asarray(offsets['regions'], dtype=np.float64)
+    t = np.asarray(times, dtype=np.float64)
+    i = np.clip(np.searchsorted(regions[:, 0], t, side='right') - 1, 0, len(regions) - 1)
+    mapped = regions[i, 1] + np.clip(t - regions[i, 0], 0, regions[i, 2])
+    return float(mapped) if mapped.ndim == 0 else mapped
+
+def to_processed(times, offsets):
+    """Map original recording times to the trimmed timeline; removed audio maps
+    to the point where it was cut."""
+    if not offsets or not offsets.get('regions'):
+        return times
+    regions = np.asarray(offsets['regions'], dtype=np.float64)
+    t = np.asarray(times, dtype=np.float64)
+    i = np.searchsorted(regions[:, 1], t, side='right') - 1
+    before = i < 0
+    i = np.clip(i, 0, len(regions) - 1)
+    mapped = np.where(before, 0.0, regions[i, 0] + np.clip(t - regions[i, 1], 0, regions[i, 2]))
+    return float(mapped) if mapped.ndim == 0 else mapped
+
+def original_time(stem):
+    """A function mapping trimmed-timeline times of a recording to its original ones
+    (identity for recordings without an offset map)."""
+    offsets = load_offsets(stem) if available() else None
+    if offsets is None:
+        return lambda t: t
+    return lambda t: to_original(t, offsets)
+
+def format_duration(seconds):
+    mins, secs = divmod(int(seconds), 60)
+    return f"{mins}:{secs:02d}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Speech detection and trimming for 16 kHz mono recordings.")
+    parser.add_argument("audio", nargs="?", type=Path, help="16 kHz mono WAV to analyse (default: list trimmed files)")
+    parser.add_argument("--output", type=Path, help="write the trimmed audio here")
+    args = parser.parse_args()
+    if not available():
+        raise RuntimeError("numpy is not installed")
+
+    if args.audio is None:
+        maps = sorted(OFFSETS_DIR.glob("*.json"))
+        if not maps:
+            print("No trimmed recordings yet")
+            return
+        total_original = total_kept = 0
+        print(f"{'recording':<40} {'original':>9} {'kept':>9} {'removed':>8}")
+        for path in maps:
+            offsets = load_offsets(path.stem)
+            if offsets is None:
+                continue
+            original, kept = offsets['original_seconds'], offsets['kept_seconds']
+            total_original += original
+            total_kept += kept
+            removed = (original - kept) / original if original else 0
+            print(f"{path.stem[:40]:<40} {format_duration(original):>9} {format_duration(kept):>9} {removed:>8.1%}")
+        if total_original:
+            print(f"\n✂️  Removed {format_duration(total_original - total_kept)} of "
+                  f"{format_duration(total_original)} ({(total_original - total_kept) / total_original:.1%})")
+        return
+
+    samples = read_wav(args.audio)
+    if samples is None:
+        raise ValueError(f"{args.audio} is not a 16 kHz mono 16-bit WAV (decode it with ffmpeg -ar 16000 -ac 1)")
+    regions = speech_regions(samples)
+    trimmed, offsets = trim(samples, regions)
+    original, kept = len(samples) / SAMPLE_RATE, len(trimmed) / SAMPLE_RATE
+    print(f"🗣️  {len(regions)} speech region(s): kept {format_duration(kept)} of {format_duration(original)} "
+          f"({(original - kept) / original if original else 0:.1%} removed)")
+    for trimmed_start, original_start, duration in offsets:
+        print(f"   {original_start:8.2f}s - {original_start + duration:8.2f}s  →  {trimmed_start:8.2f}s")
+    if args.output:
+        write_wav(args.output, trimmed)
+        print(f"💾 Saved: {args.output}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
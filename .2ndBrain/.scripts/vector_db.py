@@ -0,0 +1,201 @@
+"""
+Shared access to the vector database (.chroma at the vault root) and the
+embedding model, for the scripts that index or query more than whole notes.
+
+The notes collection can be pointer-only (init-vector-db.py --pointer-only):
+records then hold the file path, content hash and excerpt byte range instead
+of a second copy of the note, and excerpts are read from the file on demand.
+
+The embedding model runs on the backend named by EMBEDDING_BACKEND in .env:
+torch (fp32, the default), int8 (dynamically quantized linear layers) or
+onnx (ONNX Runtime). A faster backend is only used once check-embeddings.py
+has shown that it matches the fp32 model on this vault.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import sys
+from pathlib import Path
+from metrics import stage_metrics
+
+BASE_PATH = Path(__file__).parent.parent.parent  # Go up to 2nd Brain root
+DB_PATH = BASE_PATH / ".chroma"  # .chroma/ at root level
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+
+# Embedding backends, and where check-embeddings.py records which ones passed
+EMBEDDING_BACKENDS = ("torch", "int8", "onnx")
+CHECK_PATH = BASE_PATH / ".cache" / "embedding-check.json"
+
+# Characters of a note shown as its search preview
+EXCERPT_CHARS = 200
+
+# Notes collection storage modes (kept in the collection's metadata)
+STORE_DOCUMENTS = "documents"
+STORE_POINTERS = "pointer"
+
+# Records per Chroma upsert (stays under the client's maximum batch size)
+UPSERT_BATCH = 256
+
+# HNSW index settings, stored as hnsw:* collection metadata. space, M and
+# construction_ef are fixed when a collection is built; search_ef can change
+# later. These are Chroma's defaults - measure alternatives with tune-index.py.
+INDEX_DEFAULTS = {"space": "l2", "M": 16, "construction_ef": 100, "search_ef": 10}
+BUILD_SETTINGS = ("space", "M", "construction_ef")
+SPACES = ("l2", "cosine", "ip")
+
+def connect(db_path=None):
+    import chromadb
+    return chromadb.PersistentClient(path=str(db_path or DB_PATH))
+
+def open_collection(client, name, metadata):
+    """An existing collection as it is, or a new one created with metadata.
+    (chromadb 0.4's get_or_create_collection overwrites an existing collection's
+    metadata, which would drop its storage mode and hnsw:* settings.)"""
+    try:
+        return client.get_collection(name=name)
+    except Exception:  # missing (ValueError or NotFoundError, depending on the version)
+        pass
+    try:
+        return client.create_collection(name=name, metadata=metadata)
+    except Exception:
+        return client.get_collection(name=name)  # another process created it meanwhile
+
+def notes_collection(client, storage=None, settings=None):
+    """The notes collection; storage and HNSW settings apply when the collection is created."""
+    metadata = {"description": "Second Brain notes and transcriptions"}
+    if storage is not None:
+        metadata["storage"] = storage
+    metadata.update(index_metadata(settings))
+    return open_collection(client, "notes", metadata)
+
+def storage_mode(collection):
+    return (collection.metadata or {}).get("storage", STORE_DOCUMENTS)
+
+def index_metadata(settings):
+    """hnsw:* metadata entries for the settings that are given."""
+    return {f"hnsw:{key}": value for key, value in (settings or {}).items() if value is not None}
+
+def index_settings(collection):
+    """The HNSW settings a collection was built with (Chroma's defaults for unset keys)."""
+    metadata = collection.metadata or {}
+    return {key: metadata.get(f"hnsw:{key}", metadata.get(f"built:{key}", default))
+            for key, default in INDEX_DEFAULTS.items()}
+
+def search_ef_metadata(collection, search_ef):
+    """Metadata for collection.modify() that only changes search_ef.
+    Chroma rejects a modify() carrying hnsw:space (even unchanged), and modify()
+    replaces the metadata - so the build settings are kept under built:* keys."""
+    current = index_settings(collection)
+    metadata = {key: value for key, value in (collection.metadata or {}).items() if not key.startswith("hnsw:")}
+    metadata.update({f"built:{key}": current[key] for key in BUILD_SETTINGS})
+    metadata["hnsw:search_ef"] = search_ef
+    return metadata
+
+def similarity(distance, space):
+    """Cosine similarity from a Chroma distance (the embeddings are unit length).
+    l2 is the squared Euclidean distance 2 - 2cos; cosine and ip are 1 - cos."""
+    if space == "l2":
+        return 1 - distance / 2
+    return 1 - distance
+
+def pointer_metadata(data):
+    """Where a note's preview lives in its file (data = the file's raw bytes),
+    and the hash that tells whether the file changed since it was indexed."""
+    text = data.decode('utf-8', errors='replace')
+    return {
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "bytes": len(data),
+        "chars": len(text),
+        "excerpt_start": 0,
+        "excerpt_end": len(text[:EXCERPT_CHARS].encode('utf-8')),
+    }
+
+def read_excerpt(metadata, base_path=None):
+    """(excerpt, changed) for a pointer record, memory-mapping only the file it points at.
+    changed is True when the file no longer matches the indexed content."""
+    path = Path(base_path or BASE_PATH) / metadata["file"]
+    try:
+        with open(path, 'rb') as f:
+            if path.stat().st_size == 0:
+                return "", True
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                excerpt = mm[metadata["excerpt_start"]:metadata["excerpt_end"]].decode('utf-8', errors='replace')
+                changed = len(mm) != metadata["bytes"] or hashlib.sha256(mm).hexdigest() != metadata["sha256"]
+    except OSError:
+        return "", True
+    return excerpt, changed
+
+def embedding_backend():
+    """The backend from EMBEDDING_BACKEND in .env (torch when unset or unknown)."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    backend = os.getenv('EMBEDDING_BACKEND', 'torch').strip().lower()
+    return backend if backend in EMBEDDING_BACKENDS else 'torch'
+
+def backend_check(backend):
+    """check-embeddings.py's last result for a backend of this model, or None."""
+    try:
+        with open(CHECK_PATH, 'r') as f:
+            result = json.load(f).get(backend)
+    except (OSError, ValueError):
+        return None
+    if not result or result.get('model') != MODEL_NAME:
+        return None
+    return result
+
+def build_model(backend):
+    from sentence_transformers import SentenceTransformer
+    if backend == "onnx":
+        # Exported to ONNX on first use (needs optimum[onnxruntime])
+        return SentenceTransformer(MODEL_NAME, backend="onnx")
+    model = SentenceTransformer(MODEL_NAME)
+    if backend == "int8":
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+def active_backend(backend=None, checked=True):
+    """The backend load_model() runs: the configured one, or torch (fp32) with
+    checked=True when it has not passed check-embeddings.py."""
+    backend = backend or embedding_backend()
+    if backend != "torch" and checked:
+        result = backend_check(backend)
+        if result is None or not result.get('passed'):
+            return "torch"
+    return backend
+
+def load_model(backend=None, checked=True):
+    """The embedding model on the configured backend. With checked=True a faster
+    backend that has not passed check-embeddings.py falls back to fp32."""
+    requested = backend or embedding_backend()
+    backend = active_backend(requested, checked)
+    if backend != requested:
+        reason = "has not been checked" if backend_check(requested) is None else "failed its accuracy check"
+        print(f"⚠️  Embedding backend '{requested}' {reason} - using fp32 "
+              f"(run check-embeddings.py --backend {requested})", file=sys.stderr)
+    with stage_metrics("model-load", model="all-MiniLM-L6-v2", backend=backend):
+        return build_model(backend)
+
+def relative_to_vault(path, base_path=None):
+    """Vault-relative path string (absolute if the file lives outside the vault)."""
+    path = Path(path)
+    try:
+        return str(path.resolve().relative_to(Path(base_path or BASE_PATH).resolve()))
+    except ValueError:
+        return str(path)
+
+def upsert_batched(collection, ids, embeddings, documents=None, metadatas=None):
+    """Upsert any number of records in client-sized chunks."""
+    for i in range(0, len(ids), UPSERT_BATCH):
+        chunk = slice(i, i + UPSERT_BATCH)
+        kwargs = {
+            'ids': ids[chunk],
+            'embeddings': [e.tolist() if hasattr(e, 'tolist') else e for e in embeddings[chunk]],
+        }
+        if documents is not None:
+            kwargs['documents'] = documents[chunk]
+        if metadatas is not None:
+            kwargs['metadatas'] = metadatas[chunk]
+        collection.upsert(**kwargs)
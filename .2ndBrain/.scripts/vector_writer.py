@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Single writer for the vector database.
+
+Every process that embeds notes (embed-note.py after json-to-markdown.py, the
+pipeline's embed stages, init-vector-db.py, a manual run) used to open its
+own PersistentClient on .chroma and upsert a few records there, so concurrent
+runs fought over Chroma's SQLite store and paid a transaction per note.
+
+Now producers only enqueue their upserts and deletes in
+.cache/vector-writer/queue.sqlite (WAL, one short transaction per enqueue),
+and a single writer applies them: whichever process holds writer.lock drains
+the queue for everyone, turning consecutive operations on a collection into
+batched upserts/deletes - a record enqueued twice is written once, with its
+latest value. Producers wait until their own operations are applied, and
+wait before enqueueing while more than MAX_PENDING records are queued
+(back-pressure). Operations only leave the queue once Chroma has them, so a
+writer that dies mid-batch is simply replaced by the next one.
+
+Usage: python3 .2ndBrain/.scripts/vector_writer.py [--drain]   (queue status; --drain applies leftovers)
+"""
+
+import fcntl
+import json
+import sqlite3
+import sys
+import time
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+import numpy as np
+
+BASE_PATH = Path(__file__).parent.parent.parent  # Go up to 2nd Brain root
+QUEUE_DIR = BASE_PATH / ".cache" / "vector-writer"
+QUEUE_PATH = QUEUE_DIR / "queue.sqlite"
+LOCK_PATH = QUEUE_DIR / "writer.lock"
+
+DRAIN_BATCH = 1024  # queued records applied per pass
+MAX_PENDING = 4096  # producers wait above this many queued records
+POLL_SECONDS = 0.1
+WAIT_TIMEOUT = 600  # seconds a producer waits for its records
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ops (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL,
+    action TEXT NOT NULL,
+    record_id TEXT,
+    filter TEXT,
+    embedding BLOB,
+    document TEXT,
+    metadata TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS ops_state ON ops (state, seq);
+"""
+
+class VectorWriteError(Exception):
+    """Queued operations could not be applied to the vector database."""
+
+def connect_queue(path=None):
+    path = Path(path or QUEUE_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+@contextmanager
+def writer_lock(lock_path=None):
+    """Yield True if this process became the writer, False if another one is."""
+    lock_path = Path(lock_path or LOCK_PATH)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+# ============================================================
+# Producers
+# ============================================================
+
+def upsert_ops(collection, ids, embeddings, documents=None, metadatas=None):
+    """Queue rows for upserting records, one per record."""
+    rows = []
+    for i, record_id in enumerate(ids):
+        embedding = np.asarray(embeddings[i], dtype='<f4').tobytes()
+        document = documents[i] if documents is not None else None
+        metadata = json.dumps(metadatas[i]) if metadatas is not None else None
+        rows.append((collection, 'upsert', record_id, None, embedding, document, metadata))
+    return rows
+
+def delete_ops(collection, ids=None, where=None):
+    """Queue rows for deleting records by id, or every record matching a metadata filter."""
+    if where is not None:
+        return [(collection, 'delete', None, json.dumps(where), None, None, None)]
+    return [(collection, 'delete', record_id, None, None, None, None) for record_id in ids or []]
+
+def pending_count(conn):
+    return conn.execute("SELECT COUNT(*) FROM ops WHERE state = 'pending'").fetchone()[0]
+
+def enqueue(rows, queue_path=None, lock_path=None):
+    """Add rows to the queue (waiting while it is full). Returns their sequence numbers."""
+    with closing(connect_queue(queue_path)) as conn:
+        while pending_count(conn) >= MAX_PENDING:
+            with writer_lock(lock_path) as writer:
+                if writer:
+                    drain(queue_path=queue_path)
+                    continue
+            time.sleep(POLL_SECONDS)
+        conn.execute("BEGIN IMMEDIATE")
+        seqs = []
+        for row in rows:
+            cursor = conn.execute("INSERT INTO ops (collection, action, record_id, filter, embedding, document, metadata) "
+                                  "VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+            seqs.append(cursor.lastrowid)
+        conn.execute("COMMIT")
+    return seqs
+
+def write(rows, client=None, queue_path=None, lock_path=None, timeout=WAIT_TIMEOUT):
+    """Enqueue rows and return once they are in the vector database.
+    Becomes the writer if no other process is; otherwise waits for it."""
+    if not rows:
+        return 0
+    seqs = enqueue(rows, queue_path, lock_path)
+    first, last = seqs[0], seqs[-1]
+    deadline = time.monotonic() + timeout
+    while True:
+        with writer_lock(lock_path) as writer:
+            if writer:
+                drain(client, queue_path)
+        with closing(connect_queue(queue_path)) as conn:
+            states = dict(conn.execute("SELECT state, COUNT(*) FROM ops WHERE seq BETWEEN ? AND ? GROUP BY state",
+                                       (first, last)).fetchall())
+            if states.get('failed'):
+                error = conn.execute("SELECT error FROM ops WHERE seq BETWEEN ? AND ? AND state = 'failed' LIMIT 1",
+                                     (first, last)).fetchone()[0]
+                conn.execute("DELETE FROM ops WHERE seq BETWEEN ? AND ?", (first, last))
+                raise VectorWriteError(error)
+        if not states.get('pending'):
+            return len(rows)
+        if time.monotonic() > deadline:
+            raise VectorWriteError(f"timed out waiting for the vector writer ({states['pending']} records still queued)")
+        time.sleep(POLL_SECONDS)
+
+# ============================================================
+# Writer
+# ============================================================
+
+def coalesce(rows):
+    """Group queued rows into batches, in order per collection.
+
+    Consecutive upserts (or deletes by id) of a collection form one batch,
+    keeping only the latest value of a record; a filter delete is a batch of
+    its own, so no upsert ever moves across a delete of the same collection."""
+    by_collection = {}
+    for row in rows:
+        by_collection.setdefault(row[1], []).append(row)
+    batches = []
+    for collection, ops in by_collection.items():
+        current = None
+        for seq, _, action, record_id, where, embedding, document, metadata in ops:
+            kind = (action, 'filter' if where else document is None)
+            if where or current is None or current['kind'] != kind:
+                current = {"collection": collection, "kind": kind, "action": action,
+                           "where": json.loads(where) if where else None, "records": {}, "seqs": []}
+                batches.append(current)
+            if record_id is not None:
+                current['records'].pop(record_id, None)  # the latest value wins
+                current['records'][record_id] = (embedding, document, metadata)
+            current['seqs'].append(seq)
+    return batches
+
+def apply_batch(collection, batch):
+    from vector_db import upsert_batched
+    if batch['action'] == 'delete':
+        if batch['where'] is not None:
+            collection.delete(where=batch['where'])
+        else:
+            collection.delete(ids=list(batch['records']))
+        return
+    ids = list(batch['records'])
+    values = list(batch['records'].values())
+    embeddings = [np.frombuffer(embedding, dtype='<f4') for embedding, _, _ in values]
+    documents = None if batch['kind'][1] else [document for _, document, _ in values]
+    metadatas = [json.loads(metadata) if metadata is not None else None for _, _, metadata in values]
+    upsert_batched(collection, ids, embeddings, documents, metadatas if all(m is not None for m in metadatas) else None)
+
+def drain(client=None, queue_path=None):
+    """Apply every pending operation in coalesced batches. Only call holding the writer lock.
+    Returns the number of records applied."""
+    applied = 0
+    with closing(connect_queue(queue_path)) as conn:
+        while True:
+            rows = conn.execute("SELECT seq, collection, action, record_id, filter, embedding, document, metadata "
+                                "FROM ops WHERE state = 'pending' ORDER BY seq LIMIT ?", (DRAIN_BATCH,)).fetchall()
+            if not rows:
+                return applied
+            if client is None:
+                from vector_db import connect
+                client = connect()
+            collections = {}
+            done, failed = [], []
+            for batch in coalesce(rows):
+                try:
+                    if batch['collection'] not in collections:
+                        collections[batch['collection']] = client.get_collection(name=batch['collection'])
+                    apply_batch(collections[batch['collection']], batch)
+                    done.extend(batch['seqs'])
+                except Exception as e:
+                    failed.extend((str(e) or type(e).__name__, seq) for seq in batch['seqs'])
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("DELETE FROM ops WHERE seq = ?", [(seq,) for seq in done])
+            conn.executemany("UPDATE ops SET state = 'failed', error = ? WHERE seq = ?", failed)
+            conn.execute("COMMIT")
+            applied += len(done)
+
+def main():
+    if not QUEUE_PATH.exists():
+        print("✅ Vector writer queue is empty")
+        return
+    if '--drain' in sys.argv[1:]:
+        with writer_lock() as writer:
+            if not writer:
+                print("⏳ Another process is writing - it drains the queue")
+                return
+            print(f"✅ Applied {drain()} queued record(s)")
+    with closing(connect_queue()) as conn:
+        states = dict(conn.execute("SELECT state, COUNT(*) FROM ops GROUP BY state").fetchall())
+        print(f"📋 Vector writer queue: {states.get('pending', 0)} pending, {states.get('failed', 0)} failed")
+        for collection, error, count in conn.execute(
+                "SELECT collection, error, COUNT(*) FROM ops WHERE state = 'failed' GROUP BY collection, error"):
+            print(f"   ❌ {collection}: {count} record(s): {error[:300]}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)